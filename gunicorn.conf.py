@@ -0,0 +1,22 @@
+# ---------------------------------------------------------
+# CONFIGURACIÓN DE GUNICORN (la lee automáticamente al arrancar)
+# ---------------------------------------------------------
+# Arranque rápido: la aplicación se carga UNA vez en el proceso maestro (preload_app)
+# y los workers nacen con fork() ya calientes: Django configurado, vistas importadas,
+# pycryptodome cargado y plantillas compiladas (voting/startup.py).
+# Para desactivarlo (ej. recarga en caliente al desarrollar): GUNICORN_PRELOAD=false
+import gc
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() not in ('0', 'false', 'no')
+
+
+def when_ready(server):
+    # Corre en el maestro justo antes de crear los workers.
+    if preload_app:
+        from voting.startup import warm_up
+        warm_up()
+        # Todo lo cargado hasta aquí pasa a la generación "permanente" del recolector de basura:
+        # así los workers no lo recorren (ni lo copian al tocarlo) y la memoria sigue compartida.
+        gc.freeze()
+        server.log.info("Aplicación precargada: los workers arrancan en caliente.")
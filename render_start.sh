@@ -3,15 +3,13 @@
 # 1. Salir inmediatamente si un comando falla (opcional, pero recomendado)
 set -o errexit
 
-# 2. Aplicar migraciones a la base de datos
-echo "Aplicando migraciones..."
-python manage.py migrate
-
-# 3. Intentar crear el superusuario (si falla porque ya existe, no pasa nada)
-# El "|| true" hace que si este comando falla, el script continue.
-echo "Creando superusuario..."
-python manage.py createsuperuser --noinput || true
-
-# 4. Arrancar el servidor Gunicorn
+# 2. Migraciones y superusuario, en un solo proceso de Python:
+#    - 'migrate' solo corre si hay migraciones pendientes (esquema al día = arranque rápido).
+#    - El superusuario solo se crea si no existe (variables DJANGO_SUPERUSER_*).
+echo "Preparando base de datos..."
+python manage.py prepare_startup
+
+# 3. Arrancar el servidor Gunicorn
+# Lee gunicorn.conf.py: precarga la app en el proceso maestro y los workers nacen en caliente.
 echo "Iniciando Gunicorn..."
-gunicorn voting_project.wsgi:application
\ No newline at end of file
+exec gunicorn voting_project.wsgi:application
@@ -1,5 +1,208 @@
 from django.contrib import admin
-from .models import VoterProfile
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+from .models import VoterProfile, Vote
+from .sharding import is_sharded, shard_for_object_id, shard_for_user, vote_shards
+
+# ---------------------------------------------------------
+# PAGINADOR CON CONTEO ESTIMADO
+# ---------------------------------------------------------
+# El admin ejecuta un COUNT(*) en cada página del listado. Con millones de votos
+# eso recorre toda la tabla. Si el listado NO tiene filtros, usamos un estimado
+# barato; con filtros (indexados) sí hacemos el conteo exacto.
+
+# Por debajo de este número de filas el COUNT(*) exacto es barato y lo preferimos.
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimate_table_rows(model, using):
+    """
+    Estima cuántas filas tiene la tabla del modelo en la base 'using' sin recorrerla.
+    - PostgreSQL: la estadística 'reltuples' que mantiene ANALYZE.
+    - Otros motores (SQLite): el rango de IDs (máximo - mínimo + 1), que se lee del índice
+      de la llave primaria. Con particiones cada base tiene su rango (sharding.SHARD_ID_SPACE).
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row else None
+    ids = model._default_manager.using(using).aggregate(min_id=Min('pk'), max_id=Max('pk'))
+    return ids['max_id'] - ids['min_id'] + 1 if ids['max_id'] is not None else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_table_rows(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate > EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+# ---------------------------------------------------------
+# PARTICIONES (voting/sharding.py)
+# ---------------------------------------------------------
+# Perfiles y votos viven en las particiones y los usuarios en 'default': un listado lee UNA
+# partición (filtro "Partición", la primera por defecto), nunca un JOIN hacia auth_user.
+# Los correos se traen de 'default' en una sola consulta (prefetch_related) y las búsquedas
+# exactas van directo a la partición del voto o del votante.
+
+class ShardListFilter(admin.SimpleListFilter):
+    title = 'partición'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in vote_shards()]
+
+    def value(self):
+        value = super().value()
+        return value if value in vote_shards() else vote_shards()[0]
+
+    def choices(self, changelist):
+        # Sin opción "Todas": un listado solo puede leer de una base.
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset.using(self.value())
+
+
+class ShardedModelAdmin(admin.ModelAdmin):
+    """Admin de un modelo de las particiones: cada listado y cada objeto se leen de su base."""
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        return (ShardListFilter, *list_filter) if is_sharded() else list_filter
+
+    def get_object(self, request, object_id, from_field=None):
+        # El ID dice en qué partición está el objeto.
+        if is_sharded() and from_field is None:
+            alias = shard_for_object_id(object_id) if str(object_id).isdigit() else None
+            if alias is None:
+                return None
+            try:
+                return self.get_queryset(request).using(alias).get(pk=object_id)
+            except self.model.DoesNotExist:
+                return None
+        return super().get_object(request, object_id, from_field)
+
+
+# ---------------------------------------------------------
+# PERFILES DE VOTANTE
+# ---------------------------------------------------------
+@admin.register(VoterProfile)
+class VoterProfileAdmin(ShardedModelAdmin):
+    list_display = ('id', 'user', 'signature_algorithm', 'has_voted')
+    # Traemos el usuario en el mismo JOIN (evita una consulta por fila).
+    list_select_related = ('user',)
+    list_filter = ('has_voted', 'signature_algorithm')
+    # Búsqueda por prefijo del correo: la usa también el autocompletado de VoteAdmin.
+    search_fields = ('^user__username',)
+    raw_id_fields = ('user',)
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_list_select_related(self, request):
+        # Con particiones el usuario está en otra base: se trae con prefetch_related (get_queryset).
+        return () if is_sharded() else super().get_list_select_related(request)
+
+    def get_queryset(self, request):
+        # El autocompletado muestra str(perfil), que usa el usuario: lo traemos en el JOIN.
+        queryset = super().get_queryset(request)
+        queryset = queryset.prefetch_related('user') if is_sharded() else queryset.select_related('user')
+        # La llave pública es texto largo: no la cargamos en el listado.
+        if request.resolver_match and request.resolver_match.url_name.endswith('changelist'):
+            queryset = queryset.defer('public_key')
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        if not is_sharded() or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        # Con particiones no hay JOIN hacia auth_user: buscamos los usuarios en 'default'
+        # (los primeros 500, para que la lista IN no crezca sin límite).
+        user_ids = User.objects.filter(username__startswith=search_term.strip()).values_list('pk', flat=True)
+        return queryset.filter(user_id__in=list(user_ids[:500])), False
+
+
+# ---------------------------------------------------------
+# VOTOS (La "Urna Digital")
+# ---------------------------------------------------------
+@admin.register(Vote)
+class VoteAdmin(ShardedModelAdmin):
+    # No usamos __str__ en el listado: necesitaría voter.user por cada fila.
+    list_display = ('id', 'voter_username', 'timestamp')
+    list_display_links = ('id',)
+    list_select_related = ('voter__user',)
+    # Filtro por rangos fijos de fecha (hoy, últimos 7 días...) sobre el campo indexado.
+    list_filter = (('timestamp', admin.DateFieldListFilter),)
+    search_help_text = "Busca por ID de voto exacto o por correo exacto del votante."
+    search_fields = ('voter__user__username',)
+    autocomplete_fields = ('voter',)
+    # Ordenamos solo por la llave primaria (indexada).
+    ordering = ('-id',)
+    sortable_by = ('id', 'timestamp')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_list_select_related(self, request):
+        if is_sharded():
+            # El perfil está en la misma partición (JOIN); el usuario, en 'default' (prefetch).
+            return ('voter',)
+        return super().get_list_select_related(request)
+
+    def get_autocomplete_fields(self, request):
+        # El autocompletado buscaría perfiles en una sola partición: con particiones, campo de solo lectura.
+        return () if is_sharded() else super().get_autocomplete_fields(request)
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly = super().get_readonly_fields(request, obj)
+        return (*readonly, 'voter') if is_sharded() else readonly
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if is_sharded():
+            queryset = queryset.prefetch_related('voter__user')
+        if request.resolver_match and request.resolver_match.url_name.endswith('changelist'):
+            # Firma, cifrado y llave pública son columnas grandes que el listado no muestra.
+            # ('option' sí se carga: es corta y la usa __str__ en la casilla de acciones).
+            queryset = queryset.defer('digital_signature', 'encrypted_vote', 'voter__public_key')
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Búsqueda por igualdad exacta (usa índices) en vez del 'icontains' por defecto,
+        que recorrería toda la tabla: un número busca por ID, un texto por correo.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            # Con particiones, el ID dice en qué base está el voto.
+            alias = shard_for_object_id(search_term)
+            if alias is None:
+                return queryset.none(), False
+            return queryset.using(alias).filter(pk=int(search_term)), False
+        if not is_sharded():
+            return queryset.filter(voter__user__username=search_term), False
+        # El usuario está en 'default' y sus votos en su partición: sin JOIN entre bases.
+        user = User.objects.filter(username=search_term).first()
+        if user is None:
+            return queryset.none(), False
+        return queryset.using(shard_for_user(user.pk)).filter(voter__user_id=user.pk), False
+
+    @admin.display(description='Votante')
+    def voter_username(self, vote):
+        return vote.voter.user.username
 
-# Registramos el modelo para que aparezca en el panel de administración
-admin.site.register(VoterProfile)
\ No newline at end of file
@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class VotingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'voting'
+
+    def ready(self):
+        # Instalamos el llavero AES definido en settings (BALLOT_AES_KEYS).
+        # Si no hay llaves configuradas, crypto_utils sigue con su llave temporal de desarrollo.
+        from django.conf import settings
+        from . import crypto_utils
+        # Registra las señales que mantienen al día la caché de identidad.
+        from . import identity  # noqa: F401
+        # Registra los rangos de IDs de cada partición y el borrado de perfiles particionados.
+        from . import sharding  # noqa: F401
+
+        keys = crypto_utils.parse_aes_keyring(settings.BALLOT_AES_KEYS)
+        if keys:
+            # Por defecto la llave activa es la última de la lista (la más nueva).
+            active_key_id = settings.BALLOT_AES_ACTIVE_KEY or list(keys)[-1]
+            crypto_utils.configure_aes_keys(keys, active_key_id, settings.BALLOT_AES_MODE)
+        else:
+            crypto_utils.configure_aes_keys(crypto_utils.AES_KEYS, crypto_utils.ACTIVE_AES_KEY_ID, settings.BALLOT_AES_MODE)
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+# ---------------------------------------------------------
+# ARCHIVO FRÍO DE PAPELETAS (segmentos comprimidos)
+# ---------------------------------------------------------
+# Cuando la elección ya cerró, sus votos dejan de cambiar. El comando 'archive_ballots'
+# los saca de la tabla caliente voting_vote y los guarda en SEGMENTOS de solo-agregar:
+#
+#   segment-000001.seg   Los votos, en bloques comprimidos con zlib (cada bloque con su CRC32).
+#   segment-000001.idx   Índice binario ordenado por ID: (id, posición del bloque, fila, SHA-256 de la firma).
+#   segment-000001.vdx   Índice por votante: (id del perfil, id del voto), ordenado por perfil.
+#   segment-000001.json  Manifiesto: rango de IDs, cuántos votos, y el SHA-256 de .seg, .idx y .vdx.
+#
+# El manifiesto se escribe AL FINAL: si existe, el segmento está completo. Un segmento
+# nunca se modifica; cada archivado nuevo agrega segmentos con IDs mayores.
+#
+# Lectura:
+#   - Comprobante (un voto): búsqueda binaria en el .idx mapeado en memoria (mmap) y se
+#     descomprime SOLO el bloque que lo contiene.
+#   - Verificación personal (los votos de un votante): búsqueda binaria en el .vdx y luego
+#     lo mismo que un comprobante. Los segmentos anteriores al .vdx se recorren completos.
+#   - Re-verificación / re-conteo: se recorren los bloques en orden, uno a la vez.
+
+SEGMENT_MAGIC = b'VOTESEG1'
+# Encabezado de cada bloque: longitud comprimida y CRC32 de los datos descomprimidos.
+BLOCK_HEADER = struct.Struct('<II')
+# Entrada del índice: id del voto, posición del bloque en el .seg, fila dentro del bloque, SHA-256 de la firma.
+INDEX_ENTRY = struct.Struct('<QQI32s')
+# Entrada del índice por votante: id del perfil, id del voto.
+VOTER_ENTRY = struct.Struct('<QQ')
+
+# Campos de cada voto archivado: todo lo necesario para volver a verificar su firma sin la base de datos.
+RECORD_FIELDS = (
+    'id', 'voter_id', 'username', 'option', 'digital_signature', 'encrypted_vote',
+    'timestamp', 'signature_algorithm', 'public_key',
+)
+
+
+class ArchiveCorrupted(Exception):
+    pass
+
+
+def archive_dir():
+    return Path(settings.BALLOT_ARCHIVE_DIR)
+
+
+def signature_digest(signature_hex):
+    return hashlib.sha256(signature_hex.encode('ascii')).digest()
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_replace(temporary, target):
+    """Hace durable el archivo temporal y lo mueve a su nombre final (atómico)."""
+    with open(temporary, 'rb') as handle:
+        os.fsync(handle.fileno())
+    os.replace(temporary, target)
+
+
+# ---------------------------------------------------------
+# ESCRITURA
+# ---------------------------------------------------------
+def write_segment(number, records, block_size=64, level=6):
+    """
+    Escribe un segmento con los votos dados (dicts con RECORD_FIELDS, ordenados por id).
+    Retorna el manifiesto ya guardado en disco.
+    """
+    if not records:
+        raise ValueError("Un segmento necesita al menos un voto.")
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    base = directory / f"segment-{number:06d}"
+    seg_path, idx_path, vdx_path, manifest_path = (
+        base.with_suffix(suffix) for suffix in ('.seg', '.idx', '.vdx', '.json')
+    )
+    seg_tmp, idx_tmp, vdx_tmp = (path.with_suffix(path.suffix + '.tmp') for path in (seg_path, idx_path, vdx_path))
+
+    blocks = 0
+    with open(seg_tmp, 'wb') as seg_file, open(idx_tmp, 'wb') as idx_file:
+        seg_file.write(SEGMENT_MAGIC)
+        for start in range(0, len(records), block_size):
+            block = records[start:start + block_size]
+            raw = '\n'.join(json.dumps([record[field] for field in RECORD_FIELDS], ensure_ascii=False)
+                            for record in block).encode('utf-8')
+            compressed = zlib.compress(raw, level)
+            offset = seg_file.tell()
+            seg_file.write(BLOCK_HEADER.pack(len(compressed), zlib.crc32(raw)))
+            seg_file.write(compressed)
+            for row, record in enumerate(block):
+                idx_file.write(INDEX_ENTRY.pack(record['id'], offset, row, signature_digest(record['digital_signature'])))
+            blocks += 1
+
+    with open(vdx_tmp, 'wb') as vdx_file:
+        for voter_id, vote_id in sorted((record['voter_id'], record['id']) for record in records):
+            vdx_file.write(VOTER_ENTRY.pack(voter_id, vote_id))
+
+    _fsync_replace(seg_tmp, seg_path)
+    _fsync_replace(idx_tmp, idx_path)
+    _fsync_replace(vdx_tmp, vdx_path)
+
+    manifest = {
+        'segment': number,
+        'first_id': records[0]['id'],
+        'last_id': records[-1]['id'],
+        'count': len(records),
+        'blocks': blocks,
+        'block_size': block_size,
+        'fields': list(RECORD_FIELDS),
+        'seg_sha256': _file_sha256(seg_path),
+        'idx_sha256': _file_sha256(idx_path),
+        'vdx_sha256': _file_sha256(vdx_path),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    manifest_tmp = manifest_path.with_suffix('.json.tmp')
+    manifest_tmp.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    _fsync_replace(manifest_tmp, manifest_path)
+    return manifest
+
+
+def next_segment_number():
+    segments = list_segments()
+    return segments[-1].number + 1 if segments else 1
+
+
+# ---------------------------------------------------------
+# LECTURA
+# ---------------------------------------------------------
+class Segment:
+    """Un segmento completo (con manifiesto). Solo lectura."""
+
+    def __init__(self, manifest_path):
+        self.manifest_path = Path(manifest_path)
+        self.manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        self.number = self.manifest['segment']
+        self.first_id = self.manifest['first_id']
+        self.last_id = self.manifest['last_id']
+        self.seg_path = self.manifest_path.with_suffix('.seg')
+        self.idx_path = self.manifest_path.with_suffix('.idx')
+        self.vdx_path = self.manifest_path.with_suffix('.vdx')
+
+    def __repr__(self):
+        return f"<Segment {self.number}: votos {self.first_id}-{self.last_id}>"
+
+    def verify_checksums(self):
+        """Compara el SHA-256 de .seg, .idx y .vdx con el manifiesto. Lanza ArchiveCorrupted si no coinciden."""
+        files = [(self.seg_path, self.manifest['seg_sha256']), (self.idx_path, self.manifest['idx_sha256'])]
+        if 'vdx_sha256' in self.manifest:
+            files.append((self.vdx_path, self.manifest['vdx_sha256']))
+        for path, expected in files:
+            if _file_sha256(path) != expected:
+                raise ArchiveCorrupted(f"{path.name}: el SHA-256 no coincide con el manifiesto.")
+        if self.idx_path.stat().st_size != self.manifest['count'] * INDEX_ENTRY.size:
+            raise ArchiveCorrupted(f"{self.idx_path.name}: tamaño inesperado.")
+
+    def _read_block(self, data, offset):
+        length, crc = BLOCK_HEADER.unpack_from(data, offset)
+        start = offset + BLOCK_HEADER.size
+        raw = zlib.decompress(data[start:start + length])
+        if zlib.crc32(raw) != crc:
+            raise ArchiveCorrupted(f"{self.seg_path.name}: bloque en {offset} dañado (CRC32).")
+        rows = [dict(zip(self.manifest['fields'], json.loads(line))) for line in raw.decode('utf-8').split('\n')]
+        return rows, start + length
+
+    def __iter__(self):
+        """Recorre los votos en orden, un bloque descomprimido a la vez."""
+        with open(self.seg_path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                raise ArchiveCorrupted(f"{self.seg_path.name}: no es un segmento de votos.")
+            offset = len(SEGMENT_MAGIC)
+            while offset < len(data):
+                rows, offset = self._read_block(data, offset)
+                yield from rows
+
+    def _find_entry(self, index, vote_id):
+        """Búsqueda binaria del voto en el índice (mapeado en memoria)."""
+        low, high = 0, len(index) // INDEX_ENTRY.size
+        while low < high:
+            middle = (low + high) // 2
+            entry = INDEX_ENTRY.unpack_from(index, middle * INDEX_ENTRY.size)
+            if entry[0] == vote_id:
+                return entry
+            if entry[0] < vote_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def index_digests(self):
+        """{id del voto: SHA-256 de su firma} de todo el segmento (para comparar con la tabla viva)."""
+        with open(self.idx_path, 'rb') as handle:
+            index = handle.read()
+        return {vote_id: digest for vote_id, _, _, digest in INDEX_ENTRY.iter_unpack(index)}
+
+    def voter_vote_ids(self, voter_id):
+        """IDs de los votos de un perfil en este segmento (búsqueda binaria en el .vdx)."""
+        if 'vdx_sha256' not in self.manifest:
+            # Segmento escrito antes del índice por votante: lo recorremos completo.
+            return [record['id'] for record in self if record['voter_id'] == voter_id]
+        vote_ids = []
+        with open(self.vdx_path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as index:
+            low, high = 0, len(index) // VOTER_ENTRY.size
+            while low < high:  # Primera entrada con ese perfil (o la siguiente).
+                middle = (low + high) // 2
+                if VOTER_ENTRY.unpack_from(index, middle * VOTER_ENTRY.size)[0] < voter_id:
+                    low = middle + 1
+                else:
+                    high = middle
+            for position in range(low, len(index) // VOTER_ENTRY.size):
+                entry_voter, vote_id = VOTER_ENTRY.unpack_from(index, position * VOTER_ENTRY.size)
+                if entry_voter != voter_id:
+                    break
+                vote_ids.append(vote_id)
+        return vote_ids
+
+    def lookup(self, vote_id):
+        """Retorna el voto archivado (dict) o None. Solo descomprime su bloque."""
+        if not self.first_id <= vote_id <= self.last_id:
+            return None
+        with open(self.idx_path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as index:
+            entry = self._find_entry(index, vote_id)
+        if entry is None:
+            return None
+        _, offset, row, digest = entry
+        with open(self.seg_path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            rows, _ = self._read_block(data, offset)
+        record = rows[row]
+        if record['id'] != vote_id or signature_digest(record['digital_signature']) != digest:
+            raise ArchiveCorrupted(f"{self.seg_path.name}: el voto #{vote_id} no coincide con su índice.")
+        return record
+
+
+def list_segments():
+    """Segmentos completos (los que tienen manifiesto), en orden."""
+    directory = archive_dir()
+    if not directory.exists():
+        return []
+    return sorted((Segment(path) for path in directory.glob('segment-*.json')), key=lambda segment: segment.number)
+
+
+def find_archived_vote(vote_id):
+    """Busca un voto en el archivo frío (para comprobantes). Retorna dict o None."""
+    for segment in list_segments():
+        if segment.first_id <= vote_id <= segment.last_id:
+            return segment.lookup(vote_id)
+    return None
+
+
+def find_voter_archived_votes(voter_id):
+    """Votos archivados de un perfil (para su verificación personal), en orden de ID."""
+    return [segment.lookup(vote_id) for segment in list_segments() for vote_id in segment.voter_vote_ids(voter_id)]
+
+
+def iter_archived_votes():
+    """Todos los votos archivados, en orden de ID, sin cargarlos todos a memoria."""
+    for segment in list_segments():
+        yield from segment
@@ -0,0 +1,217 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .models import AuditEvent
+
+# ---------------------------------------------------------
+# BITÁCORA DE EVENTOS DE SEGURIDAD (sin bloquear la petición)
+# ---------------------------------------------------------
+# Guardar cada evento con un INSERT dentro de la petición haría más lento justo lo
+# que más se usa (login, votar). En cambio:
+#   1. record_event() arma el evento en memoria y lo mete en una cola (put_nowait:
+#      nunca espera). Es lo único que paga la petición.
+#   2. Un hilo escritor por proceso saca los eventos de la cola y los guarda por lotes
+#      (un bulk_create de hasta AUDIT_LOG_BATCH_SIZE, o lo que llegó en AUDIT_LOG_FLUSH_SECONDS).
+#   3. La cola tiene tope (AUDIT_LOG_QUEUE_SIZE): si la base no da abasto, los eventos
+#      sobrantes se descartan y se cuentan. El conteo se guarda como un evento
+#      'events_dropped' en el siguiente lote: la pérdida queda registrada.
+# Al terminar el proceso se guarda lo que quede en la cola (atexit): el escritor termina
+# su lote y lo que reste se guarda desde el hilo principal.
+# Con AUDIT_LOG_BACKGROUND=False no hay hilo: los eventos esperan en la cola hasta
+# flush_audit_events() (lo usan las pruebas).
+
+_lock = threading.Lock()
+_queue = None
+_writer = None
+_owner_pid = None
+# Descartados desde el último lote (se guardan como evento) y en total (para la página del personal).
+_dropped_pending = 0
+_dropped_total = 0
+# Marca que el escritor encuentra al final de la cola al cerrar el proceso.
+_STOP = object()
+# Segundos que el cierre del proceso espera al escritor.
+_EXIT_TIMEOUT = 10
+
+
+def _get_queue():
+    """
+    La cola de ESTE proceso. Con gunicorn --preload los workers nacen con una copia de
+    la del maestro (y sin su hilo): al detectar otro PID empezamos una nueva.
+    """
+    global _queue, _writer, _owner_pid, _dropped_pending, _dropped_total
+    if _owner_pid != os.getpid():
+        with _lock:
+            if _owner_pid != os.getpid():
+                _queue = queue.Queue(maxsize=settings.AUDIT_LOG_QUEUE_SIZE)
+                _writer = None
+                _dropped_pending = _dropped_total = 0
+                _owner_pid = os.getpid()
+    if settings.AUDIT_LOG_BACKGROUND and (_writer is None or not _writer.is_alive()):
+        with _lock:
+            if _writer is None or not _writer.is_alive():
+                _writer = threading.Thread(target=_writer_loop, args=(_queue,), name='audit-log-writer', daemon=True)
+                _writer.start()
+    return _queue
+
+
+def client_ip(request):
+    """
+    IP del cliente. Detrás de un proxy (Render) REMOTE_ADDR es la del proxy: con
+    AUDIT_LOG_IP_HEADER='HTTP_X_FORWARDED_FOR' tomamos la última entrada, que es la que
+    agregó nuestro proxy (las anteriores las puede inventar el cliente).
+    """
+    header = settings.AUDIT_LOG_IP_HEADER
+    forwarded = request.META.get(header, '') if header else ''
+    return forwarded.split(',')[-1].strip() or request.META.get('REMOTE_ADDR') or None
+
+
+def record_event(event_type, request=None, user=None, user_id=None, username='', **details):
+    """
+    Encola un evento de seguridad. Nunca consulta la base ni espera.
+    'user' por defecto es el de la sesión (sin usuario cargado: user_id y username);
+    'details' se guarda como JSON.
+    """
+    global _dropped_pending, _dropped_total
+    if not settings.AUDIT_LOG_ENABLED:
+        return
+    if user is None and request is not None and request.user.is_authenticated:
+        user = request.user
+    event = AuditEvent(
+        created_at=timezone.now(),
+        event_type=event_type,
+        user_id=user.pk if user is not None else user_id,
+        username=user.username if user is not None else username[:150],
+        ip_address=client_ip(request) if request is not None else None,
+        details=details,
+    )
+    try:
+        _get_queue().put_nowait(event)
+    except queue.Full:
+        with _lock:
+            _dropped_pending += 1
+            _dropped_total += 1
+
+
+def audit_log_stats():
+    """Estado de la cola de este proceso (para la página del personal)."""
+    events = _queue if _owner_pid == os.getpid() else None
+    return {
+        'pending': events.qsize() if events is not None else 0,
+        'capacity': settings.AUDIT_LOG_QUEUE_SIZE,
+        'dropped': _dropped_total if events is not None else 0,
+        'writer_alive': _writer is not None and _writer.is_alive() and events is not None,
+    }
+
+
+def _take_dropped_event():
+    """Si hubo descartes desde el último lote, retorna el evento que los registra."""
+    global _dropped_pending
+    with _lock:
+        dropped, _dropped_pending = _dropped_pending, 0
+    if not dropped:
+        return None
+    return AuditEvent(created_at=timezone.now(), event_type=AuditEvent.EVENTS_DROPPED,
+                      details={'count': dropped, 'pid': os.getpid()})
+
+
+def _write_batch(events):
+    """Guarda un lote con un solo INSERT. Si la base falla, el lote cuenta como descartado."""
+    global _dropped_pending, _dropped_total
+    dropped_event = _take_dropped_event()
+    batch = [dropped_event, *events] if dropped_event is not None else list(events)
+    if not batch:
+        return 0
+    # El hilo tiene su propia conexión: la renovamos si caducó o se cortó.
+    close_old_connections()
+    try:
+        AuditEvent.objects.bulk_create(batch, batch_size=500)
+    except DatabaseError:
+        with _lock:
+            # Los descartes anteriores siguen pendientes de registrar, más este lote.
+            _dropped_pending += len(events) + (dropped_event.details['count'] if dropped_event else 0)
+            _dropped_total += len(events)
+        return 0
+    return len(batch)
+
+
+def _drain(events, limit):
+    """Saca de la cola hasta 'limit' eventos sin esperar."""
+    batch = []
+    while len(batch) < limit:
+        try:
+            batch.append(events.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _writer_loop(events):
+    while True:
+        # Esperamos el primer evento y damos hasta AUDIT_LOG_FLUSH_SECONDS para juntar más.
+        batch = [events.get()]
+        deadline = time.monotonic() + settings.AUDIT_LOG_FLUSH_SECONDS
+        while len(batch) < settings.AUDIT_LOG_BATCH_SIZE and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(events.get(timeout=remaining))
+            except queue.Empty:
+                break
+        stopping = batch[-1] is _STOP
+        if stopping:
+            batch.pop()
+        try:
+            _write_batch(batch)
+        except Exception:
+            # El hilo escritor no debe morir por un lote raro; si muere, record_event lo vuelve a crear.
+            pass
+        if stopping:
+            return
+
+
+def flush_audit_events():
+    """Guarda ahora, en este hilo, todo lo que esté en la cola. Retorna cuántos eventos guardó."""
+    if _owner_pid != os.getpid():
+        return 0
+    written = 0
+    while batch := _drain(_queue, settings.AUDIT_LOG_BATCH_SIZE):
+        written += _write_batch(batch)
+    # Aunque la cola esté vacía, los descartes pendientes se registran.
+    return written + _write_batch([])
+
+
+@atexit.register
+def _flush_at_exit():
+    writer = _writer
+    if _owner_pid == os.getpid() and writer is not None and writer.is_alive():
+        # El escritor puede tener un lote en la mano: le pedimos que termine y lo esperamos.
+        try:
+            _queue.put(_STOP, timeout=_EXIT_TIMEOUT)
+            writer.join(_EXIT_TIMEOUT)
+        except queue.Full:
+            pass
+    try:
+        flush_audit_events()
+    except Exception:
+        pass
+
+
+def search_events(voter='', event_type='', limit=200):
+    """
+    Eventos más recientes primero, filtrados por votante (su correo o el inicio del correo)
+    y por tipo. Cada filtro tiene su índice (ver AuditEvent.Meta).
+    """
+    events = AuditEvent.objects.order_by('-created_at')
+    if voter.strip():
+        events = events.filter(username__startswith=voter.strip())
+    if event_type:
+        events = events.filter(event_type=event_type)
+    return events[:limit]
@@ -0,0 +1,278 @@
+import math
+import platform
+import random
+import statistics
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from .crypto_utils import encrypt_vote_aes, generate_keys, generate_rsa_keys, sign_vote, verify_signature
+from .models import Vote, VoterProfile
+from .election import tally_options
+from .views import build_audit_rows
+from .vote_utils import parse_vote_content
+
+# ---------------------------------------------------------
+# MICRO-BENCHMARKS (crypto_utils y rutas calientes de las vistas)
+# ---------------------------------------------------------
+# Cada caso tiene un ID estable, ej. "sign_vote[ED25519,1024B]", y mide UNA operación
+# con varios tamaños de entrada. Los resultados (todas las muestras, no solo el promedio)
+# se guardan como línea base en el repositorio (settings.BENCHMARK_BASELINE_FILE) y el
+# comando 'run_benchmarks --compare' avisa si algo se volvió más lento de forma
+# estadísticamente significativa (prueba de Mann-Whitney, ver compare_samples).
+
+# Una muestra dura al menos esto: las operaciones muy rápidas se repiten dentro de la
+# muestra para que la resolución del reloj no domine la medición.
+MIN_SAMPLE_SECONDS = 0.02
+
+# Caché propia en memoria mientras se mide: los casos llenan y vacían la caché, y eso
+# no debe tocar la de la aplicación (que en producción puede ser compartida).
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'voting-benchmarks',
+    }
+}
+
+PAYLOAD_SIZES = (64, 1024, 16384)
+QUESTION_COUNTS = (4, 32, 256)
+BALLOT_COUNTS = (100, 1000, 10000)
+RENDER_BALLOT_COUNTS = (10, 100, 1000)
+
+# Respuestas posibles por pregunta (las mismas claves que traduce get_legible_label).
+ANSWERS = {
+    'P1': ('ALTO', 'MEDIO', 'BAJO'),
+    'P2': ('FACIL', 'ADECUADO', 'DIFICIL'),
+    'P3': ('MUCHO', 'TAL-VEZ', 'NO-DUDA'),
+    'P4': ('RAPIDO', 'ADECUADO', 'LENTO'),
+}
+
+
+# --- Datos de entrada (deterministas: misma semilla, mismas entradas) ---
+def _payload(size):
+    """Texto de voto de 'size' bytes con el formato real (USUARIO:...|P1:...)."""
+    base = "USUARIO:benchmark@ejemplo.com|P1:ALTO|P2:FACIL|P3:MUCHO|P4:ADECUADO"
+    return (base + '|' + 'X' * size)[:size]
+
+
+@lru_cache(maxsize=None)
+def _keys(algorithm):
+    return generate_keys(algorithm)
+
+
+def _ballot_text(rng, questions=4):
+    return '|'.join(
+        f"P{number}:{rng.choice(ANSWERS.get(f'P{number}', ('SI', 'NO')))}" for number in range(1, questions + 1)
+    )
+
+
+def _ballots(count):
+    """Votos en memoria (sin base de datos) con el mismo aspecto que los de audit_votes()."""
+    rng = random.Random(count)
+    voter = VoterProfile(user=User(username='benchmark@ejemplo.com'))
+    ballots = []
+    for number in range(1, count + 1):
+        vote = Vote(id=number, voter=voter, option=_ballot_text(rng), timestamp=datetime(2025, 11, 20, 10, 0))
+        vote.encrypted_preview = 'ab' * 12
+        vote.signature_preview = 'cd' * 12
+        ballots.append(vote)
+    return ballots
+
+
+# --- Casos ---
+# Cada 'setup' prepara las entradas (fuera del tiempo medido) y retorna
+# (operación a medir, reinicio opcional que corre antes de cada muestra sin medirse).
+def _generate_rsa_case():
+    return generate_rsa_keys, None
+
+
+def _sign_case(algorithm, size):
+    def setup():
+        _, private_pem = _keys(algorithm)
+        payload = _payload(size)
+        return (lambda: sign_vote(payload, private_pem, algorithm)), None
+    return setup
+
+
+def _verify_case(algorithm, size):
+    def setup():
+        public_pem, private_pem = _keys(algorithm)
+        payload = _payload(size)
+        signature = sign_vote(payload, private_pem, algorithm)
+        return (lambda: verify_signature(payload, signature, public_pem, algorithm)), None
+    return setup
+
+
+def _encrypt_case(mode, size):
+    def setup():
+        payload = _payload(size)
+        return (lambda: encrypt_vote_aes(payload, mode=mode)), None
+    return setup
+
+
+def _parse_case(questions):
+    def setup():
+        text = _ballot_text(random.Random(questions), questions)
+        return (lambda: parse_vote_content(text)), None
+    return setup
+
+
+def _counts_case(count):
+    def setup():
+        options = [ballot.option for ballot in _ballots(count)]
+        return (lambda: tally_options(options)), None
+    return setup
+
+
+def _render_case(count):
+    def setup():
+        request = RequestFactory().get('/votacion/auditoria/')
+        request.user = User(username='auditor@ejemplo.com', is_staff=True)
+        context = {
+            'votes': build_audit_rows(_ballots(count)),
+            'is_admin': True,
+            'is_verification_page': False,
+            'is_audit_page': True,
+        }
+        operation = lambda: render_to_string('voting/results_dashboard.html', context, request=request)
+        # Las filas se guardan con {% cache %}: medimos el peor caso (caché vacía).
+        # Es la caché aislada de run_case, nunca la de la aplicación.
+        return operation, cache.clear
+    return setup
+
+
+def _build_cases():
+    cases = {'generate_rsa_keys[2048]': _generate_rsa_case}
+    for algorithm in ('RSA', 'ED25519'):
+        for size in PAYLOAD_SIZES:
+            cases[f"sign_vote[{algorithm},{size}B]"] = _sign_case(algorithm, size)
+            cases[f"verify_signature[{algorithm},{size}B]"] = _verify_case(algorithm, size)
+    for mode in ('cbc', 'gcm'):
+        for size in PAYLOAD_SIZES:
+            cases[f"encrypt_vote_aes[{mode},{size}B]"] = _encrypt_case(mode, size)
+    for questions in QUESTION_COUNTS:
+        cases[f"parse_vote_content[{questions} preguntas]"] = _parse_case(questions)
+    for count in BALLOT_COUNTS:
+        cases[f"tally_options[{count} votos]"] = _counts_case(count)
+    for count in RENDER_BALLOT_COUNTS:
+        cases[f"render_results_dashboard[{count} votos]"] = _render_case(count)
+    return cases
+
+
+BENCHMARK_CASES = _build_cases()
+
+
+# ---------------------------------------------------------
+# MEDICIÓN
+# ---------------------------------------------------------
+def _loops_per_sample(operation):
+    """Cuántas veces repetir la operación para que una muestra dure al menos MIN_SAMPLE_SECONDS."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        if time.perf_counter() - start >= MIN_SAMPLE_SECONDS:
+            return loops
+        loops *= 2
+
+
+def run_case(case_id, samples):
+    """
+    Mide un caso: 'samples' muestras, cada una en segundos POR LLAMADA.
+    Retorna {'median', 'stdev', 'loops', 'samples'}.
+    """
+    with override_settings(CACHES=BENCHMARK_CACHES):
+        return _measure(*BENCHMARK_CASES[case_id](), samples)
+
+
+def _measure(operation, reset, samples):
+    if reset is None:
+        loops = _loops_per_sample(operation)  # También sirve de calentamiento.
+    else:
+        loops = 1  # Con reinicio, cada llamada tiene que empezar desde cero.
+        reset()
+        operation()
+
+    timings = []
+    for _ in range(samples):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        timings.append((time.perf_counter() - start) / loops)
+
+    return {
+        'median': statistics.median(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'loops': loops,
+        'samples': timings,
+    }
+
+
+def environment_info():
+    """Datos de la máquina: comparar contra una línea base de otra máquina no tiene sentido."""
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor() or platform.machine(),
+        'system': platform.system(),
+    }
+
+
+# ---------------------------------------------------------
+# COMPARACIÓN ESTADÍSTICA
+# ---------------------------------------------------------
+def slower_p_value(baseline, current):
+    """
+    Prueba U de Mann-Whitney (una cola, aproximación normal con corrección por empates):
+    probabilidad de ver estas muestras si 'current' NO fuera más lento que 'baseline'.
+    No supone que los tiempos sigan una distribución normal (casi nunca la siguen).
+    """
+    combined = sorted([(value, 0) for value in baseline] + [(value, 1) for value in current])
+    total = len(combined)
+    rank_sum = 0.0
+    tie_correction = 0.0
+    index = 0
+    while index < total:
+        end = index
+        while end + 1 < total and combined[end + 1][0] == combined[index][0]:
+            end += 1
+        ties = end - index + 1
+        average_rank = (index + end) / 2 + 1
+        rank_sum += average_rank * sum(1 for _, group in combined[index:end + 1] if group == 1)
+        tie_correction += ties ** 3 - ties
+        index = end + 1
+
+    n_base, n_current = len(baseline), len(current)
+    u_current = rank_sum - n_current * (n_current + 1) / 2
+    mean = n_base * n_current / 2
+    variance = n_base * n_current / 12 * ((total + 1) - tie_correction / (total * (total - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u_current - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare_samples(baseline, current, threshold, alpha):
+    """
+    Clasifica un caso contra su línea base:
+      'más lento'  -> la mediana subió más que 'threshold' Y la diferencia es significativa (p < alpha)
+      'más rápido' -> lo mismo en la otra dirección
+      'igual'      -> cualquier otra cosa (ruido)
+    Retorna (estado, razón de medianas, p-valor).
+    """
+    ratio = statistics.median(current) / statistics.median(baseline)
+    slower_p = slower_p_value(baseline, current)
+    faster_p = slower_p_value(current, baseline)
+    if ratio > 1 + threshold and slower_p < alpha:
+        return 'más lento', ratio, slower_p
+    if ratio < 1 / (1 + threshold) and faster_p < alpha:
+        return 'más rápido', ratio, faster_p
+    return 'igual', ratio, min(slower_p, faster_p)
@@ -1,34 +1,144 @@
-from Crypto.PublicKey import RSA
-from Crypto.Signature import pkcs1_15
-from Crypto.Hash import SHA256
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
-from Crypto.Random import get_random_bytes
+import importlib
+import os
+
+# ---------------------------------------------------------
+# CARGA PEREZOSA DE PYCRYPTODOME
+# ---------------------------------------------------------
+# Los módulos de pycryptodome (RSA, ECC, AES...) se importan dentro de cada función,
+# la primera vez que se usan: así un worker que solo sirve la portada o la guía no paga
+# su carga al arrancar. models.py importa este archivo solo por el registro de algoritmos.
+# En producción gunicorn los precarga UNA vez en el proceso maestro (preload_crypto,
+# ver gunicorn.conf.py) y los workers nacen ya con ellos en memoria.
+CRYPTO_MODULES = (
+    'Crypto.IO.PEM',
+    'Crypto.IO.PKCS8',
+    'Crypto.Util.asn1',
+    'Crypto.PublicKey.RSA',
+    'Crypto.PublicKey.ECC',
+    'Crypto.Signature.pkcs1_15',
+    'Crypto.Signature.eddsa',
+    'Crypto.Hash.SHA256',
+    'Crypto.Cipher.AES',
+    'Crypto.Util.Padding',
+    'Crypto.Random',
+)
+
+def preload_crypto():
+    """Importa de una vez todos los módulos criptográficos (para precargar antes de los workers)."""
+    for module_name in CRYPTO_MODULES:
+        importlib.import_module(module_name)
 
 # ---------------------------------------------------------
 # CONFIGURACIÓN AES (Confidencialidad - El "Candado")
 # ---------------------------------------------------------
-# Generamos una clave secreta aleatoria.
-# Piensa en esto como la llave única de un candado que usaremos para cerrar los votos.
-AES_KEY = get_random_bytes(32) 
-BLOCK_SIZE = AES.block_size
+# Guardamos un "llavero" de llaves AES, cada una con su identificador (versión).
+# Cada voto cifrado lleva al inicio el identificador de la llave y el modo que se usó:
+#     "<id_llave>:<modo>:<datos en hexadecimal>"     ej: "v2:gcm:9f3a..."
+# Así podemos rotar la llave (o cambiar de modo) sin perder los votos viejos.
+#
+# El llavero real se configura desde settings (BALLOT_AES_KEYS) al arrancar la app.
+# Si no se configura, usamos una llave temporal aleatoria: útil solo en desarrollo,
+# porque se pierde al reiniciar el proceso.
+AES_KEYS = {'dev': os.urandom(32)}
+ACTIVE_AES_KEY_ID = 'dev'
+ACTIVE_AES_MODE = 'cbc'
+AES_MODES = ('cbc', 'gcm')
+BLOCK_SIZE = 16  # Tamaño de bloque de AES (fijo para cualquier largo de llave).
+GCM_NONCE_SIZE = 12
+
+def parse_aes_keyring(keyring_text):
+    """
+    Convierte el texto de configuración "v1:<64 hex>,v2:<64 hex>" en {'v1': bytes, 'v2': bytes}.
+    Lanza ValueError si el formato o el tamaño de alguna llave es incorrecto.
+    """
+    keys = {}
+    for item in filter(None, (part.strip() for part in keyring_text.split(','))):
+        key_id, _, key_hex = item.partition(':')
+        key = bytes.fromhex(key_hex)
+        if not key_id or len(key) != 32:
+            raise ValueError(f"Llave AES inválida para '{key_id}': se esperan 32 bytes (64 caracteres hex).")
+        keys[key_id] = key
+    return keys
+
+def configure_aes_keys(keys, active_key_id, mode='cbc'):
+    """Instala el llavero AES y define con qué llave y modo se cifran los votos nuevos."""
+    global AES_KEYS, ACTIVE_AES_KEY_ID, ACTIVE_AES_MODE
+    if active_key_id not in keys:
+        raise ValueError(f"La llave activa '{active_key_id}' no está en el llavero.")
+    if mode not in AES_MODES:
+        raise ValueError(f"Modo AES desconocido: {mode}")
+    AES_KEYS = dict(keys)
+    ACTIVE_AES_KEY_ID = active_key_id
+    ACTIVE_AES_MODE = mode
+
+def ciphertext_key_version(encrypted_vote):
+    """
+    Lee el identificador de llave y el modo de un voto cifrado.
+    Retorna (None, None) para los votos antiguos, cifrados antes de que existieran versiones.
+    """
+    parts = (encrypted_vote or '').split(':', 2)
+    if len(parts) != 3:
+        return None, None
+    return parts[0], parts[1]
 
-def encrypt_vote_aes(vote_content):
+def encrypt_vote_aes(vote_content, key_id=None, mode=None):
     """
-    Cifra el contenido del voto con AES-256 en modo CBC.
+    Cifra el contenido del voto con AES-256 (modo CBC o GCM).
     Objetivo: Que nadie pueda leer el voto a simple vista (Confidencialidad).
     """
-    # Preparamos el cifrador con nuestra llave maestra
-    cipher = AES.new(AES_KEY, AES.MODE_CBC)
-    
-    # 1. Rellenamos el texto (pad) para que tenga el tamaño correcto.
-    # 2. Lo encriptamos (lo convertimos en ruido ilegible).
-    ciphertext_bytes = cipher.encrypt(pad(vote_content.encode('utf-8'), BLOCK_SIZE))
-    
-    # Retornamos dos cosas pegadas:
-    # - IV (Vector de Inicialización): Un número aleatorio necesario para abrir el candado después.
-    # - Ciphertext: El voto ya encriptado.
-    return cipher.iv.hex() + ciphertext_bytes.hex()
+    from Crypto.Cipher import AES
+    from Crypto.Random import get_random_bytes
+    from Crypto.Util.Padding import pad
+
+    key_id = key_id or ACTIVE_AES_KEY_ID
+    mode = mode or ACTIVE_AES_MODE
+    data = vote_content.encode('utf-8')
+
+    if mode == 'gcm':
+        # GCM además detecta si alguien alteró el cifrado (etiqueta de autenticación).
+        cipher = AES.new(AES_KEYS[key_id], AES.MODE_GCM, nonce=get_random_bytes(GCM_NONCE_SIZE))
+        ciphertext_bytes, tag = cipher.encrypt_and_digest(data)
+        payload = cipher.nonce + ciphertext_bytes + tag
+    elif mode == 'cbc':
+        # Preparamos el cifrador con la llave activa
+        cipher = AES.new(AES_KEYS[key_id], AES.MODE_CBC)
+        # 1. Rellenamos el texto (pad) para que tenga el tamaño correcto.
+        # 2. Lo encriptamos (lo convertimos en ruido ilegible).
+        # El IV (Vector de Inicialización) va pegado al inicio: se necesita para abrir el candado.
+        payload = cipher.iv + cipher.encrypt(pad(data, BLOCK_SIZE))
+    else:
+        raise ValueError(f"Modo AES desconocido: {mode}")
+
+    return f"{key_id}:{mode}:{payload.hex()}"
+
+def decrypt_vote_aes(encrypted_vote):
+    """
+    Descifra un voto cifrado con encrypt_vote_aes.
+    Lanza ValueError si el voto no tiene versión de llave, si la llave no está en el
+    llavero o si los datos están corruptos.
+    """
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import unpad
+
+    key_id, mode = ciphertext_key_version(encrypted_vote)
+    if key_id is None:
+        raise ValueError("El voto cifrado no indica con qué llave se cifró (formato antiguo).")
+    if key_id not in AES_KEYS:
+        raise ValueError(f"La llave AES '{key_id}' no está en el llavero.")
+
+    payload = bytes.fromhex(encrypted_vote.split(':', 2)[2])
+    key = AES_KEYS[key_id]
+
+    if mode == 'gcm':
+        nonce, ciphertext_bytes, tag = payload[:GCM_NONCE_SIZE], payload[GCM_NONCE_SIZE:-16], payload[-16:]
+        data = AES.new(key, AES.MODE_GCM, nonce=nonce).decrypt_and_verify(ciphertext_bytes, tag)
+    elif mode == 'cbc':
+        iv, ciphertext_bytes = payload[:BLOCK_SIZE], payload[BLOCK_SIZE:]
+        data = unpad(AES.new(key, AES.MODE_CBC, iv=iv).decrypt(ciphertext_bytes), BLOCK_SIZE)
+    else:
+        raise ValueError(f"Modo AES desconocido: {mode}")
+
+    return data.decode('utf-8')
 
 # ---------------------------------------------------------
 # FUNCIONES RSA (Autenticación - La "Firma Digital")
@@ -39,6 +149,8 @@ def generate_rsa_keys():
     Genera un par de llaves RSA de 2048 bits.
     Esto crea la identidad digital del votante.
     """
+    from Crypto.PublicKey import RSA
+
     # Creamos las llaves matemáticamente
     key = RSA.generate(2048)
     
@@ -50,50 +162,287 @@ def generate_rsa_keys():
 
     return public_key_pem.decode('utf-8'), private_key_pem.decode('utf-8')
 
-def sign_vote(vote_content, private_key_pem):
+def rsa_sign(vote_content, private_key_pem):
+    """
+    Firma el voto con RSA (PKCS#1 v1.5 sobre SHA-256).
+    Acepta la llave en PEM o ya cargada (load_private_key).
+    """
+    from Crypto.Hash import SHA256
+    from Crypto.PublicKey import RSA
+    from Crypto.Signature import pkcs1_15
+
+    # 1. Cargamos la llave privada del usuario (su "bolígrafo" digital)
+    private_key = private_key_pem if isinstance(private_key_pem, RSA.RsaKey) else RSA.import_key(private_key_pem)
+    
+    # 2. Creamos un HASH (una huella digital única) del contenido del voto.
+    # Si el voto cambia aunque sea una letra, este hash cambia totalmente.
+    h = SHA256.new(vote_content.encode('utf-8'))
+    
+    # 3. Firmamos ese hash con la llave privada.
+    signer = pkcs1_15.new(private_key)
+    return signer.sign(h)
+
+def rsa_verify(vote_content, signature, public_key_pem):
+    """
+    Verifica una firma RSA. Lanza ValueError si no es válida.
+    """
+    from Crypto.Hash import SHA256
+    from Crypto.PublicKey import RSA
+    from Crypto.Signature import pkcs1_15
+
+    # 1. Cargamos la Llave Pública del votante (que tenemos guardada en la BD)
+    public_key = RSA.import_key(public_key_pem)
+
+    # 2. Volvemos a calcular el Hash del voto que estamos viendo
+    h = SHA256.new(vote_content.encode('utf-8'))
+
+    # 3. El momento de la verdad:
+    # Comparamos el hash del voto actual con la firma descifrada.
+    # Si coinciden, es auténtico. Si no, alguien manipuló el voto.
+    pkcs1_15.new(public_key).verify(h, signature)
+
+def rsa_public_key_from_private(private_key_pem):
+    """Deriva la llave pública RSA (PEM) a partir de la privada."""
+    from Crypto.PublicKey import RSA
+    return RSA.import_key(private_key_pem).publickey().export_key('PEM').decode('utf-8')
+
+def rsa_load_private_der(key_der):
+    """
+    Carga una llave privada RSA en DER (PKCS#1 o PKCS#8).
+    RSA.import_key haría además dos pruebas de primalidad (p y q): son casi todo su costo
+    (~25 ms). Aquí hacemos las revisiones baratas (p·q = n, e·d ≡ 1) y omitimos esas dos:
+    quien la use compara la huella pública con la registrada (public_key_fingerprint), y si
+    n es el módulo registrado, su única factorización es la de dos primos.
+    """
+    import math
+    from Crypto.IO import PKCS8
+    from Crypto.PublicKey import RSA
+    from Crypto.Util.asn1 import DerSequence
+
+    fields = DerSequence().decode(key_der)
+    if not fields.hasOnlyInts():
+        # PKCS#8: la llave PKCS#1 viene envuelta (OCTET STRING)
+        oid, key_der, _ = PKCS8.unwrap(key_der)
+        if oid != SIGNATURE_SCHEMES['RSA']['oid']:
+            raise ValueError("La llave no es de tipo RSA.")
+        fields = DerSequence().decode(key_der)
+    if len(fields) != 9 or not fields.hasOnlyInts() or fields[0] != 0:
+        raise ValueError("Llave privada RSA inválida.")
+
+    n, e, d, p, q = fields[1:6]
+    if not (1 < e < n and 1 < d < n and n & 1 and p > 1 and q > 1 and p * q == n):
+        raise ValueError("Llave privada RSA inválida.")
+    lcm = (p - 1) * (q - 1) // math.gcd(p - 1, q - 1)
+    if e * d % lcm != 1:
+        raise ValueError("Llave privada RSA inválida.")
+    return RSA.construct((n, e, d, p, q), consistency_check=False)
+
+# ---------------------------------------------------------
+# FUNCIONES Ed25519 (Firma Digital Rápida)
+# ---------------------------------------------------------
+# Ed25519 es una firma de curva elíptica: generar la llave toma microsegundos
+# (RSA-2048 tarda cientos de milisegundos) y la firma mide 64 bytes en vez de 256.
+
+def generate_ed25519_keys():
+    """
+    Genera un par de llaves Ed25519.
+    Mismo formato de salida que generate_rsa_keys: (pública PEM, privada PEM).
+    """
+    from Crypto.PublicKey import ECC
+    key = ECC.generate(curve='Ed25519')
+    private_key_pem = key.export_key(format='PEM')
+    public_key_pem = key.public_key().export_key(format='PEM')
+    return public_key_pem, private_key_pem
+
+def _import_ed25519_key(key_pem):
+    """Carga una llave ECC y se asegura de que sea de la curva Ed25519."""
+    from Crypto.PublicKey import ECC
+    if isinstance(key_pem, ECC.EccKey):
+        key = key_pem
+    else:
+        key = ECC.import_key(key_pem)
+    if key.curve != 'Ed25519':
+        raise ValueError("La llave no es de tipo Ed25519.")
+    return key
+
+def ed25519_sign(vote_content, private_key_pem):
+    """
+    Firma el voto con Ed25519 (RFC 8032).
+    Ed25519 calcula internamente su propio hash (SHA-512), así que firmamos el texto.
+    Acepta la llave en PEM o ya cargada (load_private_key).
+    """
+    from Crypto.Signature import eddsa
+    private_key = _import_ed25519_key(private_key_pem)
+    return eddsa.new(private_key, 'rfc8032').sign(vote_content.encode('utf-8'))
+
+def ed25519_verify(vote_content, signature, public_key_pem):
+    """
+    Verifica una firma Ed25519. Lanza ValueError si no es válida.
+    """
+    from Crypto.Signature import eddsa
+    public_key = _import_ed25519_key(public_key_pem)
+    eddsa.new(public_key, 'rfc8032').verify(vote_content.encode('utf-8'), signature)
+
+def ed25519_public_key_from_private(private_key_pem):
+    """Deriva la llave pública Ed25519 (PEM) a partir de la privada."""
+    return _import_ed25519_key(private_key_pem).public_key().export_key(format='PEM')
+
+def ed25519_load_private_der(key_der):
+    """Carga una llave privada Ed25519 en DER (PKCS#8)."""
+    key = _import_ed25519_key(key_der)
+    if not key.has_private():
+        raise ValueError("El archivo tiene una llave pública, no la privada.")
+    return key
+
+# ---------------------------------------------------------
+# REGISTRO DE ALGORITMOS DE FIRMA
+# ---------------------------------------------------------
+# Cada votante guarda en su perfil qué algoritmo usa (VoterProfile.signature_algorithm).
+# Aquí asociamos ese nombre con sus funciones. Para agregar un algoritmo nuevo
+# basta con escribir sus 5 funciones y registrarlo en este diccionario
+# ('oid' es el identificador del algoritmo dentro de una llave PKCS#8).
+SIGNATURE_SCHEMES = {
+    'RSA': {
+        'label': 'RSA-2048 (PKCS#1 v1.5)',
+        'oid': '1.2.840.113549.1.1.1',
+        'generate': generate_rsa_keys,
+        'sign': rsa_sign,
+        'verify': rsa_verify,
+        'public_from_private': rsa_public_key_from_private,
+        'load_private_der': rsa_load_private_der,
+    },
+    'ED25519': {
+        'label': 'Ed25519',
+        'oid': '1.3.101.112',
+        'generate': generate_ed25519_keys,
+        'sign': ed25519_sign,
+        'verify': ed25519_verify,
+        'public_from_private': ed25519_public_key_from_private,
+        'load_private_der': ed25519_load_private_der,
+    },
+}
+
+# Algoritmo que tienen los votantes creados antes de que existiera el registro.
+DEFAULT_SIGNATURE_ALGORITHM = 'RSA'
+
+def get_signature_scheme(algorithm):
+    """Devuelve las funciones del algoritmo pedido o lanza ValueError si no existe."""
+    try:
+        return SIGNATURE_SCHEMES[algorithm]
+    except KeyError:
+        raise ValueError(f"Algoritmo de firma desconocido: {algorithm}")
+
+def generate_keys(algorithm=DEFAULT_SIGNATURE_ALGORITHM):
+    """
+    Genera un par de llaves con el algoritmo indicado.
+    Retorna (llave pública PEM, llave privada PEM).
+    """
+    return get_signature_scheme(algorithm)['generate']()
+
+def public_key_from_private(private_key_pem):
+    """
+    Deriva la llave pública desde una privada, detectando el algoritmo.
+    Retorna (algoritmo, llave pública PEM). Lanza ValueError si el archivo no es
+    una llave privada de ningún algoritmo registrado.
+    """
+    for algorithm, scheme in SIGNATURE_SCHEMES.items():
+        try:
+            return algorithm, scheme['public_from_private'](private_key_pem)
+        except (ValueError, IndexError, TypeError):
+            continue
+    raise ValueError("El archivo no contiene una llave privada válida.")
+
+# ---------------------------------------------------------
+# LLAVES PRIVADAS SUBIDAS (PEM o DER, PKCS#1 o PKCS#8)
+# ---------------------------------------------------------
+# Al votar (o al revisar la llave) cargamos la llave UNA sola vez y leemos su algoritmo
+# de la propia estructura ASN.1, en lugar de probar un algoritmo tras otro. Para saber si
+# es la llave del votante comparamos huellas (SHA-256) de la llave pública en DER: la de
+# la llave subida contra la de la pública guardada, que solo se decodifica de base64
+# (sin cargarla ni re-exportarla a PEM).
+PEM_PRIVATE_KEY_MARKERS = {
+    'RSA PRIVATE KEY': 'RSA',   # PKCS#1: solo puede ser RSA
+    'PRIVATE KEY': None,        # PKCS#8: el algoritmo viene dentro (OID)
+}
+
+def _algorithm_from_der(key_der):
+    """Lee el algoritmo de una llave privada DER: PKCS#1 (RSA) o PKCS#8 (por su OID)."""
+    from Crypto.Util.asn1 import DerObjectId, DerSequence
+
+    fields = DerSequence().decode(key_der)
+    if len(fields) >= 3 and isinstance(fields[1], bytes):
+        # PKCS#8: SEQUENCE { versión, SEQUENCE { OID, ... }, OCTET STRING llave }
+        oid = DerObjectId().decode(DerSequence().decode(fields[1])[0]).value
+        for algorithm, scheme in SIGNATURE_SCHEMES.items():
+            if scheme['oid'] == oid:
+                return algorithm
+        raise ValueError(f"Algoritmo de llave no soportado (OID {oid}).")
+    if len(fields) == 9 and fields.hasOnlyInts():
+        # PKCS#1 RSAPrivateKey: versión, n, e, d, p, q, dP, dQ, qInv
+        return 'RSA'
+    raise ValueError("El archivo no contiene una llave privada válida.")
+
+def load_private_key(key_data):
+    """
+    Carga una llave privada desde los bytes de un archivo: PEM o DER (binario),
+    en formato PKCS#1 (RSA) o PKCS#8 (RSA y Ed25519).
+    Retorna (algoritmo, llave). Lanza ValueError si no es una llave privada de un algoritmo registrado.
+    """
+    from Crypto.IO import PEM
+
+    try:
+        if key_data.lstrip()[:1] == b'-':
+            key_der, marker, encrypted = PEM.decode(key_data.decode('ascii'))
+            if encrypted or marker not in PEM_PRIVATE_KEY_MARKERS:
+                raise ValueError("El archivo no contiene una llave privada sin contraseña.")
+            algorithm = PEM_PRIVATE_KEY_MARKERS[marker] or _algorithm_from_der(key_der)
+        else:
+            key_der = bytes(key_data)
+            algorithm = _algorithm_from_der(key_der)
+        return algorithm, SIGNATURE_SCHEMES[algorithm]['load_private_der'](key_der)
+    except (ValueError, IndexError, TypeError, UnicodeDecodeError) as e:
+        raise ValueError("El archivo no contiene una llave privada válida.") from e
+
+def public_key_fingerprint(key):
+    """Huella SHA-256 (hex) de la llave pública en DER (SubjectPublicKeyInfo) de una llave cargada."""
+    import hashlib
+    return hashlib.sha256(key.public_key().export_key(format='DER')).hexdigest()
+
+def public_pem_fingerprint(public_key_pem):
+    """
+    Huella de una llave pública PEM guardada: el PEM es el mismo DER en base64,
+    así que basta con decodificarlo. Coincide con public_key_fingerprint de su llave privada.
+    """
+    import base64
+    import hashlib
+    body = ''.join(line for line in public_key_pem.strip().splitlines() if not line.startswith('-----'))
+    return hashlib.sha256(base64.b64decode(body)).hexdigest()
+
+def sign_vote(vote_content, private_key_pem, algorithm=DEFAULT_SIGNATURE_ALGORITHM):
     """
     Firma el voto digitalmente.
     Objetivo: Garantizar que el voto vino de este usuario y no fue modificado (No Repudio).
+    La llave puede ser el texto PEM o la llave ya cargada con load_private_key.
     """
+    scheme = get_signature_scheme(algorithm)
     try:
-        # 1. Cargamos la llave privada del usuario (su "bolígrafo" digital)
-        private_key = RSA.import_key(private_key_pem)
-        
-        # 2. Creamos un HASH (una huella digital única) del contenido del voto.
-        # Si el voto cambia aunque sea una letra, este hash cambia totalmente.
-        h = SHA256.new(vote_content.encode('utf-8'))
-        
-        # 3. Firmamos ese hash con la llave privada.
-        signer = pkcs1_15.new(private_key)
-        signature = signer.sign(h)
-        
+        signature = scheme['sign'](vote_content, private_key_pem)
         return signature.hex()
     
-    except ValueError as e:
+    except (ValueError, IndexError, TypeError) as e:
         raise ValueError("Error al cargar o usar la llave privada. Asegúrese de que el archivo es correcto.") from e
 
-def verify_signature(vote_content, signature_hex, public_key_pem):
+def verify_signature(vote_content, signature_hex, public_key_pem, algorithm=DEFAULT_SIGNATURE_ALGORITHM):
     """
     Verifica la firma.
     Objetivo: El sistema comprueba si la firma es válida usando la llave pública.
     """
+    scheme = get_signature_scheme(algorithm)
     try:
-        # 1. Cargamos la Llave Pública del votante (que tenemos guardada en la BD)
-        public_key = RSA.import_key(public_key_pem)
-
-        # 2. Volvemos a calcular el Hash del voto que estamos viendo
-        h = SHA256.new(vote_content.encode('utf-8'))
-        
-        # 3. Convertimos la firma que recibimos de hexadecimal a bytes reales
+        # Convertimos la firma que recibimos de hexadecimal a bytes reales
         signature = bytes.fromhex(signature_hex)
-
-        # 4. El momento de la verdad:
-        # Comparamos el hash del voto actual con la firma descifrada.
-        # Si coinciden, es auténtico. Si no, alguien manipuló el voto.
-        verifier = pkcs1_15.new(public_key)
-        verifier.verify(h, signature)
-        
+        scheme['verify'](vote_content, signature, public_key_pem)
         return True # ¡Firma válida!
 
     except (ValueError, TypeError):
-        return False # Firma inválida o corrupta
\ No newline at end of file
+        return False # Firma inválida o corrupta
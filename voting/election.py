@@ -0,0 +1,256 @@
+import gzip
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connections, transaction
+from django.template.loader import render_to_string
+
+from .crypto_utils import generate_keys, sign_vote, verify_signature
+from .models import ElectionClosure, Vote
+from .queries import dashboard_votes
+from .sharding import scatter, vote_shards
+from .vote_utils import get_legible_label, parse_vote_content
+
+# ---------------------------------------------------------
+# CIERRE DE LA ELECCIÓN Y RESULTADOS FINALES FIRMADOS
+# ---------------------------------------------------------
+# Al cerrar:
+#   1. Se crea la fila ElectionClosure -> desde ese momento no se aceptan más votos.
+#   2. En cada partición se espera a los votos que ya estaban escribiendo (drain_votes).
+#   3. Se cuenta UNA sola vez cada pregunta y el total de votos.
+#   4. El documento de resultados se firma con la llave del servidor.
+#   5. Se publica como archivos estáticos ya comprimidos (JSON y HTML, con su .gz).
+# Después, el tablero solo entrega esos archivos: ya no se cuenta nada por petición.
+#
+# Carrera entre votar y cerrar: la fila de cierre vive en 'default' y el voto en su
+# partición, así que ninguna transacción ve a la otra. Lo resolvemos con un orden fijo:
+#   - Votar (web y kioscos): escribir el voto y DESPUÉS revisar is_election_closed(); si ya
+#     cerró, se deshace la transacción.
+#   - Cerrar: confirmar la fila de cierre y DESPUÉS tomar en cada partición un bloqueo que
+#     choca con cualquier escritura en la tabla de votos (DRAIN_SQL). Ese bloqueo espera a que
+#     terminen los votos que ya escribieron; los que escriban después verán el cierre.
+# Así todo voto confirmado entra en el conteo final.
+
+CLOSED_CACHE_KEY = 'voting:election_closed'
+RESULTS_JSON = 'final_results.json'
+RESULTS_HTML = 'final_results.html'
+
+
+# Sentencias que esperan a las transacciones que escribieron en la tabla de votos, por motor.
+DRAIN_SQL = {
+    # SHARE choca con el ROW EXCLUSIVE que toma cada INSERT.
+    'postgresql': ["LOCK TABLE {table} IN SHARE MODE"],
+    # Una escritura que no toca filas igual pide el candado de escritura de la base.
+    'sqlite': ["DELETE FROM {table} WHERE 0 = 1"],
+    # READ espera el candado de metadatos que cada INSERT de InnoDB guarda hasta su COMMIT.
+    'mysql': ["LOCK TABLES {table} READ", "UNLOCK TABLES"],
+}
+
+
+class ElectionAlreadyClosed(Exception):
+    pass
+
+
+def is_election_closed():
+    """
+    ¿Ya se cerró la elección? El "sí" se guarda en caché para siempre (no se reabre);
+    el "no" se consulta cada vez, para que todos los procesos vean el cierre al instante.
+    """
+    if cache.get(CLOSED_CACHE_KEY):
+        return True
+    closed = ElectionClosure.objects.exists()
+    if closed:
+        cache.set(CLOSED_CACHE_KEY, True, None)
+    return closed
+
+
+def artifact_path(name):
+    return Path(settings.ELECTION_ARTIFACT_DIR) / name
+
+
+def canonical_json(data):
+    """JSON canónico (llaves ordenadas, sin espacios): mismo texto = misma firma."""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def load_signing_key():
+    """
+    Lee la llave privada del servidor (ELECTION_SIGNING_KEY_FILE).
+    Si todavía no existe, la genera y la guarda con permisos solo para el dueño.
+    Retorna (algoritmo, llave pública PEM, llave privada PEM).
+    """
+    algorithm = settings.ELECTION_SIGNING_ALGORITHM
+    key_file = Path(settings.ELECTION_SIGNING_KEY_FILE)
+    public_file = key_file.with_suffix('.pub')
+
+    if not key_file.exists():
+        public_key_pem, private_key_pem = generate_keys(algorithm)
+        key_file.parent.mkdir(parents=True, exist_ok=True)
+        descriptor = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as handle:
+            handle.write(private_key_pem)
+        public_file.write_text(public_key_pem, encoding='utf-8')
+
+    return algorithm, public_file.read_text(encoding='utf-8'), key_file.read_text(encoding='utf-8')
+
+
+def drain_votes(alias):
+    """
+    Espera a que terminen las transacciones de voto en curso en la partición 'alias'.
+    Se llama con el cierre ya confirmado: después de esto ningún voto nuevo se confirma ahí.
+    """
+    connection = connections[alias]
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        for statement in DRAIN_SQL[connection.vendor]:
+            cursor.execute(statement.format(table=connection.ops.quote_name(Vote._meta.db_table)))
+
+
+def compute_final_tally():
+    """
+    Cuenta todas las respuestas de todos los votos, una sola vez.
+    Cada partición (voting/sharding.py) cuenta sus votos al mismo tiempo que las demás,
+    recorriendo su tabla por bloques (iterator) para no cargar millones de votos en memoria;
+    después se suman los conteos parciales.
+    """
+    return merge_tallies(scatter(
+        lambda alias: tally_options(dashboard_votes(alias).iterator(chunk_size=10000))
+    ))
+
+
+def merge_tallies(partial_tallies):
+    """Suma varios resultados de tally_options (uno por partición) en uno solo, con el mismo formato."""
+    total_votes = 0
+    merged = {}
+    for votes, tallies in partial_tallies:
+        total_votes += votes
+        for question, counts in tallies.items():
+            merged.setdefault(question, Counter()).update(counts)
+    return total_votes, {
+        question: {answer: counts[answer] for answer in sorted(counts)}
+        for question, counts in sorted(merged.items())
+    }
+
+
+def tally_options(options):
+    """
+    Cuenta las respuestas de una secuencia de textos de voto ('USUARIO:...|P1:ALTO|...').
+    Retorna (total de votos, {pregunta: {respuesta: cantidad}}) con llaves ordenadas.
+    """
+    tallies = {}
+    total_votes = 0
+    for option in options:
+        total_votes += 1
+        for question, answer in parse_vote_content(option).items():
+            tallies.setdefault(question, Counter())[answer] += 1
+
+    return total_votes, {
+        question: {answer: counts[answer] for answer in sorted(counts)}
+        for question, counts in sorted(tallies.items())
+    }
+
+
+def describe_tallies(total_votes, tallies):
+    """
+    Convierte el conteo de tally_options en una lista lista para mostrar:
+    [{'key': 'P1', 'answers': [{'label': 'Alto', 'count': 3, 'percentage': 60.0}, ...]}, ...]
+    La usan la página final firmada y el JSON del tablero (voting:results_api).
+    """
+    return [
+        {
+            'key': question,
+            'answers': [
+                {
+                    'label': get_legible_label(question, answer),
+                    'count': count,
+                    'percentage': round(count * 100 / total_votes, 1) if total_votes else 0,
+                }
+                for answer, count in counts.items()
+            ],
+        }
+        for question, counts in tallies.items()
+    ]
+
+
+def close_election(closed_by=None):
+    """
+    Cierra la elección y publica los resultados finales firmados.
+    Si un cierre anterior quedó a medias (sin documento), lo termina.
+    Lanza ElectionAlreadyClosed si ya estaba cerrada y publicada.
+    """
+    # Antes de escribir el cierre: un motor sin DRAIN_SQL dejaría la elección cerrada y sin conteo.
+    unsupported = sorted({connections[alias].vendor for alias in vote_shards()} - set(DRAIN_SQL))
+    if unsupported:
+        raise ImproperlyConfigured(f"No sé esperar a los votos en curso en: {', '.join(unsupported)}.")
+    try:
+        with transaction.atomic():
+            closure = ElectionClosure.objects.create(pk=1, closed_by=closed_by)
+    except IntegrityError:
+        closure = ElectionClosure.objects.get(pk=1)
+        if closure.document:
+            raise ElectionAlreadyClosed("La elección ya estaba cerrada.")
+    # A partir de aquí vote_submission_view rechaza votos nuevos.
+    cache.set(CLOSED_CACHE_KEY, True, None)
+    # Los votos que escribieron antes del cierre terminan (y se cuentan) antes del conteo.
+    scatter(drain_votes)
+
+    total_votes, tallies = compute_final_tally()
+    document = {
+        'election': settings.ELECTION_NAME,
+        'closed_at': closure.closed_at.isoformat(),
+        'total_votes': total_votes,
+        'tallies': tallies,
+    }
+    document_text = canonical_json(document)
+
+    algorithm, public_key_pem, private_key_pem = load_signing_key()
+    closure.total_votes = total_votes
+    closure.document = document_text
+    closure.signature = sign_vote(document_text, private_key_pem, algorithm)
+    closure.signature_algorithm = algorithm
+    closure.public_key = public_key_pem
+    closure.save()
+
+    publish_artifacts(closure)
+    return closure
+
+
+def verify_closure(closure):
+    """Comprueba que el documento final no fue alterado desde que se firmó."""
+    return verify_signature(closure.document, closure.signature, closure.public_key, closure.signature_algorithm)
+
+
+def publish_artifacts(closure):
+    """Escribe los archivos finales (JSON y HTML) junto con su versión .gz."""
+    envelope = {
+        'document': json.loads(closure.document),
+        'signed_document': closure.document,
+        'signature': closure.signature,
+        'signature_algorithm': closure.signature_algorithm,
+        'public_key': closure.public_key,
+    }
+    json_bytes = json.dumps(envelope, ensure_ascii=False, indent=2).encode('utf-8')
+
+    document = envelope['document']
+    html_bytes = render_to_string('voting/final_results.html', {
+        'document': document,
+        'questions': describe_tallies(document['total_votes'], document['tallies']),
+        'closure': closure,
+    }).encode('utf-8')
+
+    _write_artifact(RESULTS_JSON, json_bytes)
+    _write_artifact(RESULTS_HTML, html_bytes)
+
+
+def _write_artifact(name, content):
+    """Escritura atómica (archivo temporal + rename), con su copia comprimida al máximo."""
+    path = artifact_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for target, data in ((path, content), (path.with_name(name + '.gz'), gzip.compress(content, 9))):
+        temporary = target.with_name(target.name + '.tmp')
+        temporary.write_bytes(data)
+        os.replace(temporary, target)
@@ -4,6 +4,8 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.core.exceptions import ValidationError
 import re # Importamos el módulo de expresiones regulares
 
+from .queries import registered_users
+
 # ---------------------------------------------------------
 # 1. FORMULARIO DE REGISTRO (CustomRegisterForm)
 # ---------------------------------------------------------
@@ -42,7 +44,7 @@ class CustomRegisterForm(forms.ModelForm):
         Evita duplicados antes de intentar guardar.
         """
         email = self.cleaned_data.get('email')
-        if email and User.objects.filter(username=email).exists():
+        if email and registered_users(email).exists():
             raise ValidationError("Este correo electrónico ya está registrado. Por favor inicia sesión.")
         return email
 
@@ -151,6 +153,6 @@ class CustomLoginForm(AuthenticationForm):
 class KeyCheckForm(forms.Form):
     private_key = forms.FileField(
         label="Selecciona tu archivo de Llave Privada (.key)",
-        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.key,.pem'}),
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.key,.pem,.der'}),
         help_text="Sube el archivo que descargaste al generar tu llave. No guardaremos este archivo."
     )
\ No newline at end of file
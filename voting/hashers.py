@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+
+# ---------------------------------------------------------
+# HASHERS DE CONTRASEÑA CALIBRADOS
+# ---------------------------------------------------------
+# El costo de hashear la contraseña ES el costo del login (y del registro): una
+# verificación por intento. Estos hashers son los de Django, pero sus parámetros
+# vienen de settings (PASSWORD_PBKDF2_*, PASSWORD_SCRYPT_*, PASSWORD_ARGON2_*), que
+# el comando 'calibrate_password_hasher' elige midiendo ESTA máquina.
+#
+# Mismo nombre de algoritmo que los de Django: los hashes ya guardados se siguen
+# reconociendo. Si los parámetros de settings cambian, must_update() lo detecta y
+# Django vuelve a hashear la contraseña en el siguiente login correcto (ver login_view).
+# Los valores por defecto de settings son los de Django 5.2: nada cambia sin calibrar.
+
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class CalibratedScryptPasswordHasher(ScryptPasswordHasher):
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_PARALLELISM
+
+    @property
+    def maxmem(self):
+        # OpenSSL limita scrypt a 32 MB si no se indica otra cosa; scrypt usa 128·r·N bytes
+        # (más un poco por cada vía paralela). Dejamos el doble de margen.
+        return 2 * 128 * self.block_size * (self.work_factor + self.parallelism)
+
+
+class CalibratedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Necesita 'argon2-cffi' instalado (pip install argon2-cffi)."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+from django.utils.functional import SimpleLazyObject
+from django.conf import settings
+
+from .models import VoterProfile
+from .sharding import is_sharded, shard_for_user
+
+# ---------------------------------------------------------
+# CACHÉ DE IDENTIDAD (Usuario + Perfil de Votante)
+# ---------------------------------------------------------
+# Sin esto, cada página autenticada hace 3 o 4 consultas: leer la sesión, cargar el
+# User y luego buscar su VoterProfile. Aquí guardamos el usuario junto con su perfil
+# en la caché de Django, y la sesión usa el motor 'cached_db' (ver settings).
+#
+# Escritura directa (write-through): cuando se guarda un VoterProfile (ej. has_voted
+# o public_key cambian) actualizamos la copia en caché en cuanto la transacción se confirma.
+#
+# OJO: la escritura directa y el borrado solo llegan a la caché de ESTE proceso si la
+# caché es local (LocMemCache). Con varios workers de gunicorn los demás seguirían
+# viendo has_voted, is_staff o is_active viejos hasta IDENTITY_CACHE_TIMEOUT. Por eso la
+# caché de identidad solo se usa si IDENTITY_CACHE_SHARED (Redis, Memcached, base de datos:
+# ver settings); si no, cada petición carga usuario y perfil de la base (una consulta).
+# Aun con caché compartida, votar y generar llaves vuelven a leer el perfil bloqueado
+# dentro de su transacción: la copia en caché nunca decide nada irreversible.
+
+User = get_user_model()
+
+
+def identity_cache_key(user_id):
+    return f"voting:identity:{user_id}"
+
+
+def load_identity(user_id):
+    """
+    Carga el usuario y su perfil en UNA sola consulta (JOIN).
+    Con particiones (voting/sharding.py) el perfil está en otra base: son dos consultas.
+    """
+    if not is_sharded():
+        return User._default_manager.select_related('voterprofile').get(pk=user_id)
+    user = User._default_manager.get(pk=user_id)
+    profile = VoterProfile.objects.using(shard_for_user(user.pk)).filter(user_id=user.pk).first()
+    if profile is not None:
+        user.voterprofile = profile
+    return user
+
+
+def cache_identity(user):
+    cache.set(identity_cache_key(user.pk), user, settings.IDENTITY_CACHE_TIMEOUT)
+
+
+def forget_identity(user_id):
+    cache.delete(identity_cache_key(user_id))
+
+
+def forget_identities(user_ids):
+    """Igual que forget_identity, para muchos usuarios (ej. tras un update() masivo, que no manda señales)."""
+    cache.delete_many([identity_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    Igual que el ModelBackend de Django, pero get_user() (que se llama en CADA petición
+    autenticada) lee primero de la caché. Django sigue verificando el hash de sesión,
+    así que cambiar la contraseña cierra las demás sesiones como siempre.
+    """
+
+    def get_user(self, user_id):
+        if not settings.IDENTITY_CACHE_SHARED:
+            # Caché local a cada proceso: no puede autorizar (staff, activo) con datos viejos.
+            try:
+                user = load_identity(user_id)
+            except User.DoesNotExist:
+                return None
+            return user if self.user_can_authenticate(user) else None
+
+        user = cache.get(identity_cache_key(user_id))
+        if user is None:
+            try:
+                user = load_identity(user_id)
+            except User.DoesNotExist:
+                return None
+            cache_identity(user)
+        return user if self.user_can_authenticate(user) else None
+
+
+def get_voter_profile(user):
+    """
+    Devuelve el perfil de votante del usuario (ya viene en caché con él).
+    Lanza Http404 si no existe, igual que el get_object_or_404 que reemplaza.
+    """
+    if not user.is_authenticated:
+        raise Http404("El usuario no ha iniciado sesión.")
+    try:
+        return user.voterprofile
+    except VoterProfile.DoesNotExist:
+        raise Http404("No existe un perfil de votante para este usuario.")
+
+
+class VoterProfileMiddleware:
+    """
+    Expone request.voter_profile: se carga solo si la vista lo usa.
+    Va después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.voter_profile = SimpleLazyObject(lambda: get_voter_profile(request.user))
+        return self.get_response(request)
+
+
+# ---------------------------------------------------------
+# SEÑALES: mantener la caché al día
+# ---------------------------------------------------------
+@receiver(post_save, sender=VoterProfile)
+def write_through_voter_profile(sender, instance, **kwargs):
+    def refresh():
+        user = instance.user
+        # Enlazamos el perfil recién guardado al usuario y reemplazamos la copia en caché.
+        user.voterprofile = instance
+        cache_identity(user)
+    # Solo después del COMMIT (en la base del perfil, que puede ser una partición):
+    # si la transacción se revierte, la caché no miente.
+    transaction.on_commit(refresh, using=instance._state.db)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_identity(sender, instance, **kwargs):
+    # Cambió el usuario (contraseña, last_login, is_staff...): la próxima petición lo recarga.
+    transaction.on_commit(lambda: forget_identity(instance.pk))
+
+
+@receiver(post_delete, sender=VoterProfile)
+def forget_profile_identity(sender, instance, **kwargs):
+    transaction.on_commit(lambda: forget_identity(instance.user_id), using=instance._state.db)
@@ -0,0 +1,115 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+
+from .crypto_utils import load_private_key
+
+# ---------------------------------------------------------
+# SUBIDA DE LA LLAVE PRIVADA (votar y "verificar llave")
+# ---------------------------------------------------------
+# Una llave privada pesa unos cientos de bytes (Ed25519) o un par de KB (RSA), pero el
+# formulario acepta cualquier archivo. Antes se leía completo en memoria y se decodificaba
+# como texto antes de rechazarlo. Este manejador de subidas (settings.FILE_UPLOAD_HANDLERS)
+# revisa el archivo MIENTRAS llega, por bloques:
+#   - Guarda como máximo PRIVATE_KEY_UPLOAD_MAX_BYTES; si el archivo es más grande deja de
+#     guardar (el resto se descarta sin acumularse) y lo marca como rechazado.
+#   - Con los primeros bytes sabe si parece una llave: PEM ("-----BEGIN") o DER (SEQUENCE, 0x30).
+#     Si no, también deja de guardar desde ese momento.
+# La vista recibe un archivo pequeño en memoria y read_private_key lo convierte en llave.
+
+# Campos de formulario que traen una llave privada.
+PRIVATE_KEY_FIELDS = ('private_key',)
+
+DER_SEQUENCE_TAG = 0x30
+PEM_PREFIX = b'-----BEGIN'
+# Bytes necesarios para decidir si el archivo parece una llave (BOM y espacios iniciales incluidos).
+SNIFF_BYTES = 64
+
+
+class KeyUploadError(ValueError):
+    pass
+
+
+def looks_like_key(head):
+    """¿Los primeros bytes del archivo pueden ser una llave en PEM o DER?"""
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if not text:
+        return True  # Solo espacios por ahora: decidimos con el siguiente bloque.
+    if text[0] == DER_SEQUENCE_TAG:
+        return True
+    return PEM_PREFIX.startswith(text[:len(PEM_PREFIX)])
+
+
+class PrivateKeyUpload(InMemoryUploadedFile):
+    """Archivo de llave ya recibido: su contenido (acotado) y, si se rechazó, el motivo."""
+
+    def __init__(self, content, rejection, field_name, name, content_type, size, charset, content_type_extra=None):
+        super().__init__(BytesIO(content), field_name, name, content_type, size, charset, content_type_extra)
+        self.rejection = rejection
+
+
+class PrivateKeyUploadHandler(FileUploadHandler):
+    """
+    Manejador de subidas para los campos de PRIVATE_KEY_FIELDS (los demás archivos pasan
+    a los manejadores normales de Django). Memoria máxima: el límite más un bloque.
+    """
+    active = False
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name in PRIVATE_KEY_FIELDS
+        if not self.active:
+            return
+        self.max_bytes = settings.PRIVATE_KEY_UPLOAD_MAX_BYTES
+        self.buffer = bytearray()
+        self.rejection = None
+        # Solo este manejador recibe el archivo: los de Django no crean su copia.
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.rejection is None:
+            if start + len(raw_data) > self.max_bytes:
+                self.rejection = f"El archivo pesa más de {self.max_bytes} bytes: no es una llave privada."
+            else:
+                self.buffer += raw_data
+                if not looks_like_key(bytes(self.buffer[:SNIFF_BYTES])):
+                    self.rejection = "El archivo no es una llave (se espera PEM o DER)."
+            if self.rejection is not None:
+                self.buffer = bytearray()
+        # None: el bloque no pasa a ningún otro manejador (no se acumula en otro lado).
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        return PrivateKeyUpload(
+            bytes(self.buffer), self.rejection, self.field_name, self.file_name,
+            self.content_type, file_size, self.charset, self.content_type_extra,
+        )
+
+
+def read_private_key(uploaded_file):
+    """
+    Convierte el archivo subido en (algoritmo, llave) con load_private_key.
+    Lanza KeyUploadError si el archivo se rechazó al recibirlo, es demasiado grande
+    o no es una llave privada válida.
+    """
+    rejection = getattr(uploaded_file, 'rejection', None)
+    if rejection:
+        raise KeyUploadError(rejection)
+
+    # Por si el archivo no pasó por PrivateKeyUploadHandler: nunca leemos más del límite.
+    max_bytes = settings.PRIVATE_KEY_UPLOAD_MAX_BYTES
+    uploaded_file.seek(0)
+    key_data = uploaded_file.read(max_bytes + 1)
+    if len(key_data) > max_bytes:
+        raise KeyUploadError(f"El archivo pesa más de {max_bytes} bytes: no es una llave privada.")
+
+    try:
+        return load_private_key(key_data)
+    except ValueError as e:
+        raise KeyUploadError(str(e)) from e
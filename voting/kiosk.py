@@ -0,0 +1,284 @@
+import hmac
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .audit_log import record_event
+from .crypto_utils import encrypt_vote_aes, verify_signature
+from .election import is_election_closed
+from .identity import forget_identities
+from .models import AuditEvent, Vote, VoterProfile
+from .sharding import group_by_shard, scatter
+from .vote_utils import is_canonical_vote
+
+# ---------------------------------------------------------
+# API DE KIOSCOS (boletas firmadas por lote)
+# ---------------------------------------------------------
+# Las casillas presenciales firman las boletas en el kiosco y las mandan en lotes:
+#   POST /voting/api/kiosk/ballots/   (Authorization: Bearer <token>)
+#   {"ballots": [{"voter_id": 12, "content": "USUARIO:...|P1:...", "signature": "<hex>"}, ...]}
+# Con un voto por petición serían N viajes, N transacciones y N INSERT. Aquí el lote completo:
+#   1. Carga los perfiles de todos los votantes en UNA consulta.
+#   2. Verifica las firmas en varios procesos (pool de KIOSK_VERIFY_WORKERS).
+#   3. Dentro de una transacción, bloquea y revisa has_voted de todos los votantes
+#      en UNA consulta, inserta con UN bulk_create y marca con UN update().
+# Con particiones (voting/sharding.py) los pasos 1 y 3 se hacen una vez por partición,
+# todas al mismo tiempo: cada transacción toca una sola base.
+# Cada boleta tiene su propio resultado ('accepted' o 'rejected' con el motivo):
+# una boleta mala no tumba al resto del lote.
+
+# Motivos de rechazo (el kiosco los muestra o reintenta según el caso).
+INVALID_FORMAT = 'invalid_format'
+UNKNOWN_VOTER = 'unknown_voter'
+NO_PUBLIC_KEY = 'no_public_key'
+INVALID_CONTENT = 'invalid_content'
+INVALID_SIGNATURE = 'invalid_signature'
+DUPLICATE_IN_BATCH = 'duplicate_in_batch'
+ALREADY_VOTED = 'already_voted'
+ELECTION_CLOSED = 'election_closed'
+
+# Largo máximo del texto del voto (la columna Vote.option).
+MAX_CONTENT_LENGTH = Vote._meta.get_field('option').max_length
+
+
+class KioskBatchError(ValueError):
+    """El lote completo se rechaza. 'status' es el código HTTP que responde la vista."""
+    status = 400
+
+
+class ElectionClosedError(KioskBatchError):
+    status = 409
+
+
+def parse_kiosk_tokens(tokens_text):
+    """Convierte 'casilla-1:token,casilla-2:token' en {'casilla-1': 'token', ...}."""
+    tokens = {}
+    for entry in tokens_text.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, token = entry.partition(':')
+        if not name or not token:
+            raise ValueError(f"Token de kiosco inválido: '{entry}' (se espera nombre:token).")
+        tokens[name.strip()] = token.strip()
+    return tokens
+
+
+def authenticate_kiosk(request):
+    """
+    Retorna el nombre del kiosco si el token 'Bearer' es uno de KIOSK_API_TOKENS, o None.
+    Se comparan todos los tokens con compare_digest (tiempo constante).
+    """
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    kiosk_name = None
+    for name, expected in parse_kiosk_tokens(settings.KIOSK_API_TOKENS).items():
+        if hmac.compare_digest(token.strip().encode(), expected.encode()):
+            kiosk_name = name
+    return kiosk_name
+
+
+# --- Verificación de firmas en paralelo ---
+# El pool se crea la primera vez que llega un lote grande y se reutiliza en las
+# siguientes peticiones del mismo worker (crear procesos en cada petición cuesta más
+# que verificar el lote). Los procesos solo ejecutan verify_signature: no tocan la BD.
+_verify_pool = None
+_verify_pool_workers = 0
+
+
+def _get_verify_pool(workers):
+    global _verify_pool, _verify_pool_workers
+    if _verify_pool is None or _verify_pool_workers != workers:
+        if _verify_pool is not None:
+            _verify_pool.shutdown(wait=False)
+        _verify_pool = ProcessPoolExecutor(max_workers=workers)
+        _verify_pool_workers = workers
+    return _verify_pool
+
+
+def _discard_verify_pool():
+    global _verify_pool
+    if _verify_pool is not None:
+        _verify_pool.shutdown(wait=False)
+    _verify_pool = None
+
+
+def verify_signatures(jobs):
+    """
+    Verifica una lista de (contenido, firma hex, llave pública, algoritmo).
+    Retorna una lista de True/False en el mismo orden.
+    """
+    columns = list(zip(*jobs)) or [(), (), (), ()]
+    workers = settings.KIOSK_VERIFY_WORKERS
+    if workers > 1 and len(jobs) >= settings.KIOSK_PARALLEL_MIN_BATCH:
+        # Bloques grandes (unos 4 por proceso) para pagar poco en comunicación entre procesos.
+        chunksize = max(1, len(jobs) // (workers * 4))
+        try:
+            return list(_get_verify_pool(workers).map(verify_signature, *columns, chunksize=chunksize))
+        except BrokenProcessPool:
+            # Un proceso del pool murió: lo descartamos y este lote se verifica aquí mismo.
+            _discard_verify_pool()
+    return list(map(verify_signature, *columns))
+
+
+def _read_ballot(ballot):
+    """Valida la forma de una boleta del JSON. Retorna (voter_id, contenido, firma) o None."""
+    if not isinstance(ballot, dict):
+        return None
+    voter_id, content, signature = ballot.get('voter_id'), ballot.get('content'), ballot.get('signature')
+    if not isinstance(voter_id, int) or isinstance(voter_id, bool):
+        return None
+    if not isinstance(content, str) or not isinstance(signature, str) or not signature:
+        return None
+    return voter_id, content, signature.strip().lower()
+
+
+def submit_ballot_batch(ballots, request=None, kiosk_name=None):
+    """
+    Procesa un lote de boletas ya firmadas. Retorna una lista con un resultado por boleta:
+    {'index': 0, 'voter_id': 12, 'status': 'accepted', 'vote_id': 345}
+    {'index': 1, 'voter_id': 13, 'status': 'rejected', 'reason': 'invalid_signature'}
+    Lanza KioskBatchError si el lote no es una lista válida y ElectionClosedError si la elección está cerrada.
+    Los votos aceptados y las firmas rechazadas quedan en la bitácora (request y kiosk_name
+    solo se usan para eso).
+    """
+    if not isinstance(ballots, list) or not ballots:
+        raise KioskBatchError("Se espera una lista 'ballots' con al menos una boleta.")
+    if len(ballots) > settings.KIOSK_MAX_BATCH:
+        raise KioskBatchError(f"El lote tiene {len(ballots)} boletas; el máximo es {settings.KIOSK_MAX_BATCH}.")
+    # Con la elección cerrada no cargamos perfiles ni verificamos firmas. La revisión después
+    # de escribir (save_shard) queda solo para un cierre que llegue mientras tanto.
+    if is_election_closed():
+        raise ElectionClosedError("La elección ya fue cerrada. No se aceptan más votos.")
+
+    results = []
+    parsed = {}
+    for index, ballot in enumerate(ballots):
+        fields = _read_ballot(ballot)
+        voter_id = fields[0] if fields else (ballot.get('voter_id') if isinstance(ballot, dict) else None)
+        results.append({'index': index, 'voter_id': voter_id, 'status': 'rejected', 'reason': INVALID_FORMAT})
+        if fields:
+            parsed[index] = fields
+
+    def reject(index, reason):
+        results[index]['reason'] = reason
+
+    # 1. Todos los perfiles del lote en una consulta por partición, y sus usuarios
+    #    (para el nombre del voto) en otra, en 'default'.
+    voter_ids_by_shard = group_by_shard({voter_id for voter_id, _, _ in parsed.values()})
+    profiles = {}
+    for shard_profiles in scatter(
+            lambda alias: VoterProfile.objects.using(alias).in_bulk(voter_ids_by_shard[alias]), voter_ids_by_shard):
+        profiles.update(shard_profiles)
+    usernames = dict(User.objects.filter(pk__in={profile.user_id for profile in profiles.values()})
+                     .values_list('pk', 'username'))
+
+    # Filtros baratos antes de verificar firmas (lo caro del lote).
+    seen_voters = set()
+    candidates = []
+    for index, (voter_id, content, signature) in parsed.items():
+        profile = profiles.get(voter_id)
+        if profile is None or profile.user_id not in usernames:
+            reject(index, UNKNOWN_VOTER)
+        elif voter_id in seen_voters:
+            reject(index, DUPLICATE_IN_BATCH)
+        elif profile.has_voted:
+            reject(index, ALREADY_VOTED)
+        elif not profile.public_key:
+            reject(index, NO_PUBLIC_KEY)
+        elif len(content) > MAX_CONTENT_LENGTH or not is_canonical_vote(content, usernames.get(profile.user_id)):
+            reject(index, INVALID_CONTENT)
+        else:
+            candidates.append(index)
+        seen_voters.add(voter_id)
+
+    # 2. Firmas en paralelo.
+    valid = verify_signatures([
+        (parsed[index][1], parsed[index][2], profiles[parsed[index][0]].public_key, profiles[parsed[index][0]].signature_algorithm)
+        for index in candidates
+    ])
+    verified = []
+    for index, is_valid in zip(candidates, valid):
+        if is_valid:
+            verified.append(index)
+        else:
+            reject(index, INVALID_SIGNATURE)
+
+    # El cifrado va fuera de la transacción (no necesita el bloqueo).
+    encrypted = {index: encrypt_vote_aes(parsed[index][1]) for index in verified}
+
+    # 3. Guardado: por partición, una consulta para bloquear y revisar, un INSERT y un UPDATE.
+    verified_by_shard = {}
+    for index in verified:
+        verified_by_shard.setdefault(profiles[parsed[index][0]]._state.db, []).append(index)
+
+    def save_shard(alias):
+        """Guarda las boletas verificadas de una partición. Retorna {índice: ID del voto o motivo}."""
+        indexes = verified_by_shard[alias]
+        with transaction.atomic(using=alias):
+            # Revisamos de nuevo has_voted, ahora con los perfiles bloqueados: el votante pudo
+            # votar en la web (u otro kiosco) mientras verificábamos las firmas.
+            still_open = set(
+                VoterProfile.objects.using(alias).select_for_update()
+                .filter(pk__in=[parsed[index][0] for index in indexes], has_voted=False)
+                .values_list('pk', flat=True)
+            )
+            outcome = {index: ALREADY_VOTED for index in indexes if parsed[index][0] not in still_open}
+            accepted = [index for index in indexes if index not in outcome]
+
+            votes = Vote.objects.using(alias).bulk_create([
+                Vote(
+                    voter_id=parsed[index][0],
+                    option=parsed[index][1],
+                    digital_signature=parsed[index][2],
+                    encrypted_vote=encrypted[index],
+                )
+                for index in accepted
+            ], batch_size=500)
+            accepted_voters = [parsed[index][0] for index in accepted]
+            VoterProfile.objects.using(alias).filter(pk__in=accepted_voters).update(has_voted=True)
+
+            # Igual que en la web: revisamos el cierre DESPUÉS de escribir. close_election espera
+            # a esta transacción antes de contar; si ya cerró, deshacemos el lote entero.
+            if is_election_closed():
+                transaction.set_rollback(True, using=alias)
+                return {index: ELECTION_CLOSED for index in indexes}
+
+            # update() no manda señales: invalidamos a mano la identidad en caché de esos votantes.
+            user_ids = [profiles[voter_id].user_id for voter_id in accepted_voters]
+            transaction.on_commit(lambda: forget_identities(user_ids), using=alias)
+
+        # bulk_create devuelve los IDs en PostgreSQL y SQLite 3.35+.
+        outcome.update((index, vote.pk) for index, vote in zip(accepted, votes))
+        return outcome
+
+    outcomes = {}
+    for shard_outcome in scatter(save_shard, verified_by_shard):
+        outcomes.update(shard_outcome)
+    if outcomes and all(outcome == ELECTION_CLOSED for outcome in outcomes.values()):
+        raise ElectionClosedError("La elección ya fue cerrada. No se aceptan más votos.")
+
+    for index, outcome in outcomes.items():
+        if isinstance(outcome, str):
+            reject(index, outcome)
+        else:
+            result = results[index]
+            del result['reason']
+            result['status'] = 'accepted'
+            result['vote_id'] = outcome
+
+    for result in results:
+        if result['status'] == 'accepted':
+            event_type, extra = AuditEvent.VOTE_CAST, {'vote_id': result['vote_id']}
+        elif result['reason'] == INVALID_SIGNATURE:
+            event_type, extra = AuditEvent.SIGNATURE_FAILED, {'reason': INVALID_SIGNATURE}
+        else:
+            continue
+        profile = profiles[result['voter_id']]
+        record_event(event_type, request, user_id=profile.user_id, username=usernames[profile.user_id],
+                     channel='kiosk', kiosk=kiosk_name, voter_id=profile.pk, **extra)
+    return results
@@ -0,0 +1,122 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from voting.archive import (
+    ArchiveCorrupted, archive_dir, list_segments, next_segment_number, signature_digest, write_segment,
+)
+from voting.election import is_election_closed
+from voting.models import ElectionClosure, Vote
+from voting.sharding import shard_for_object_id, vote_shards
+
+
+class Command(BaseCommand):
+    """
+    Mueve los votos de la elección CERRADA de la tabla voting_vote al archivo frío.
+    1. Escribe segmentos comprimidos (ver voting/archive.py) con los votos aún no archivados.
+    2. Verifica cada segmento (SHA-256) y borra de la tabla viva SOLO los votos cuya firma
+       coincide con la del índice archivado, en lotes con transacciones cortas.
+    Si se interrumpe, al volver a ejecutarlo termina los borrados pendientes y sigue.
+    Con particiones recorre una base tras otra, en orden: sus rangos de IDs son crecientes,
+    así que los segmentos siguen ordenados por ID y cada uno sale de una sola base.
+    Uso: python manage.py archive_ballots --segment-size 50000 --delete-batch 1000
+    """
+    help = "Archiva los votos de la elección cerrada en segmentos comprimidos y los borra de la tabla viva."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segment-size', type=int, default=50000, help="Votos por segmento.")
+        parser.add_argument('--block-size', type=int, default=64,
+                            help="Votos por bloque comprimido (un comprobante descomprime un bloque).")
+        parser.add_argument('--delete-batch', type=int, default=1000, help="Votos borrados por transacción.")
+        parser.add_argument('--pause', type=float, default=0.05, help="Segundos de espera entre lotes de borrado.")
+        parser.add_argument('--keep-live', action='store_true',
+                            help="Solo escribe los segmentos; no borra nada de la tabla viva.")
+
+    def handle(self, *args, **options):
+        if min(options['segment_size'], options['block_size'], options['delete_batch']) < 1:
+            raise CommandError("Los tamaños deben ser mayores que cero.")
+        if not is_election_closed() or not ElectionClosure.objects.exclude(document='').exists():
+            raise CommandError("Solo se archiva una elección cerrada y con resultados firmados (close_election).")
+
+        # Primero terminamos lo que una ejecución anterior haya dejado a medias.
+        if not options['keep_live']:
+            for segment in list_segments():
+                self._purge(segment, options)
+
+        segments = list_segments()
+        last_id = segments[-1].last_id if segments else 0
+        written = 0
+        for alias in vote_shards():
+            while True:
+                records = self._read_records(alias, last_id, options['segment_size'])
+                if not records:
+                    break
+
+                manifest = write_segment(next_segment_number(), records, block_size=options['block_size'])
+                written += manifest['count']
+                last_id = manifest['last_id']
+                self.stdout.write(
+                    f"Segmento {manifest['segment']}: votos #{manifest['first_id']}-#{manifest['last_id']} "
+                    f"({manifest['count']} votos, {manifest['blocks']} bloques)."
+                )
+                if not options['keep_live']:
+                    self._purge(list_segments()[-1], options)
+
+        self.stdout.write(self.style.SUCCESS(f"Archivado completo: {written} votos nuevos en {archive_dir()}."))
+
+    def _read_records(self, alias, last_id, limit):
+        """Los siguientes votos de la partición 'alias', listos para write_segment()."""
+        rows = list(Vote.objects.using(alias).filter(id__gt=last_id).order_by('id').values(
+            'id', 'voter_id', 'voter__user_id', 'option', 'digital_signature', 'encrypted_vote',
+            'timestamp', 'voter__signature_algorithm', 'voter__public_key',
+        )[:limit])
+        # Los usuarios viven en 'default' (no se puede hacer JOIN con otra base).
+        usernames = dict(User.objects.filter(pk__in={row['voter__user_id'] for row in rows})
+                         .values_list('pk', 'username'))
+        return [
+            {
+                'id': row['id'],
+                'voter_id': row['voter_id'],
+                'username': usernames.get(row['voter__user_id']),
+                'option': row['option'],
+                'digital_signature': row['digital_signature'],
+                'encrypted_vote': row['encrypted_vote'],
+                'timestamp': row['timestamp'].isoformat(),
+                'signature_algorithm': row['voter__signature_algorithm'],
+                'public_key': row['voter__public_key'],
+            }
+            for row in rows
+        ]
+
+    def _purge(self, segment, options):
+        """Borra de la tabla viva los votos de un segmento ya archivado y verificado."""
+        alias = shard_for_object_id(segment.first_id)
+        if alias is None:
+            return
+        remaining = Vote.objects.using(alias).filter(id__range=(segment.first_id, segment.last_id))
+        if not remaining.exists():
+            return
+        try:
+            segment.verify_checksums()
+        except ArchiveCorrupted as error:
+            raise CommandError(f"No se borra nada del segmento {segment.number}: {error}")
+
+        archived = segment.index_digests()
+        deleted = 0
+        while True:
+            rows = list(remaining.order_by('id').values_list('id', 'digital_signature')[:options['delete_batch']])
+            if not rows:
+                break
+            for vote_id, signature in rows:
+                if archived.get(vote_id) != signature_digest(signature):
+                    raise CommandError(
+                        f"El voto #{vote_id} no coincide con el segmento {segment.number}: no se borra."
+                    )
+            with transaction.atomic(using=alias):
+                Vote.objects.using(alias).filter(id__in=[vote_id for vote_id, _ in rows]).delete()
+            deleted += len(rows)
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f"Segmento {segment.number}: {deleted} votos borrados de la tabla viva.")
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.crypto_utils import SIGNATURE_SCHEMES, generate_keys, sign_vote, verify_signature
+
+# Voto de ejemplo con el mismo formato que arma vote_submission_view.
+SAMPLE_VOTE = "USUARIO:benchmark@ejemplo.com|P1:ALTO|P2:FACIL|P3:MUCHO|P4:ADECUADO"
+
+
+class Command(BaseCommand):
+    """
+    Compara los algoritmos de firma registrados en crypto_utils.
+    Uso: python manage.py benchmark_signatures --iterations 50
+    """
+    help = "Mide generación de llaves, firma y verificación para cada algoritmo de firma."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20,
+                            help="Repeticiones de firma/verificación por algoritmo.")
+        parser.add_argument('--keygen-iterations', type=int, default=3,
+                            help="Repeticiones de generación de llaves (RSA es lento).")
+        parser.add_argument('--algorithm', action='append', choices=sorted(SIGNATURE_SCHEMES),
+                            help="Limita la prueba a un algoritmo (se puede repetir).")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['keygen_iterations'] < 1:
+            raise CommandError("Las repeticiones deben ser mayores que cero.")
+
+        algorithms = options['algorithm'] or list(SIGNATURE_SCHEMES)
+
+        self.stdout.write(f"{'Algoritmo':<10} {'keygen/s':>12} {'firma/s':>12} {'verif/s':>12} {'bytes firma':>12}")
+        for algorithm in algorithms:
+            keygen_rate, (public_pem, private_pem) = self._measure(
+                lambda: generate_keys(algorithm), options['keygen_iterations'])
+            sign_rate, signature_hex = self._measure(
+                lambda: sign_vote(SAMPLE_VOTE, private_pem, algorithm), options['iterations'])
+            verify_rate, is_valid = self._measure(
+                lambda: verify_signature(SAMPLE_VOTE, signature_hex, public_pem, algorithm), options['iterations'])
+
+            if not is_valid:
+                raise CommandError(f"La firma {algorithm} no se pudo verificar.")
+
+            self.stdout.write(
+                f"{algorithm:<10} {keygen_rate:>12.1f} {sign_rate:>12.1f} {verify_rate:>12.1f} {len(signature_hex) // 2:>12}"
+            )
+
+    def _measure(self, operation, iterations):
+        """Ejecuta la operación N veces; devuelve (operaciones por segundo, último resultado)."""
+        start = time.perf_counter()
+        for _ in range(iterations):
+            result = operation()
+        elapsed = time.perf_counter() - start
+        return iterations / elapsed, result
@@ -0,0 +1,192 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+
+SAMPLE_PASSWORD = 'Calibracion#2026'
+SAMPLE_SALT = 'calibracionsal0123456789'
+
+# Orden de preferencia cuando se pide '--use best': el más resistente a GPUs primero.
+ALGORITHMS = ('argon2', 'scrypt', 'pbkdf2_sha256')
+
+
+def time_hash(hasher, repeat):
+    """Mejor tiempo (en segundos) de hashear la contraseña de ejemplo: lo que cuesta un login."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hasher.encode(SAMPLE_PASSWORD, SAMPLE_SALT)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate_pbkdf2(target, memory_kib, repeat):
+    """PBKDF2 crece en línea recta con las iteraciones: medimos un punto y escalamos."""
+    hasher = PBKDF2PasswordHasher()
+    hasher.iterations = 100_000
+    per_iteration = time_hash(hasher, repeat) / hasher.iterations
+    # Redondeado a decenas de miles (más fácil de leer en settings).
+    hasher.iterations = max(10_000, int(target / per_iteration) // 10_000 * 10_000)
+    elapsed = time_hash(hasher, repeat)
+    if elapsed > target and hasher.iterations > 10_000:
+        # Con muchas iteraciones la medición corta se quedó baja: corregimos una vez.
+        hasher.iterations = max(10_000, int(hasher.iterations * target / elapsed) // 10_000 * 10_000)
+        elapsed = time_hash(hasher, repeat)
+    return {'PASSWORD_PBKDF2_ITERATIONS': hasher.iterations}, elapsed, 0
+
+
+def calibrate_scrypt(target, memory_kib, repeat):
+    """
+    scrypt: la memoria es 128·r·N bytes. Fijamos r=8 y p=1 y doblamos N mientras
+    quepa en la memoria permitida y no pase del tiempo objetivo.
+    """
+    hasher = ScryptPasswordHasher()
+    hasher.block_size, hasher.parallelism = 8, 1
+    chosen, chosen_time = None, None
+    work_factor = 2**12
+    while 128 * hasher.block_size * work_factor <= memory_kib * 1024:
+        hasher.work_factor = work_factor
+        hasher.maxmem = 2 * 128 * hasher.block_size * (work_factor + 1)
+        elapsed = time_hash(hasher, repeat)
+        if chosen is not None and elapsed > target:
+            break
+        chosen, chosen_time = work_factor, elapsed
+        work_factor *= 2
+    if chosen is None:
+        raise CommandError("La memoria permitida es demasiado poca para scrypt (mínimo 4 MB).")
+    params = {
+        'PASSWORD_SCRYPT_WORK_FACTOR': chosen,
+        'PASSWORD_SCRYPT_BLOCK_SIZE': hasher.block_size,
+        'PASSWORD_SCRYPT_PARALLELISM': hasher.parallelism,
+    }
+    return params, chosen_time, 128 * hasher.block_size * chosen // 1024
+
+
+def calibrate_argon2(target, memory_kib, repeat):
+    """
+    Argon2id: usamos toda la memoria permitida (lo que más le cuesta a un atacante con GPU)
+    con un solo hilo (así el costo medido es por núcleo) y subimos time_cost hasta el objetivo.
+    """
+    hasher = Argon2PasswordHasher()
+    hasher.memory_cost, hasher.parallelism = memory_kib, 1
+    chosen, chosen_time = None, None
+    time_cost = 1
+    while True:
+        hasher.time_cost = time_cost
+        elapsed = time_hash(hasher, repeat)
+        if chosen is not None and elapsed > target:
+            break
+        chosen, chosen_time = time_cost, elapsed
+        if elapsed > target:
+            break  # Ni con time_cost=1 se llega: hay que bajar la memoria.
+        time_cost += 1
+    params = {
+        'PASSWORD_ARGON2_TIME_COST': chosen,
+        'PASSWORD_ARGON2_MEMORY_COST': hasher.memory_cost,
+        'PASSWORD_ARGON2_PARALLELISM': hasher.parallelism,
+    }
+    return params, chosen_time, hasher.memory_cost
+
+
+CALIBRATORS = {
+    'pbkdf2_sha256': calibrate_pbkdf2,
+    'scrypt': calibrate_scrypt,
+    'argon2': calibrate_argon2,
+}
+
+
+def is_available(algorithm):
+    if algorithm != 'argon2':
+        return True
+    try:
+        Argon2PasswordHasher()._load_library()
+    except ValueError:
+        return False
+    return True
+
+
+def update_env_file(path, values):
+    """Reemplaza (o agrega al final) las líneas CLAVE=valor del archivo .env."""
+    path = Path(path)
+    lines = path.read_text(encoding='utf-8').splitlines() if path.exists() else []
+    pending = dict(values)
+    for index, line in enumerate(lines):
+        key = line.split('=', 1)[0].strip()
+        if key in pending:
+            lines[index] = f"{key}={pending.pop(key)}"
+    lines.extend(f"{key}={value}" for key, value in pending.items())
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+class Command(BaseCommand):
+    """
+    Calibra el costo del hash de contraseñas para ESTA máquina.
+    Mide cada algoritmo disponible y elige los parámetros más altos que no pasan del
+    tiempo objetivo por login. Así los logins por segundo y por núcleo (~1000 / objetivo)
+    son una decisión y no el valor por defecto de Django.
+    Uso:
+      python manage.py calibrate_password_hasher --target-ms 250
+      python manage.py calibrate_password_hasher --use argon2 --memory-mb 64 --write
+    Con --write guarda los valores en .env (los lee settings.py); en Render hay que
+    copiarlos a las variables de entorno. Las cuentas se actualizan solas en su siguiente login.
+    """
+    help = "Mide los hashers de contraseña y elige sus parámetros para un tiempo de login objetivo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250,
+                            help="Tiempo objetivo de un login (hash de la contraseña), en milisegundos.")
+        parser.add_argument('--memory-mb', type=int, default=64,
+                            help="Memoria máxima por login para scrypt y Argon2.")
+        parser.add_argument('--algorithm', action='append', choices=ALGORITHMS,
+                            help="Solo calibra este algoritmo (se puede repetir).")
+        parser.add_argument('--use', choices=ALGORITHMS + ('best',),
+                            help="Algoritmo para las contraseñas nuevas (por defecto el actual de settings).")
+        parser.add_argument('--repeat', type=int, default=3, help="Mediciones por punto (se toma la mejor).")
+        parser.add_argument('--write', action='store_true', help="Escribe los valores en el archivo .env.")
+        parser.add_argument('--env-file', default=str(Path(settings.BASE_DIR) / '.env'),
+                            help="Archivo .env a actualizar con --write.")
+
+    def handle(self, *args, **options):
+        if options['target_ms'] <= 0 or options['memory_mb'] < 1 or options['repeat'] < 1:
+            raise CommandError("El tiempo objetivo, la memoria y las repeticiones deben ser mayores que cero.")
+        target = options['target_ms'] / 1000
+
+        algorithms = options['algorithm'] or list(ALGORITHMS)
+        if options['use'] and options['use'] != 'best' and options['use'] not in algorithms:
+            algorithms.append(options['use'])
+
+        values = {}
+        calibrated = []
+        self.stdout.write(f"Objetivo: {options['target_ms']:.0f} ms por login, hasta {options['memory_mb']} MB.\n")
+        self.stdout.write(f"{'Algoritmo':<15} {'ms/login':>9} {'logins/s/núcleo':>16} {'memoria KB':>11}  Parámetros")
+        for algorithm in algorithms:
+            if not is_available(algorithm):
+                self.stdout.write(f"{algorithm:<15} {'—':>9} {'—':>16} {'—':>11}  no instalado (pip install argon2-cffi)")
+                continue
+            params, elapsed, memory_kib = CALIBRATORS[algorithm](target, options['memory_mb'] * 1024, options['repeat'])
+            values.update(params)
+            calibrated.append(algorithm)
+            described = ', '.join(f"{key.split('_', 2)[2].lower()}={value}" for key, value in params.items())
+            memory = memory_kib or '—'  # PBKDF2 casi no usa memoria.
+            self.stdout.write(f"{algorithm:<15} {elapsed * 1000:>9.1f} {1 / elapsed:>16.1f} {memory:>11}  {described}")
+
+        if not calibrated:
+            raise CommandError("No hay ningún algoritmo disponible para calibrar.")
+
+        use = options['use'] or settings.PASSWORD_HASHER
+        if use == 'best':
+            use = next(algorithm for algorithm in ALGORITHMS if algorithm in calibrated)
+        if not is_available(use):
+            raise CommandError(f"'{use}' no está instalado en esta máquina.")
+        values = {'PASSWORD_HASHER': use, **values}
+
+        self.stdout.write("\nValores para settings (.env o variables de entorno):")
+        for key, value in values.items():
+            self.stdout.write(f"  {key}={value}")
+
+        if options['write']:
+            update_env_file(options['env_file'], values)
+            self.stdout.write(self.style.SUCCESS(f"Guardado en {options['env_file']}. Reinicia el servidor para aplicarlo."))
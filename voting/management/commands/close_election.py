@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.election import ElectionAlreadyClosed, artifact_path, close_election, RESULTS_JSON
+
+
+class Command(BaseCommand):
+    """
+    Cierra la elección: bloquea nuevos votos, cuenta el resultado final una sola vez,
+    lo firma con la llave del servidor y lo publica como archivos estáticos.
+    ¡No se puede deshacer!
+    Uso: python manage.py close_election --noinput --user admin@ejemplo.com
+    """
+    help = "Cierra la elección y publica los resultados finales firmados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help="No pedir confirmación.")
+        parser.add_argument('--user', help="Correo del administrador que cierra (queda registrado).")
+
+    def handle(self, *args, **options):
+        closed_by = None
+        if options['user']:
+            try:
+                closed_by = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No existe el usuario {options['user']}.")
+
+        if options['interactive']:
+            answer = input("Se cerrará la elección y NO se aceptarán más votos. Escribe 'si' para continuar: ")
+            if answer.strip().lower() not in ('si', 'sí'):
+                raise CommandError("Cierre cancelado.")
+
+        try:
+            closure = close_election(closed_by=closed_by)
+        except (ElectionAlreadyClosed, ImproperlyConfigured) as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Elección cerrada: {closure.total_votes} votos. Resultados firmados ({closure.signature_algorithm}) "
+            f"publicados en {artifact_path(RESULTS_JSON).parent}."
+        ))
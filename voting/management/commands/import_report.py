@@ -0,0 +1,81 @@
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Lo que hace un worker antes de atender su primera petición: configurar Django
+# y resolver las URLs (que importa todas las vistas). Se ejecuta en un proceso NUEVO
+# para medir en frío (este proceso ya tiene todo importado).
+STARTUP_SCRIPT = """
+import importlib
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+for module_name in {extra_modules!r}:
+    importlib.import_module(module_name)
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Lee la salida de 'python -X importtime' (en microsegundos).
+    Retorna una lista de (módulo, tiempo propio, tiempo acumulado).
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+class Command(BaseCommand):
+    """
+    Reporte de tiempo de importación por módulo (arranque en frío de un worker).
+    Uso:
+      python manage.py import_report                      -> los 25 módulos más costosos
+      python manage.py import_report --prefix voting      -> solo módulos de la app
+      python manage.py import_report --module voting.benchmarks --top 40
+    """
+    help = "Mide cuánto tarda en importarse cada módulo al arrancar un worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help="Cuántos módulos mostrar.")
+        parser.add_argument('--prefix', action='append', default=[],
+                            help="Solo módulos que empiezan con este texto (se puede repetir).")
+        parser.add_argument('--module', action='append', default=[],
+                            help="Importa además este módulo (ej. uno que se carga de forma perezosa).")
+        parser.add_argument('--sort', choices=('cumulative', 'self'), default='cumulative',
+                            help="Ordenar por tiempo acumulado (con sus dependencias) o propio.")
+
+    def handle(self, *args, **options):
+        # El proceso hijo hereda DJANGO_SETTINGS_MODULE (lo define manage.py).
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT.format(extra_modules=options['module'])],
+            capture_output=True, text=True,
+        )
+        entries = parse_importtime(result.stderr)
+        if result.returncode != 0 or not entries:
+            raise CommandError(f"No se pudo medir el arranque:\n{result.stderr[-2000:]}")
+
+        total_us = sum(self_us for _, self_us, _ in entries)
+        by_package = {}
+        for name, self_us, _ in entries:
+            package = name.split('.')[0]
+            by_package[package] = by_package.get(package, 0) + self_us
+
+        self.stdout.write(f"Arranque en frío: {len(entries)} módulos importados en {total_us / 1000:.1f} ms.\n")
+        self.stdout.write(f"{'Paquete':<32} {'ms':>9} {'%':>6}")
+        for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:10]:
+            self.stdout.write(f"{package:<32} {self_us / 1000:>9.1f} {self_us * 100 / total_us:>6.1f}")
+
+        if options['prefix']:
+            entries = [entry for entry in entries if entry[0].startswith(tuple(options['prefix']))]
+        sort_index = 2 if options['sort'] == 'cumulative' else 1
+        entries.sort(key=lambda entry: entry[sort_index], reverse=True)
+
+        self.stdout.write(f"\n{'Módulo':<48} {'propio ms':>10} {'acumulado ms':>13}")
+        for name, self_us, cumulative_us in entries[:options['top']]:
+            self.stdout.write(f"{name:<48} {self_us / 1000:>10.1f} {cumulative_us / 1000:>13.1f}")
@@ -0,0 +1,56 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from voting.sharding import vote_shards
+
+
+class Command(BaseCommand):
+    """
+    Preparación al arrancar (render_start.sh), en UN solo proceso de Python:
+    1. Solo ejecuta 'migrate' si hay migraciones pendientes. Con el esquema al día nos
+       ahorramos el migrate completo (y sus señales post_migrate, que consultan permisos
+       y tipos de contenido de todos los modelos). Con particiones (VOTE_SHARD_URLS)
+       revisa también cada una.
+    2. Solo crea el superusuario (variables DJANGO_SUPERUSER_*) si todavía no existe.
+    Uso: python manage.py prepare_startup
+    """
+    help = "Aplica migraciones y crea el superusuario solo cuando hace falta."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Base de datos a revisar.")
+
+    def handle(self, *args, **options):
+        databases = [options['database']]
+        if options['database'] == DEFAULT_DB_ALIAS:
+            databases += [alias for alias in vote_shards() if alias != DEFAULT_DB_ALIAS]
+        for database in databases:
+            self._migrate(database, options['verbosity'])
+
+        username = os.environ.get('DJANGO_SUPERUSER_USERNAME')
+        if not username:
+            return
+        User = get_user_model()
+        if User._default_manager.db_manager(options['database']).filter(**{User.USERNAME_FIELD: username}).exists():
+            self.stdout.write("El superusuario ya existe.")
+            return
+        try:
+            call_command('createsuperuser', database=options['database'], interactive=False,
+                         verbosity=options['verbosity'], stdout=self.stdout)
+        except CommandError as error:
+            # Igual que el antiguo "|| true": un superusuario mal configurado no impide arrancar.
+            self.stderr.write(f"No se creó el superusuario: {error}")
+
+    def _migrate(self, database, verbosity):
+        executor = MigrationExecutor(connections[database])
+        pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        label = '' if database == DEFAULT_DB_ALIAS else f" ({database})"
+        if pending:
+            self.stdout.write(f"Aplicando {len(pending)} migración(es) pendiente(s){label}...")
+            call_command('migrate', database=database, interactive=False, verbosity=verbosity)
+        else:
+            self.stdout.write(f"Esquema al día{label}: no se ejecuta migrate.")
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from voting.models import AuditEvent
+
+
+class Command(BaseCommand):
+    """
+    Rota la bitácora de eventos de seguridad: borra los eventos más antiguos que la
+    retención (AUDIT_LOG_RETENTION_DAYS), en lotes cortos para no bloquear a los
+    hilos que siguen escribiendo eventos nuevos.
+    Pensado para ejecutarse periódicamente (cron).
+    Uso: python manage.py prune_audit_log --days 90
+    """
+    help = "Borra los eventos de seguridad más antiguos que la retención configurada."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.AUDIT_LOG_RETENTION_DAYS,
+                            help="Días de eventos que se conservan.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Eventos borrados por lote.")
+        parser.add_argument('--pause', type=float, default=0.05, help="Segundos de espera entre lotes.")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError("Los días y el tamaño de lote deben ser mayores que cero.")
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        deleted = 0
+        while True:
+            # El filtro por fecha usa el índice de created_at (no recorre la tabla).
+            ids = list(AuditEvent.objects.filter(created_at__lt=cutoff)
+                       .values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            AuditEvent.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} eventos anteriores al {cutoff:%Y-%m-%d %H:%M} borrados."
+        ))
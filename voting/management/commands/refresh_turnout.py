@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.archive import list_segments
+from voting.rollups import (RECONCILE_HOURS, rebuild_turnout_rollups, reconcile_turnout_rollups,
+                            refresh_turnout_rollups)
+
+
+class Command(BaseCommand):
+    """
+    Pone al día los resúmenes de participación (TurnoutRollup) desde la marca de agua.
+    Pensado para ejecutarse periódicamente (cron) o después de una carga masiva; con
+    --interval se queda corriendo como proceso aparte (ej. un "background worker" de Render).
+    Cada pasada concilia además las últimas horas (ver voting/rollups.py): suma los votos
+    que se confirmaron tarde, detrás de la marca de agua.
+    Uso: python manage.py refresh_turnout --chunk-size 20000
+         python manage.py refresh_turnout --interval 10
+         python manage.py refresh_turnout --rebuild      -> recuenta todo desde cero
+    """
+    help = "Suma en TurnoutRollup los votos nuevos desde la última ejecución."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=20000,
+                            help="Votos procesados por transacción.")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Segundos entre pasadas; con 0 hace una sola pasada y termina.")
+        parser.add_argument('--reconcile-hours', type=int, default=RECONCILE_HOURS,
+                            help="Horas recientes que se comparan con la tabla de votos en cada pasada (0 = no concilia).")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Borra los resúmenes y las marcas de agua y recuenta todos los votos.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['interval'] < 0 or options['reconcile_hours'] < 0:
+            raise CommandError("El tamaño de bloque debe ser mayor que cero y el intervalo y las horas no pueden ser negativos.")
+        if options['rebuild']:
+            # Los votos archivados ya no están en la tabla viva: el recuento los perdería.
+            if list_segments():
+                raise CommandError("Hay votos archivados (archive_ballots): no se pueden recontar desde la tabla viva.")
+            rebuild_turnout_rollups()
+            self.stdout.write("Resúmenes borrados; se recuentan todos los votos.")
+
+        self._catch_up(options['chunk_size'], options['reconcile_hours'])
+        while options['interval']:
+            time.sleep(options['interval'])
+            self._catch_up(options['chunk_size'], options['reconcile_hours'])
+
+    def _catch_up(self, chunk_size, reconcile_hours):
+        total = 0
+        while processed := refresh_turnout_rollups(chunk_size):
+            total += processed
+            self.stdout.write(f"{total} votos sumados...")
+        if reconcile_hours and (repaired := reconcile_turnout_rollups(reconcile_hours)):
+            self.stdout.write(self.style.WARNING(f"{repaired} hora(s) no cuadraban con la tabla de votos: recalculadas."))
+
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes al día ({total} votos nuevos)."))
@@ -0,0 +1,177 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from voting import crypto_utils
+from voting.crypto_utils import ciphertext_key_version, configure_aes_keys, decrypt_vote_aes, encrypt_vote_aes
+from voting.models import RollupWatermark, Vote
+from voting.queries import HASH_PREVIEW_LENGTH
+from voting.sharding import vote_shards
+
+# Fragmentos de plantilla que muestran el voto cifrado (results_dashboard.html).
+ROW_FRAGMENTS = ('audit_row', 'verification_row')
+
+
+def reencrypt_rows(rows, key_id, mode):
+    """
+    Trabajo de cada proceso: re-cifra con la llave y modo indicados.
+    'rows' es una lista de (id, voto cifrado, texto del voto).
+    Retorna (lista de (id, nuevo cifrado), cuántos se reconstruyeron desde el texto,
+    lista de (id, error) de los votos que no se pudieron descifrar).
+    """
+    updates = []
+    from_plaintext = 0
+    failures = []
+    for vote_id, encrypted_vote, option in rows:
+        current_version = ciphertext_key_version(encrypted_vote)
+        if current_version == (key_id, mode):
+            continue  # Ya está con la llave nueva (ej. se re-procesa tras una interrupción).
+        if current_version == (None, None):
+            # Voto de formato antiguo (sin versión): no hay con qué descifrarlo, pero la
+            # misma fila guarda el texto del voto, así que lo ciframos desde ahí.
+            vote_content = option
+            from_plaintext += 1
+        else:
+            try:
+                vote_content = decrypt_vote_aes(encrypted_vote)
+            except ValueError as error:
+                # Llave que ya no está en el llavero o cifrado alterado (GCM lo detecta):
+                # NO lo tapamos re-cifrando el texto. La fila se queda como está y se reporta.
+                failures.append((vote_id, str(error)))
+                continue
+        updates.append((vote_id, encrypt_vote_aes(vote_content, key_id, mode)))
+    return updates, from_plaintext, failures
+
+
+def forget_vote_rows(rows):
+    """
+    Borra de la caché las filas ya dibujadas de estos votos: muestran el cifrado anterior.
+    'rows' es una lista de (id, cifrado anterior). La llave de cada fila incluye el inicio del
+    cifrado, así que el cifrado nuevo ya usa otra; esto solo libera las viejas antes de que caduquen.
+    """
+    cache.delete_many([
+        make_template_fragment_key(name, [vote_id, encrypted_vote[:HASH_PREVIEW_LENGTH]])
+        for vote_id, encrypted_vote in rows for name in ROW_FRAGMENTS
+    ])
+
+
+class Command(BaseCommand):
+    """
+    Re-cifra todos los votos con la llave AES activa (rotación de llave o cambio de modo).
+    - Recorre la tabla por ID en bloques (keyset), sin OFFSET.
+    - Cada bloque se guarda en su propia transacción corta, junto con el punto de control.
+    - Si se interrumpe, al volver a ejecutarlo continúa desde el último bloque guardado.
+    - Se frena a sí mismo (--pause, --max-rate) para no afectar a quienes están votando.
+    - Con particiones recorre una base tras otra, cada una con su punto de control. Ahí
+      el bloque y el punto de control quedan en bases distintas: si se interrumpe entre
+      ambos, el bloque se vuelve a leer y sus votos ya re-cifrados se saltan.
+    - Los votos que no se pueden descifrar (llave ausente, cifrado alterado) se reportan y
+      se dejan como están; al final el comando falla. Tras corregir el llavero: --restart.
+    Uso: python manage.py rotate_ballot_key --batch-size 1000 --max-rate 5000
+    """
+    help = "Re-cifra Vote.encrypted_vote con la llave AES activa, por bloques y con reanudación."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Votos por bloque/transacción.")
+        parser.add_argument('--workers', type=int, default=2, help="Procesos que re-cifran en paralelo.")
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help="Segundos de espera entre bloques (cede la base de datos al tráfico en vivo).")
+        parser.add_argument('--max-rate', type=float, default=0,
+                            help="Máximo de votos por segundo (0 = sin límite).")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignora el punto de control y empieza desde el primer voto.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError("El tamaño de bloque y los procesos deben ser mayores que cero.")
+        if crypto_utils.ACTIVE_AES_KEY_ID == 'dev':
+            raise CommandError("No hay llavero configurado (BALLOT_AES_KEYS): no tiene sentido rotar a una llave temporal.")
+
+        key_id = crypto_utils.ACTIVE_AES_KEY_ID
+        mode = crypto_utils.ACTIVE_AES_MODE
+        workers = options['workers']
+
+        started = time.perf_counter()
+        totals = {'processed': 0, 'rewritten': 0, 'from_plaintext': 0, 'failed': 0}
+        # Cada proceso recibe el llavero explícitamente (no depende de cómo se creó el proceso).
+        with ProcessPoolExecutor(max_workers=workers, initializer=configure_aes_keys,
+                                 initargs=(crypto_utils.AES_KEYS, key_id, mode)) as executor:
+            for alias in vote_shards():
+                self._rotate_shard(alias, executor, key_id, mode, started, totals, options)
+
+        rewritten, from_plaintext = totals['rewritten'], totals['from_plaintext']
+        if totals['failed']:
+            raise CommandError(
+                f"{totals['failed']} votos no se pudieron descifrar y siguen con su cifrado anterior "
+                f"({rewritten} re-cifrados). Revisa el llavero y vuelve a ejecutar con --restart."
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rotación completa: {rewritten} votos re-cifrados con '{key_id}' "
+            f"({from_plaintext} reconstruidos desde el texto del voto) en {time.perf_counter() - started:.1f} s."
+        ))
+
+    def _rotate_shard(self, alias, executor, key_id, mode, started, totals, options):
+        """Re-cifra los votos de una partición ('default' si no hay particiones)."""
+        workers = options['workers']
+        # El punto de control es una marca de agua propia de esta llave y modo (y partición).
+        name = f"rotate_ballot_key:{key_id}:{mode}"
+        if alias != DEFAULT_DB_ALIAS:
+            name += f":{alias}"
+        checkpoint, _ = RollupWatermark.objects.get_or_create(name=name)
+        if options['restart']:
+            checkpoint.last_vote_id = 0
+            checkpoint.save(update_fields=['last_vote_id', 'updated_at'])
+        last_id = checkpoint.last_vote_id
+        self.stdout.write(f"Re-cifrando '{alias}' con la llave '{key_id}' ({mode}) desde el voto #{last_id}...")
+
+        while True:
+            rows = list(
+                Vote.objects.using(alias).filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'encrypted_vote', 'option')[:options['batch_size']]
+            )
+            if not rows:
+                break
+
+            parts = [rows[index::workers] for index in range(workers)]
+            updates = []
+            for part_updates, part_from_plaintext, part_failures in executor.map(
+                    reencrypt_rows, parts, repeat(key_id), repeat(mode)):
+                updates.extend(part_updates)
+                totals['from_plaintext'] += part_from_plaintext
+                for vote_id, error in part_failures:
+                    totals['failed'] += 1
+                    self.stderr.write(f"Voto #{vote_id} ({alias}): no se pudo descifrar: {error}")
+
+            # Transacción corta: el bloque y su punto de control se guardan juntos
+            # (en la misma transacción solo si la partición es 'default'; si no, la partición
+            # confirma primero y el punto de control después).
+            with transaction.atomic(), transaction.atomic(using=alias):
+                Vote.objects.using(alias).bulk_update(
+                    [Vote(id=vote_id, encrypted_vote=encrypted_vote) for vote_id, encrypted_vote in updates],
+                    ['encrypted_vote'],
+                )
+                RollupWatermark.objects.filter(pk=checkpoint.pk).update(last_vote_id=rows[-1][0])
+            rewritten_ids = {vote_id for vote_id, _ in updates}
+            forget_vote_rows([(vote_id, encrypted_vote) for vote_id, encrypted_vote, _ in rows
+                              if vote_id in rewritten_ids])
+
+            last_id = rows[-1][0]
+            totals['processed'] += len(rows)
+            totals['rewritten'] += len(updates)
+            self.stdout.write(f"Voto #{last_id}: {totals['processed']} revisados, {totals['rewritten']} re-cifrados.")
+            self._throttle(totals['processed'], started, options)
+
+    def _throttle(self, processed, started, options):
+        """Duerme entre bloques para respetar la pausa y el límite de votos por segundo."""
+        delay = options['pause']
+        if options['max_rate']:
+            ahead = processed / options['max_rate'] - (time.perf_counter() - started)
+            delay = max(delay, ahead)
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,120 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.benchmarks import BENCHMARK_CASES, compare_samples, environment_info, run_case
+
+
+class Command(BaseCommand):
+    """
+    Micro-benchmarks de crypto_utils y de las rutas calientes de las vistas.
+    Uso:
+      python manage.py run_benchmarks                     -> solo mide y muestra la tabla
+      python manage.py run_benchmarks --save              -> mide y guarda la línea base
+      python manage.py run_benchmarks --compare           -> mide y compara contra la línea base
+      python manage.py run_benchmarks --filter sign_vote  -> solo los casos que contienen ese texto
+    Con --compare el comando termina con error si algún caso es significativamente más lento.
+    """
+    help = "Mide las operaciones críticas a varios tamaños, guarda una línea base y detecta regresiones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=15, help="Muestras por caso.")
+        parser.add_argument('--filter', action='append', default=[],
+                            help="Solo los casos cuyo ID contiene este texto (se puede repetir).")
+        parser.add_argument('--list', action='store_true', help="Muestra los casos disponibles y termina.")
+        parser.add_argument('--baseline', default=settings.BENCHMARK_BASELINE_FILE, help="Archivo JSON de la línea base.")
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument('--save', action='store_true', help="Guarda (o actualiza) la línea base con estos resultados.")
+        mode.add_argument('--compare', action='store_true', help="Compara contra la línea base guardada.")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Cambio mínimo de la mediana para marcar un caso (0.25 = 25%%).")
+        parser.add_argument('--alpha', type=float, default=0.01,
+                            help="Nivel de significancia de la prueba estadística.")
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for case_id in BENCHMARK_CASES:
+                self.stdout.write(case_id)
+            return
+        if options['samples'] < 5:
+            raise CommandError("Se necesitan al menos 5 muestras por caso para comparar con sentido.")
+
+        case_ids = [
+            case_id for case_id in BENCHMARK_CASES
+            if not options['filter'] or any(text in case_id for text in options['filter'])
+        ]
+        if not case_ids:
+            raise CommandError("Ningún caso coincide con --filter (usa --list para verlos).")
+
+        baseline_path = Path(options['baseline'])
+        baseline = self._load_baseline(baseline_path) if (options['compare'] or options['save']) else None
+        if options['compare']:
+            if baseline is None:
+                raise CommandError(f"No existe la línea base {baseline_path}: créala con --save.")
+            if baseline['environment'] != environment_info():
+                self.stdout.write(self.style.WARNING(
+                    "La línea base se midió en otro entorno "
+                    f"({baseline['environment']}): la comparación puede no ser justa."
+                ))
+
+        results = {}
+        regressions = []
+        self.stdout.write(f"{'Caso':<44} {'mediana':>12} {'± desv.':>10}  {'vs. base':>9}  estado")
+        for case_id in case_ids:
+            result = run_case(case_id, options['samples'])
+            results[case_id] = result
+
+            comparison = ''
+            if options['compare']:
+                stored = baseline['results'].get(case_id)
+                if stored is None:
+                    comparison = f"{'—':>9}  sin línea base"
+                else:
+                    status, ratio, p_value = compare_samples(
+                        stored['samples'], result['samples'], options['threshold'], options['alpha'])
+                    comparison = f"{ratio:>8.2f}x  {status} (p={p_value:.3g})"
+                    if status == 'más lento':
+                        regressions.append(case_id)
+
+            line = f"{case_id:<44} {_format_seconds(result['median']):>12} {_format_seconds(result['stdev']):>10}  {comparison}"
+            self.stdout.write(self.style.ERROR(line) if case_id in regressions else line)
+
+        if options['save']:
+            self._save_baseline(baseline_path, baseline, results)
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {baseline_path} ({len(results)} casos)."))
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} caso(s) más lentos que la línea base: {', '.join(regressions)}")
+
+    def _load_baseline(self, path):
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def _save_baseline(self, path, baseline, results):
+        """Actualiza solo los casos medidos; los demás se conservan (ej. con --filter)."""
+        if baseline is None or baseline['environment'] != environment_info():
+            baseline = {'environment': environment_info(), 'results': {}}
+        baseline['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        for case_id, result in results.items():
+            baseline['results'][case_id] = {
+                'median': result['median'],
+                'stdev': result['stdev'],
+                'loops': result['loops'],
+                'samples': [round(value, 9) for value in result['samples']],
+            }
+        baseline['results'] = dict(sorted(baseline['results'].items()))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+
+
+def _format_seconds(seconds):
+    """Tiempo legible: s, ms o µs."""
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} µs"
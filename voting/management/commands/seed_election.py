@@ -0,0 +1,177 @@
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from voting.crypto_utils import SIGNATURE_SCHEMES, encrypt_vote_aes, generate_keys, sign_vote
+from voting.models import Vote, VoterProfile
+from voting.sharding import shard_for_user
+from voting.vote_utils import QUESTION_OPTIONS
+
+
+def parse_distribution(specs):
+    """
+    Convierte ['P1=ALTO:5,MEDIO:3,BAJO:2', ...] en {'P1': ([opciones], [pesos]), ...}.
+    Las preguntas que no se mencionan quedan con distribución uniforme.
+    """
+    distribution = {key: (options, [1] * len(options)) for key, options in QUESTION_OPTIONS.items()}
+
+    for spec in specs or []:
+        try:
+            question, weights_text = spec.split('=', 1)
+            weights = {}
+            for item in weights_text.split(','):
+                option, weight = item.split(':')
+                weights[option.strip()] = float(weight)
+        except ValueError:
+            raise CommandError(f"Distribución mal escrita: '{spec}'. Formato: P1=ALTO:5,MEDIO:3,BAJO:2")
+
+        question = question.strip()
+        if question not in QUESTION_OPTIONS:
+            raise CommandError(f"Pregunta desconocida: {question}")
+        unknown = set(weights) - set(QUESTION_OPTIONS[question])
+        if unknown:
+            raise CommandError(f"Opciones desconocidas para {question}: {', '.join(sorted(unknown))}")
+
+        options = QUESTION_OPTIONS[question]
+        distribution[question] = (options, [weights.get(option, 0) for option in options])
+
+    return distribution
+
+
+def build_ballots(chunk, algorithm, key_pool):
+    """
+    Trabajo de cada proceso: genera (o reutiliza) las llaves y firma los votos del bloque.
+    'chunk' es una lista de (índice, usuario, contenido del voto).
+    Retorna una lista de (usuario, llave pública, contenido, firma hexadecimal).
+    """
+    ballots = []
+    for index, username, vote_content in chunk:
+        if key_pool:
+            public_key_pem, private_key_pem = key_pool[index % len(key_pool)]
+        else:
+            public_key_pem, private_key_pem = generate_keys(algorithm)
+        signature_hex = sign_vote(vote_content, private_key_pem, algorithm)
+        ballots.append((username, public_key_pem, vote_content, signature_hex))
+    return ballots
+
+
+class Command(BaseCommand):
+    """
+    Crea una elección sintética: N votantes con llaves válidas y N votos firmados y cifrados.
+    Uso: python manage.py seed_election 100000 --key-pool 64 --workers 8
+    """
+    help = "Genera votantes y votos sintéticos (firmados y cifrados) para pruebas de rendimiento."
+
+    def add_arguments(self, parser):
+        parser.add_argument('voters', type=int, help="Número de votantes (y de votos) a crear.")
+        parser.add_argument('--algorithm', default='ED25519', choices=sorted(SIGNATURE_SCHEMES),
+                            help="Algoritmo de firma de los votantes (Ed25519 es mucho más rápido).")
+        parser.add_argument('--key-pool', type=int, default=0,
+                            help="Reutiliza este número de pares de llaves entre todos los votantes (0 = una por votante).")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Procesos para generar llaves y firmas (por defecto, uno por núcleo).")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Votantes por bloque de firma e inserción (bulk_create).")
+        parser.add_argument('--distribution', action='append',
+                            help="Pesos de las respuestas, ej: P1=ALTO:5,MEDIO:3,BAJO:2 (se puede repetir).")
+        parser.add_argument('--prefix', default=None,
+                            help="Prefijo de los correos generados (por defecto, uno único por ejecución).")
+        parser.add_argument('--password', default=None,
+                            help="Contraseña común de los votantes (por defecto, sin contraseña utilizable).")
+        parser.add_argument('--seed', type=int, default=None, help="Semilla para repetir las mismas respuestas.")
+
+    def handle(self, *args, **options):
+        total = options['voters']
+        batch_size = options['batch_size']
+        algorithm = options['algorithm']
+        if total < 1 or batch_size < 1 or options['key_pool'] < 0:
+            raise CommandError("El número de votantes, el tamaño de bloque y el pool de llaves deben ser positivos.")
+
+        distribution = parse_distribution(options['distribution'])
+        prefix = options['prefix'] or f"seed{int(time.time())}-"
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Ya existen usuarios con el prefijo '{prefix}'. Usa otro --prefix.")
+
+        # La contraseña se hashea UNA sola vez: hashearla por votante tardaría horas.
+        password_hash = make_password(options['password'])
+        rng = random.Random(options['seed'])
+        key_pool = [generate_keys(algorithm) for _ in range(options['key_pool'])]
+
+        workers = options['workers'] or os.cpu_count() or 1
+        started = time.perf_counter()
+        created = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Mantenemos pocos bloques "en vuelo" (2 por proceso) para que la memoria
+            # no crezca con N: mientras se inserta un bloque, los procesos firman los siguientes.
+            pending = deque()
+            for chunk in self._chunks(total, batch_size, prefix, distribution, rng):
+                pending.append(executor.submit(build_ballots, chunk, algorithm, key_pool))
+                if len(pending) >= workers * 2:
+                    created += self._insert(pending.popleft().result(), password_hash, algorithm)
+                    self._report(created, total, started)
+            while pending:
+                created += self._insert(pending.popleft().result(), password_hash, algorithm)
+                self._report(created, total, started)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Elección sintética lista: {created} votantes con prefijo '{prefix}' en "
+            f"{time.perf_counter() - started:.1f} s."
+        ))
+
+    def _chunks(self, total, batch_size, prefix, distribution, rng):
+        """Genera, bloque a bloque, los votos a firmar: (índice, usuario, contenido)."""
+        def ballots():
+            for index in range(total):
+                username = f"{prefix}{index}@seed.local"
+                answers = '|'.join(
+                    f"{question}:{rng.choices(options, weights)[0]}"
+                    for question, (options, weights) in distribution.items()
+                )
+                yield index, username, f"USUARIO:{username}|{answers}"
+
+        iterator = ballots()
+        while chunk := list(islice(iterator, batch_size)):
+            yield chunk
+
+    def _report(self, created, total, started):
+        rate = created / (time.perf_counter() - started)
+        self.stdout.write(f"{created}/{total} votos insertados ({rate:.0f} votos/s)")
+
+    def _insert(self, ballots, password_hash, algorithm):
+        """
+        Inserta un bloque completo (usuarios, perfiles y votos) en una sola transacción
+        (una por base si hay particiones: los perfiles y votos van a la partición de cada usuario).
+        """
+        with transaction.atomic():
+            # bulk_create no dispara la señal post_save, así que creamos los perfiles aquí.
+            users = User.objects.bulk_create([
+                User(username=username, email=username, password=password_hash)
+                for username, _public, _content, _signature in ballots
+            ])
+            by_shard = {}
+            for user, ballot in zip(users, ballots):
+                by_shard.setdefault(shard_for_user(user.pk), []).append((user, ballot))
+            for alias, shard_ballots in by_shard.items():
+                with transaction.atomic(using=alias):
+                    profiles = VoterProfile.objects.using(alias).bulk_create([
+                        VoterProfile(user=user, public_key=public_key_pem,
+                                     signature_algorithm=algorithm, has_voted=True)
+                        for user, (_username, public_key_pem, _content, _signature) in shard_ballots
+                    ])
+                    # El cifrado AES se hace en este proceso: la llave AES vive en memoria de cada proceso.
+                    Vote.objects.using(alias).bulk_create([
+                        Vote(voter=profile, option=vote_content, digital_signature=signature_hex,
+                             encrypted_vote=encrypt_vote_aes(vote_content))
+                        for profile, (_user, (_username, _public, vote_content, signature_hex))
+                        in zip(profiles, shard_ballots)
+                    ])
+        return len(ballots)
+
@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.archive import ArchiveCorrupted, list_segments
+from voting.crypto_utils import verify_signature
+from voting.election import compute_final_tally, merge_tallies, tally_options
+from voting.models import ElectionClosure
+
+
+class Command(BaseCommand):
+    """
+    Re-verifica el archivo frío recorriéndolo en streaming (un bloque a la vez):
+    - SHA-256 de cada segmento contra su manifiesto y CRC32 de cada bloque.
+    - La firma digital de cada voto archivado (con la llave pública guardada junto al voto).
+    - El re-conteo (archivo + votos que sigan en la tabla viva) contra los resultados firmados al cerrar.
+    Uso: python manage.py verify_archive [--skip-signatures]
+    """
+    help = "Verifica integridad, firmas y conteo de los votos archivados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-signatures', action='store_true',
+                            help="No verifica cada firma (solo integridad y conteo; mucho más rápido).")
+
+    def handle(self, *args, **options):
+        segments = list_segments()
+        if not segments:
+            raise CommandError("No hay segmentos archivados.")
+
+        problems = []
+        for segment in segments:
+            try:
+                segment.verify_checksums()
+            except ArchiveCorrupted as error:
+                raise CommandError(str(error))
+
+        def archived_options():
+            """Recorre los votos archivados verificando firmas y entrega el texto de cada uno."""
+            for segment in segments:
+                checked = 0
+                for record in segment:
+                    if not options['skip_signatures'] and not verify_signature(
+                            record['option'], record['digital_signature'],
+                            record['public_key'], record['signature_algorithm']):
+                        problems.append(f"Firma inválida en el voto #{record['id']} (segmento {segment.number}).")
+                    checked += 1
+                    yield record['option']
+                if checked != segment.manifest['count']:
+                    problems.append(f"Segmento {segment.number}: {checked} votos, el manifiesto dice {segment.manifest['count']}.")
+                self.stdout.write(f"Segmento {segment.number}: {checked} votos revisados.")
+
+        try:
+            # Archivo + lo que siga en la tabla viva (de todas las particiones).
+            total_votes, tallies = merge_tallies([tally_options(archived_options()), compute_final_tally()])
+        except ArchiveCorrupted as error:
+            raise CommandError(str(error))
+
+        closure = ElectionClosure.objects.exclude(document='').first()
+        if closure is None:
+            problems.append("No hay resultados firmados con qué comparar el conteo.")
+        else:
+            document = json.loads(closure.document)
+            if (total_votes, tallies) != (document['total_votes'], document['tallies']):
+                problems.append(
+                    f"El re-conteo ({total_votes} votos) no coincide con los resultados firmados "
+                    f"({document['total_votes']} votos)."
+                )
+
+        if problems:
+            for problem in problems:
+                self.stderr.write(problem)
+            raise CommandError(f"{len(problems)} problema(s) en el archivo.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivo íntegro: {len(segments)} segmentos, {total_votes} votos; el re-conteo coincide con los resultados firmados."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0003_vote_encrypted_vote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voterprofile',
+            name='signature_algorithm',
+            field=models.CharField(choices=[('RSA', 'RSA-2048 (PKCS#1 v1.5)'), ('ED25519', 'Ed25519')], default='RSA', help_text='Algoritmo de firma digital de la llave pública del votante.', max_length=16),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0004_voterprofile_signature_algorithm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_vote_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TurnoutRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Por minuto'), ('hour', 'Por hora')], max_length=6)),
+                ('bucket_start', models.DateTimeField(help_text='Inicio de la cubeta de tiempo (minuto u hora).')),
+                ('question', models.CharField(blank=True, help_text='Pregunta (P1..P4); vacío = total de votos.', max_length=8)),
+                ('answer', models.CharField(blank=True, help_text='Respuesta elegida; vacío = total de votos.', max_length=32)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket_start', 'question', 'answer'), name='unique_turnout_bucket')],
+            },
+        ),
+    ]
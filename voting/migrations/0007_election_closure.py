@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0006_vote_timestamp_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElectionClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+                ('total_votes', models.PositiveIntegerField(default=0)),
+                ('document', models.TextField(blank=True)),
+                ('signature', models.TextField(blank=True, help_text='Firma del servidor sobre el documento (hex).')),
+                ('signature_algorithm', models.CharField(blank=True, max_length=16)),
+                ('public_key', models.TextField(blank=True, help_text='Llave pública del servidor para verificar la firma.')),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0007_election_closure'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vote',
+            name='voter',
+            field=models.ForeignKey(db_index=False, help_text='Perfil del votante que emitió este voto.', on_delete=django.db.models.deletion.CASCADE, to='voting.voterprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['voter', '-timestamp'], name='vote_voter_recent_idx'),
+        ),
+    ]
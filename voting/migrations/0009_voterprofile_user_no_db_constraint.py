@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+
+
+class AlterFieldOnShards(migrations.AlterField):
+    """
+    Cambia el modelo en todas las instalaciones, pero la base solo en las particiones
+    (VOTE_SHARD_URLS): ahí el perfil vive sin su usuario y la FOREIGN KEY apuntaría a una
+    tabla auth_user vacía. En 'default' (con o sin particiones) la FOREIGN KEY se queda.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0008_vote_voter_recent_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AlterFieldOnShards(
+            model_name='voterprofile',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
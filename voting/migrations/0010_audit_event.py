@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0009_voterprofile_user_no_db_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('event_type', models.CharField(choices=[('login', 'Inicio de sesión'), ('login_failed', 'Inicio de sesión fallido'), ('keys_generated', 'Llaves generadas'), ('key_checked', 'Llave revisada'), ('vote_cast', 'Voto registrado'), ('signature_failed', 'Firma rechazada'), ('events_dropped', 'Eventos descartados (sobrecarga)')], max_length=20)),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('username', models.CharField(blank=True, help_text='Correo del votante (o el intentado, si falló).', max_length=150)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('details', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at'], name='audit_event_recent_idx'), models.Index(fields=['event_type', '-created_at'], name='audit_event_type_idx'), models.Index(fields=['username', '-created_at'], name='audit_event_voter_idx')],
+            },
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 from django.contrib.auth.models import User 
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from .crypto_utils import SIGNATURE_SCHEMES, DEFAULT_SIGNATURE_ALGORITHM
 
 # ---------------------------------------------------------
 # 1. MODELO DE PERFIL DE VOTANTE (VoterProfile)
@@ -13,7 +14,12 @@ from django.dispatch import receiver
 class VoterProfile(models.Model):
     # Conecto este perfil "uno a uno" con el usuario de Django.
     # Si se borra el usuario, se borra este perfil (CASCADE).
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    # db_constraint=False: con particiones (voting/sharding.py) el perfil vive en otra base
+    # que el usuario. La migración 0009 quita la FOREIGN KEY SOLO en las particiones; en
+    # 'default' se queda. Django sigue manejando la relación: en las particiones el borrado
+    # en cascada lo hace delete_sharded_profile, así que borrar usuarios con SQL directo,
+    # fuera del ORM, deja ahí perfiles sin usuario.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, db_constraint=False)
     
     # Aquí guardo la "Identidad Pública" del votante.
     # Servirá para validar que la firma digital del voto le pertenece a él.
@@ -23,6 +29,15 @@ class VoterProfile(models.Model):
         help_text="Llave pública RSA del votante, usada para verificar la firma digital."
     )
     
+    # Con qué algoritmo se generó la llave (RSA, Ed25519...).
+    # Los votantes antiguos quedan como RSA, así sus firmas se siguen verificando igual.
+    signature_algorithm = models.CharField(
+        max_length=16,
+        choices=[(name, scheme['label']) for name, scheme in SIGNATURE_SCHEMES.items()],
+        default=DEFAULT_SIGNATURE_ALGORITHM,
+        help_text="Algoritmo de firma digital de la llave pública del votante."
+    )
+    
     # ESTO ES CRÍTICO: Este campo actúa como un interruptor.
     # False = Puede votar. True = Ya votó, bloquéalo.
     has_voted = models.BooleanField(default=False) 
@@ -39,7 +54,8 @@ class VoterProfile(models.Model):
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        VoterProfile.objects.create(user=instance)
+        # save() (y no objects.create) para que el router vea el usuario y elija su partición.
+        VoterProfile(user=instance).save(force_insert=True)
 
 # ---------------------------------------------------------
 # 2. MODELO DE VOTO (Vote)
@@ -48,9 +64,12 @@ def create_user_profile(sender, instance, created, **kwargs):
 # Cada fila aquí es una papeleta depositada.
 class Vote(models.Model):
     # Vinculo el voto con el perfil del votante para saber quién fue.
+    # Sin índice propio: el índice compuesto (voter, -timestamp) de Meta ya empieza por 'voter'
+    # y sirve para las mismas búsquedas (un índice menos que mantener en cada INSERT).
     voter = models.ForeignKey(
         'VoterProfile', 
         on_delete=models.CASCADE, 
+        db_index=False,
         help_text="Perfil del votante que emitió este voto."
     )
     
@@ -77,7 +96,130 @@ class Vote(models.Model):
     )
     
     # Guardo la fecha y hora exacta del voto para auditoría.
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Indexado: el admin filtra por fecha y no queremos recorrer millones de filas.
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # La página de verificación pide "mis votos, del más reciente al más antiguo":
+            # con este índice la base de datos los encuentra Y los entrega ya ordenados.
+            models.Index(fields=['voter', '-timestamp'], name='vote_voter_recent_idx'),
+        ]
 
     def __str__(self):
         return f"Voto de {self.voter.user.username} por {self.option}"
+
+
+# ---------------------------------------------------------
+# 3. RESÚMENES DE PARTICIPACIÓN (TurnoutRollup)
+# ---------------------------------------------------------
+# Contadores ya agrupados por minuto y por hora, para dibujar la participación
+# en el tiempo sin recorrer la tabla Vote completa.
+# Cada fila es: "en esta cubeta de tiempo, la respuesta X de la pregunta Y tuvo N votos".
+# La fila con question='' y answer='' guarda el total de votos de la cubeta.
+class TurnoutRollup(models.Model):
+    GRANULARITY_CHOICES = [
+        ('minute', 'Por minuto'),
+        ('hour', 'Por hora'),
+    ]
+
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField(help_text="Inicio de la cubeta de tiempo (minuto u hora).")
+    question = models.CharField(max_length=8, blank=True, help_text="Pregunta (P1..P4); vacío = total de votos.")
+    answer = models.CharField(max_length=32, blank=True, help_text="Respuesta elegida; vacío = total de votos.")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # La restricción única también sirve de índice para las consultas por rango:
+        # (granularidad, inicio) es el prefijo con el que filtramos.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'bucket_start', 'question', 'answer'],
+                name='unique_turnout_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start:%Y-%m-%d %H:%M} {self.question or 'TOTAL'} {self.answer}: {self.count}"
+
+
+# Marca de agua: hasta qué ID de voto ya se procesó en un trabajo incremental.
+# El trabajo solo procesa los votos con ID mayor a este valor. La usan los resúmenes
+# de participación ('turnout') y, como punto de control, la rotación de llave AES.
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_vote_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: voto #{self.last_vote_id}"
+
+
+# ---------------------------------------------------------
+# 4. CIERRE DE LA ELECCIÓN (ElectionClosure)
+# ---------------------------------------------------------
+# Existe como máximo UNA fila (pk=1). Si existe, la elección está cerrada:
+# ya no se aceptan votos y los resultados se sirven desde el archivo final firmado.
+class ElectionClosure(models.Model):
+    closed_at = models.DateTimeField(auto_now_add=True)
+    closed_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    total_votes = models.PositiveIntegerField(default=0)
+
+    # Documento de resultados en JSON canónico (es exactamente lo que se firmó).
+    # Vacío mientras se calcula el conteo final.
+    document = models.TextField(blank=True)
+    signature = models.TextField(blank=True, help_text="Firma del servidor sobre el documento (hex).")
+    signature_algorithm = models.CharField(max_length=16, blank=True)
+    public_key = models.TextField(blank=True, help_text="Llave pública del servidor para verificar la firma.")
+
+    def __str__(self):
+        return f"Elección cerrada el {self.closed_at:%d/%m/%Y %H:%M} ({self.total_votes} votos)"
+
+
+# ---------------------------------------------------------
+# 5. BITÁCORA DE EVENTOS DE SEGURIDAD (AuditEvent)
+# ---------------------------------------------------------
+# Rastro durable de lo que antes solo era un mensaje flash: inicios de sesión,
+# generación y revisión de llaves, votos registrados y firmas rechazadas.
+# Las vistas NO escriben aquí directamente: encolan el evento y un hilo en segundo
+# plano lo guarda por lotes (ver voting/audit_log.py). Solo se agregan filas;
+# las antiguas se borran con el comando 'prune_audit_log'.
+class AuditEvent(models.Model):
+    LOGIN = 'login'
+    LOGIN_FAILED = 'login_failed'
+    KEYS_GENERATED = 'keys_generated'
+    KEY_CHECKED = 'key_checked'
+    VOTE_CAST = 'vote_cast'
+    SIGNATURE_FAILED = 'signature_failed'
+    EVENTS_DROPPED = 'events_dropped'
+
+    EVENT_TYPE_CHOICES = [
+        (LOGIN, 'Inicio de sesión'),
+        (LOGIN_FAILED, 'Inicio de sesión fallido'),
+        (KEYS_GENERATED, 'Llaves generadas'),
+        (KEY_CHECKED, 'Llave revisada'),
+        (VOTE_CAST, 'Voto registrado'),
+        (SIGNATURE_FAILED, 'Firma rechazada'),
+        (EVENTS_DROPPED, 'Eventos descartados (sobrecarga)'),
+    ]
+
+    # Cuándo ocurrió (en la petición), no cuándo lo guardó el hilo escritor.
+    created_at = models.DateTimeField()
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    # Sin llave foránea: el rastro se conserva aunque el usuario se borre, y guardar
+    # un evento nunca espera a (ni falla por) la tabla de usuarios.
+    user_id = models.IntegerField(null=True, blank=True)
+    username = models.CharField(max_length=150, blank=True, help_text="Correo del votante (o el intentado, si falló).")
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    details = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        # La búsqueda del personal filtra por votante y/o tipo y pide lo más reciente primero.
+        indexes = [
+            models.Index(fields=['-created_at'], name='audit_event_recent_idx'),
+            models.Index(fields=['event_type', '-created_at'], name='audit_event_type_idx'),
+            models.Index(fields=['username', '-created_at'], name='audit_event_voter_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} {self.event_type} {self.username or '-'}"
@@ -0,0 +1,142 @@
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+# ---------------------------------------------------------
+# PERFILADOR DE PETICIONES POR MUESTREO (Rendimiento)
+# ---------------------------------------------------------
+# Cuando la votación o el tablero se ponen lentos en producción, este middleware
+# perfila (con cProfile) una fracción de las peticiones, o las que un administrador
+# pida explícitamente con la cabecera 'X-Profile: 1'.
+#
+# Cada perfil se guarda en PROFILER_DIR como dos archivos:
+#   - <id>.prof  -> el perfil completo (se abre con 'python -m pstats' o snakeviz)
+#   - <id>.json  -> un resumen: vista, duración y tiempo por categoría (ORM, plantillas, cripto)
+# Solo se conservan los PROFILER_MAX_FILES perfiles más recientes.
+
+# Qué fragmentos de ruta de archivo (o de nombre de función, para las funciones
+# escritas en C como sqlite3.Cursor.execute) pertenecen a cada categoría de tiempo.
+PROFILE_CATEGORIES = {
+    'orm': (os.sep + os.path.join('django', 'db') + os.sep, 'sqlite3.', 'psycopg'),
+    'templates': (os.sep + os.path.join('django', 'template') + os.sep,),
+    'crypto': ('crypto_utils.py', os.sep + 'Crypto' + os.sep),
+}
+
+
+def categorize_stats(profiler):
+    """
+    Reparte el tiempo propio (tottime) de cada función entre ORM, plantillas,
+    criptografía y 'other'. Como usamos tiempo propio, no se cuenta nada dos veces.
+    """
+    import pstats  # Solo al perfilar: no se carga al arrancar cada worker.
+
+    totals = {name: 0.0 for name in PROFILE_CATEGORIES}
+    totals['other'] = 0.0
+
+    stats = pstats.Stats(profiler)
+    for (filename, _line, func), (_cc, _nc, tottime, _ct, _callers) in stats.stats.items():
+        location = f"{filename}:{func}"
+        for name, fragments in PROFILE_CATEGORIES.items():
+            if any(fragment in location for fragment in fragments):
+                totals[name] += tottime
+                break
+        else:
+            totals['other'] += tottime
+
+    return {name: round(seconds * 1000, 2) for name, seconds in totals.items()}
+
+
+def rotate_profiles(profile_dir, max_files):
+    """Borra los perfiles más antiguos para conservar solo los últimos 'max_files'."""
+    summaries = sorted(profile_dir.glob('*.json'), key=lambda path: path.stat().st_mtime)
+    for summary in summaries[:max(len(summaries) - max_files, 0)]:
+        summary.unlink(missing_ok=True)
+        summary.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def load_profile_summaries(profile_dir=None):
+    """Lee todos los resúmenes JSON guardados (se usa en la página de perfiles)."""
+    profile_dir = Path(profile_dir or settings.PROFILER_DIR)
+    summaries = []
+    for path in profile_dir.glob('*.json'):
+        try:
+            summaries.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            # El archivo pudo ser rotado o quedar a medias mientras lo leíamos.
+            continue
+    return summaries
+
+
+class SamplingProfilerMiddleware:
+    """
+    Perfila una muestra de las peticiones.
+    Si PROFILER_SAMPLE_RATE es 0 y no llega la cabecera, solo cuesta una comparación.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0.0)
+        self.header = getattr(settings, 'PROFILER_HEADER', 'HTTP_X_PROFILE')
+        self.profile_dir = Path(getattr(settings, 'PROFILER_DIR', settings.BASE_DIR / 'profiles'))
+        self.max_files = getattr(settings, 'PROFILER_MAX_FILES', 200)
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        import cProfile  # Carga perezosa: la mayoría de las peticiones nunca se perfilan.
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Ya hay otro perfilador activo en este proceso: atendemos sin perfilar.
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            self._save_profile(request, response, profiler, duration_ms)
+        except OSError:
+            # Un disco lleno o sin permisos nunca debe tumbar la petición del votante.
+            pass
+        return response
+
+    def _should_profile(self, request):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        # La cabecera solo vale para administradores autenticados.
+        if request.META.get(self.header):
+            user = getattr(request, 'user', None)
+            return bool(user and user.is_authenticated and user.is_staff)
+        return False
+
+    def _save_profile(self, request, response, profiler, duration_ms):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+        match = getattr(request, 'resolver_match', None)
+        profile_id = f"{time.time_ns()}-{os.getpid()}"
+
+        profiler.dump_stats(self.profile_dir / f"{profile_id}.prof")
+        summary = {
+            'id': profile_id,
+            'timestamp': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else 'sin-vista',
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'categories_ms': categorize_stats(profiler),
+        }
+        (self.profile_dir / f"{profile_id}.json").write_text(json.dumps(summary), encoding='utf-8')
+
+        rotate_profiles(self.profile_dir, self.max_files)
@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.functions import Substr
+
+from .models import Vote
+from .sharding import scatter, vote_shards
+
+# ---------------------------------------------------------
+# CONSULTAS "CALIENTES" (las que corren en cada visita)
+# ---------------------------------------------------------
+# Viven aquí, con nombre, para que las vistas y las pruebas de planes de ejecución
+# (voting/tests.py -> QueryPlanRegressionTests) usen EXACTAMENTE la misma consulta.
+# Si cambias una, las pruebas revisan con EXPLAIN que siga usando sus índices.
+# Las de votos reciben la base ('using'): con particiones (voting/sharding.py) se
+# ejecutan una vez por partición.
+
+# Cuántos caracteres de cada hash (firma / cifrado) mostramos en las tablas.
+# El valor completo se pide bajo demanda al endpoint 'vote_crypto_detail'.
+HASH_PREVIEW_LENGTH = 24
+
+
+def _with_hash_previews(queryset):
+    """No carga los hashes completos, solo un prefijo para la vista previa."""
+    return queryset.defer('encrypted_vote', 'digital_signature').annotate(
+        encrypted_preview=Substr('encrypted_vote', 1, HASH_PREVIEW_LENGTH),
+        signature_preview=Substr('digital_signature', 1, HASH_PREVIEW_LENGTH),
+    )
+
+
+def dashboard_votes(using=DEFAULT_DB_ALIAS):
+    """
+    Conteo de resultados (voting:results_api, cierre): solo el texto de cada voto, en orden de llegada
+    (recorre la llave primaria). Ni firmas, ni cifrados, ni votantes: para contar basta con 'option'.
+    """
+    return Vote.objects.using(using).order_by('id').values_list('option', flat=True)
+
+
+def audit_votes(using=DEFAULT_DB_ALIAS):
+    """
+    Auditoría (staff): todos los votos con su votante y vistas previas de los hashes.
+    El usuario (correo) está en 'default': lo agrega election.gather_audit_votes con una consulta aparte.
+    """
+    return _with_hash_previews(Vote.objects.using(using).select_related('voter')).order_by('id')
+
+
+def gather_audit_votes(after_id=0, limit=None):
+    """
+    audit_votes de todas las particiones, en orden de ID: cada partición tiene su propio
+    rango de IDs, así que basta con juntarlas en orden.
+    Con 'limit' devuelve una página: los primeros 'limit' votos con ID mayor que 'after_id'
+    (paginación por llave: id > N usa la llave primaria, sin OFFSET). Las particiones se
+    leen una tras otra y se para en cuanto la página está llena.
+    Sin 'limit', todas las particiones a la vez (en paralelo).
+    Los usuarios se cargan de 'default' con UNA consulta y se enlazan a cada perfil.
+    """
+    if limit is None:
+        votes = [vote for shard_votes in scatter(lambda alias: list(audit_votes(alias).filter(id__gt=after_id)))
+                 for vote in shard_votes]
+    else:
+        votes = []
+        for alias in vote_shards():
+            votes.extend(audit_votes(alias).filter(id__gt=after_id)[:limit - len(votes)])
+            if len(votes) >= limit:
+                break
+    users = User.objects.in_bulk({vote.voter.user_id for vote in votes})
+    for vote in votes:
+        vote.voter.user = users.get(vote.voter.user_id)
+    return votes
+
+
+def voter_votes(profile):
+    """
+    Verificación personal: los votos del votante (todos son del usuario de la sesión),
+    del más reciente al más antiguo. Se leen de la base donde está su perfil.
+    Filtramos por el perfil (voter_id = ?) y no por voter__user: con la igualdad directa
+    el índice compuesto (voter, -timestamp) de Vote busca Y entrega las filas ya ordenadas.
+    """
+    return _with_hash_previews(
+        Vote.objects.using(profile._state.db or DEFAULT_DB_ALIAS).filter(voter=profile)
+    ).order_by('-timestamp')
+
+
+def registered_users(email):
+    """Registro: ¿ya existe una cuenta con este correo? (el correo es el username, único)."""
+    return User.objects.filter(username=email)
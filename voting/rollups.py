@@ -0,0 +1,218 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .archive import list_segments
+from .models import RollupWatermark, TurnoutRollup, Vote
+from .sharding import scatter, vote_shards
+from .vote_utils import parse_vote_content
+
+# ---------------------------------------------------------
+# RESÚMENES INCREMENTALES DE PARTICIPACIÓN
+# ---------------------------------------------------------
+# En vez de agrupar toda la tabla Vote cada vez que alguien mira el gráfico,
+# sumamos los votos nuevos (ID mayor que la marca de agua) en la tabla TurnoutRollup.
+# Lo llama SOLO el comando 'refresh_turnout' (cron o proceso aparte con --interval): el
+# endpoint JSON solo lee los resúmenes, así una visita al tablero nunca abre una escritura.
+# Con particiones (voting/sharding.py) cada una tiene su propia marca de agua
+# ('turnout:<alias>'); los resúmenes son uno solo, en 'default'.
+#
+# Límite de la marca de agua: SAFETY_LAG es solo un margen de tiempo. Un voto que recibe su
+# ID y tarda más de SAFETY_LAG en confirmarse queda con un ID menor que la marca y la pasada
+# incremental ya no lo ve. Por eso 'refresh_turnout' también concilia las últimas horas
+# (reconcile_turnout_rollups: compara cada hora con un COUNT(*) y la recalcula si no cuadra)
+# y, para reparar todo, tiene --rebuild (rebuild_turnout_rollups).
+
+WATERMARK_NAME = 'turnout'
+
+
+def watermark_name(alias):
+    return WATERMARK_NAME if alias == DEFAULT_DB_ALIAS else f"{WATERMARK_NAME}:{alias}"
+
+# Solo sumamos votos con al menos estos segundos de antigüedad. Un ID se asigna
+# antes del COMMIT, así que un voto todavía sin confirmar podría quedar "detrás"
+# de la marca de agua; con este margen le damos tiempo a terminar su transacción.
+SAFETY_LAG = timedelta(seconds=5)
+
+# Horas recientes que revisa cada conciliación (un voto no tarda horas en confirmarse).
+RECONCILE_HOURS = 2
+
+BUCKET_TRUNCATE = {
+    'minute': lambda ts: ts.replace(second=0, microsecond=0),
+    'hour': lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+}
+
+
+def refresh_turnout_rollups(chunk_size=5000):
+    """
+    Suma en TurnoutRollup un bloque de votos posteriores a la marca de agua de cada partición.
+    Retorna cuántos votos procesó (0 si ya estaba al día u otro proceso se adelantó).
+    """
+    return sum(_refresh_shard(alias, chunk_size) for alias in vote_shards())
+
+
+def _refresh_shard(alias, chunk_size):
+    cutoff = timezone.now() - SAFETY_LAG
+
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.get_or_create(name=watermark_name(alias))
+        # Los IDs de una partición empiezan en su rango (ver sharding.SHARD_ID_SPACE).
+        start_id = watermark.last_vote_id
+
+        # Recorremos por la llave primaria (indexada): nunca escaneamos la tabla completa.
+        new_votes = []
+        for vote in (Vote.objects.using(alias).filter(id__gt=start_id)
+                     .order_by('id')
+                     .values_list('id', 'timestamp', 'option')[:chunk_size]):
+            # Nos detenemos en el primer voto demasiado reciente (no lo saltamos).
+            if vote[1] > cutoff:
+                break
+            new_votes.append(vote)
+        if not new_votes:
+            return 0
+
+        # "Reclamamos" el bloque moviendo la marca de agua solo si nadie la movió antes.
+        # Si otro proceso ganó, su UPDATE nos bloquea y luego el nuestro afecta 0 filas.
+        claimed = RollupWatermark.objects.filter(
+            pk=watermark.pk, last_vote_id=start_id
+        ).update(last_vote_id=new_votes[-1][0])
+        if not claimed:
+            return 0
+
+        _apply_increments(_count_votes((timestamp, option) for _vote_id, timestamp, option in new_votes))
+
+    return len(new_votes)
+
+
+def _count_votes(votes):
+    """Contadores {(granularidad, cubeta, pregunta, respuesta): votos} de una secuencia de (fecha, contenido)."""
+    increments = Counter()
+    for timestamp, option in votes:
+        answers = parse_vote_content(option)
+        for granularity, truncate in BUCKET_TRUNCATE.items():
+            bucket = truncate(timestamp)
+            increments[(granularity, bucket, '', '')] += 1
+            for question, answer in answers.items():
+                increments[(granularity, bucket, question, answer)] += 1
+    return increments
+
+
+def _locked_watermarks():
+    """
+    {alias: último ID sumado}, con las marcas bloqueadas hasta el fin de la transacción:
+    mientras tanto ninguna pasada incremental puede reclamar (ni sumar) un bloque.
+    """
+    names = {watermark_name(alias): alias for alias in vote_shards()}
+    locked = RollupWatermark.objects.select_for_update().filter(name__in=names)
+    last_ids = {names[name]: last_vote_id for name, last_vote_id in locked.values_list('name', 'last_vote_id')}
+    return {alias: last_ids.get(alias, 0) for alias in vote_shards()}
+
+
+def reconcile_turnout_rollups(hours=RECONCILE_HOURS):
+    """
+    Compara el total de cada hora de las últimas 'hours' con un COUNT(*) de los votos que la
+    marca de agua ya cubre (ID <= marca) y recalcula (hora y sus minutos) las que no cuadran:
+    así se suman los votos que se confirmaron tarde, detrás de la marca.
+    Retorna cuántas horas corrigió.
+    """
+    # archive_ballots borra de la tabla viva los votos ya archivados: contarla ya no sirve.
+    if list_segments():
+        return 0
+    since = BUCKET_TRUNCATE['hour'](timezone.now() - timedelta(hours=hours))
+
+    with transaction.atomic():
+        last_ids = _locked_watermarks()
+
+        def count_hours(alias):
+            # Rango sobre el índice de la fecha, agrupado por hora en la base.
+            return (Vote.objects.using(alias)
+                    .filter(timestamp__gte=since, id__lte=last_ids[alias])
+                    .annotate(hour=TruncHour('timestamp')).order_by()
+                    .values('hour').annotate(votes=Count('id')).values_list('hour', 'votes'))
+
+        live = Counter()
+        for hours_counted in scatter(lambda alias: list(count_hours(alias))):
+            live.update(dict(hours_counted))
+        stored = dict(TurnoutRollup.objects.filter(granularity='hour', question='', bucket_start__gte=since)
+                      .values_list('bucket_start', 'count'))
+
+        wrong = sorted(hour for hour in live.keys() | stored.keys() if live[hour] != stored.get(hour, 0))
+        for hour in wrong:
+            end = hour + timedelta(hours=1)
+            increments = Counter()
+            for alias in vote_shards():
+                increments.update(_count_votes(
+                    Vote.objects.using(alias)
+                    .filter(timestamp__gte=hour, timestamp__lt=end, id__lte=last_ids[alias])
+                    .values_list('timestamp', 'option').iterator()
+                ))
+            TurnoutRollup.objects.filter(bucket_start__gte=hour, bucket_start__lt=end).delete()
+            _apply_increments(increments)
+
+    return len(wrong)
+
+
+def rebuild_turnout_rollups():
+    """
+    Borra todos los resúmenes y regresa a cero las marcas de agua de las particiones:
+    las siguientes pasadas de refresh_turnout_rollups recuentan la tabla de votos completa.
+    """
+    with transaction.atomic():
+        _locked_watermarks()
+        TurnoutRollup.objects.all().delete()
+        RollupWatermark.objects.filter(name__in=[watermark_name(alias) for alias in vote_shards()]) \
+            .update(last_vote_id=0)
+
+
+def _apply_increments(increments):
+    """Suma los contadores a las filas existentes y crea las que faltan."""
+    buckets = {(granularity, bucket) for granularity, bucket, _q, _a in increments}
+    existing = {}
+    for granularity in BUCKET_TRUNCATE:
+        starts = [bucket for g, bucket in buckets if g == granularity]
+        if not starts:
+            continue
+        for row in TurnoutRollup.objects.filter(granularity=granularity, bucket_start__in=starts):
+            existing[(row.granularity, row.bucket_start, row.question, row.answer)] = row
+
+    to_update, to_create = [], []
+    for key, amount in increments.items():
+        row = existing.get(key)
+        if row:
+            row.count += amount
+            to_update.append(row)
+        else:
+            granularity, bucket, question, answer = key
+            to_create.append(TurnoutRollup(
+                granularity=granularity, bucket_start=bucket,
+                question=question, answer=answer, count=amount,
+            ))
+
+    TurnoutRollup.objects.bulk_update(to_update, ['count'], batch_size=500)
+    TurnoutRollup.objects.bulk_create(to_create, batch_size=500)
+
+
+def get_turnout_series(granularity, start=None, end=None):
+    """
+    Lee la serie de participación ya agrupada, en orden cronológico.
+    Retorna una lista de {'start', 'votes', 'answers': {'P1': {'ALTO': n, ...}, ...}}.
+    """
+    rows = TurnoutRollup.objects.filter(granularity=granularity)
+    if start:
+        rows = rows.filter(bucket_start__gte=start)
+    if end:
+        rows = rows.filter(bucket_start__lte=end)
+
+    series = {}
+    for bucket, question, answer, count in rows.order_by('bucket_start').values_list(
+            'bucket_start', 'question', 'answer', 'count'):
+        point = series.setdefault(bucket, {'start': bucket, 'votes': 0, 'answers': {}})
+        if question:
+            point['answers'].setdefault(question, {})[answer] = count
+        else:
+            point['votes'] = count
+    return list(series.values())
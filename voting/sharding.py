@@ -0,0 +1,208 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_delete, post_migrate
+from django.dispatch import receiver
+
+# ---------------------------------------------------------
+# PARTICIONADO (SHARDING) DE VOTANTES Y VOTOS
+# ---------------------------------------------------------
+# Con una sola base de datos, todos los votos se confirman (COMMIT) en el mismo servidor.
+# Con VOTE_SHARD_URLS (ver settings) los perfiles de votante y sus votos se reparten en
+# N bases: cada votante vive COMPLETO en una (su perfil y sus votos), así que votar es
+# una transacción en una sola base y N bases aceptan N veces más COMMITs por segundo.
+#
+# - La partición de un votante sale de un hash estable de su ID de usuario
+#   (shard_for_user): no depende del proceso ni del orden de llegada.
+# - Usuarios, sesiones, cierre de la elección y resúmenes siguen en 'default'.
+# - Cada partición entrega IDs en su propio rango (partición i: desde i * SHARD_ID_SPACE),
+#   así los IDs de votos y perfiles siguen siendo únicos y el ID dice en qué base está
+#   (shard_for_object_id): los enlaces /votes/<id>/ y el archivo frío no cambian.
+# - Los conteos y la auditoría preguntan a todas las particiones a la vez (scatter) y
+#   juntan los resultados parciales (gather).
+# Sin VOTE_SHARD_URLS hay una sola partición, 'default', y todo funciona como antes.
+#
+# Cambiar el número de particiones cambia a qué base va cada votante: hay que mover
+# los datos antes (no hay comando para eso todavía).
+
+# Modelos de la app 'voting' que viven en las particiones.
+SHARDED_MODELS = {'voterprofile', 'vote'}
+
+# Tamaño del rango de IDs de cada partición (un billón de filas por partición).
+SHARD_ID_SPACE = 10**12
+
+
+def vote_shards():
+    """Alias de las bases con votantes y votos, en orden (el orden define los rangos de IDs)."""
+    return settings.VOTE_SHARDS
+
+
+def is_sharded():
+    return vote_shards() != [DEFAULT_DB_ALIAS]
+
+
+def is_sharded_model(model):
+    return model._meta.app_label == 'voting' and model._meta.model_name in SHARDED_MODELS
+
+
+def shard_for_user(user_id):
+    """Partición de un votante: hash estable (BLAKE2b) de su ID de usuario."""
+    shards = vote_shards()
+    if len(shards) == 1:
+        return shards[0]
+    digest = hashlib.blake2b(str(user_id).encode(), digest_size=8).digest()
+    return shards[int.from_bytes(digest, 'big') % len(shards)]
+
+
+def shard_for_object_id(object_id):
+    """Partición de un perfil o voto a partir de su ID (por el rango). None si no corresponde a ninguna."""
+    shards = vote_shards()
+    if len(shards) == 1:
+        return shards[0]
+    index = int(object_id) // SHARD_ID_SPACE
+    return shards[index] if 0 <= index < len(shards) else None
+
+
+def group_by_shard(object_ids):
+    """{alias: [IDs]} para repartir una lista de IDs de perfil o voto por partición."""
+    groups = {}
+    for object_id in object_ids:
+        alias = shard_for_object_id(object_id)
+        if alias is not None:
+            groups.setdefault(alias, []).append(object_id)
+    return groups
+
+
+def _run_on_shard(task, alias):
+    try:
+        return task(alias)
+    finally:
+        # El hilo es temporal: cerramos la conexión que abrió (las conexiones son por hilo).
+        connections.close_all()
+
+
+def scatter(task, shards=None):
+    """
+    Ejecuta task(alias) en cada partición al mismo tiempo (un hilo por base: el tiempo
+    se va esperando a la base, no en Python) y retorna los resultados en el orden de las particiones.
+    Con una sola partición, o si este hilo tiene una transacción abierta en alguna de
+    ellas (otro hilo no vería sus cambios sin confirmar), se ejecuta aquí mismo, en orden.
+    """
+    shards = list(vote_shards() if shards is None else shards)
+    if len(shards) <= 1 or any(connections[alias].in_atomic_block for alias in shards):
+        return [task(alias) for alias in shards]
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        return list(executor.map(lambda alias: _run_on_shard(task, alias), shards))
+
+
+class VoterShardRouter:
+    """
+    Router de Django (settings.DATABASE_ROUTERS):
+    - VoterProfile y Vote van a la partición del votante. Django nos da la pista 'instance'
+      al guardar y al seguir relaciones (profile.vote_set, user.voterprofile...).
+      Sin pista (Vote.objects.filter(...)) no hay forma de saberlo: ese código debe usar
+      .using(alias), scatter() o los ayudantes de este módulo.
+    - Todo lo demás va a 'default'.
+    """
+
+    def _db_for(self, model, instance):
+        if not is_sharded_model(model):
+            return DEFAULT_DB_ALIAS
+        if not is_sharded():
+            return DEFAULT_DB_ALIAS
+        if instance is None:
+            return None
+        if is_sharded_model(type(instance)) and instance._state.db:
+            return instance._state.db
+        if isinstance(instance, get_user_model()):
+            return shard_for_user(instance.pk)
+        if type(instance)._meta.model_name == 'voterprofile':
+            return shard_for_user(instance.user_id)
+        if type(instance)._meta.model_name == 'vote':
+            if type(instance).voter.is_cached(instance):
+                return instance.voter._state.db or shard_for_user(instance.voter.user_id)
+            return shard_for_object_id(instance.voter_id) if instance.voter_id else None
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Perfil <-> usuario cruza bases a propósito (sin FOREIGN KEY en la base, ver models.py).
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == 'voting' and model_name in SHARDED_MODELS:
+            # También en 'default' (vacías si está particionado): así el borrado en cascada
+            # de un User, que Django busca en la base del usuario, no falla.
+            return db == DEFAULT_DB_ALIAS or db in vote_shards()
+        if app_label in ('auth', 'contenttypes') and db in vote_shards():
+            # Tablas vacías de apoyo: la migración inicial del perfil crea una FOREIGN KEY
+            # hacia auth_user (PostgreSQL exige que la tabla exista). 0009 la quita.
+            return True
+        return db == DEFAULT_DB_ALIAS
+
+
+# ---------------------------------------------------------
+# RANGOS DE IDS POR PARTICIÓN
+# ---------------------------------------------------------
+# Tras 'migrate --database <alias>', el autoincremento de la partición i empieza en
+# i * SHARD_ID_SPACE (si la tabla ya tiene IDs más altos, no se toca).
+SEQUENCE_SQL = {
+    'sqlite': [
+        "UPDATE sqlite_sequence SET seq = %(start)s WHERE name = %(table)s AND seq < %(start)s",
+        "INSERT INTO sqlite_sequence (name, seq) SELECT %(table)s, %(start)s "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %(table)s)",
+    ],
+    'postgresql': [
+        "SELECT setval(pg_get_serial_sequence(%(table)s, 'id'), %(start)s) "
+        "WHERE (SELECT COALESCE(MAX(id), 0) FROM {table}) < %(start)s",
+    ],
+    'mysql': [
+        "ALTER TABLE {table} AUTO_INCREMENT = {start}",
+    ],
+}
+
+
+def reserve_id_range(alias):
+    """Hace que los IDs nuevos de la partición 'alias' salgan de su rango."""
+    index = vote_shards().index(alias)
+    if index == 0:
+        return  # La primera partición usa el rango normal (1, 2, 3...).
+    connection = connections[alias]
+    # settings.VOTE_SHARD_ENGINES ya rechazó al arrancar los motores que no están aquí.
+    statements = SEQUENCE_SQL[connection.vendor]
+    start = index * SHARD_ID_SPACE
+    from .models import Vote, VoterProfile
+    with connection.cursor() as cursor:
+        for model in (VoterProfile, Vote):
+            table = model._meta.db_table
+            if connection.vendor == 'mysql':
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM " + connection.ops.quote_name(table))
+                if cursor.fetchone()[0] >= start:
+                    continue
+            for statement in statements:
+                cursor.execute(
+                    statement.format(table=connection.ops.quote_name(table), start=start),
+                    {'table': table, 'start': start},
+                )
+
+
+@receiver(post_migrate)
+def reserve_shard_id_ranges(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if sender.name == 'voting' and is_sharded() and using in vote_shards():
+        reserve_id_range(using)
+
+
+@receiver(post_delete, sender=get_user_model())
+def delete_sharded_profile(sender, instance, **kwargs):
+    # La cascada de Django busca el perfil en la base del usuario; en su partición lo borramos aquí.
+    if is_sharded():
+        from .models import VoterProfile
+        VoterProfile.objects.using(shard_for_user(instance.pk)).filter(user_id=instance.pk).delete()
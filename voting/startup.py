@@ -0,0 +1,36 @@
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+from .crypto_utils import preload_crypto
+
+# ---------------------------------------------------------
+# PRECARGA (arranque rápido de los workers)
+# ---------------------------------------------------------
+# gunicorn con preload_app (ver gunicorn.conf.py) carga la aplicación UNA vez en el proceso
+# maestro y después crea los workers con fork(). Todo lo que importemos o compilemos aquí
+# lo heredan los workers ya listo (y compartido en memoria hasta que se modifique), así
+# que un worker nuevo atiende su primera petición sin pagar importaciones ni compilaciones.
+
+# Plantillas de las páginas más visitadas: con el cargador en caché (DEBUG=False)
+# quedan compiladas en el maestro.
+WARM_TEMPLATES = (
+    'base.html',
+    'login.html',
+    'register.html',
+    'voting/index.html',
+    'voting/guide.html',
+    'voting/vote_form.html',
+    'voting/results_dashboard.html',
+)
+
+
+def warm_up():
+    """Importa la criptografía, todas las vistas (vía las URLs) y compila las plantillas principales."""
+    preload_crypto()
+    # Resolver las URLs importa views.py, forms.py y todo lo que cuelga de ellos.
+    get_resolver().url_patterns
+    for template_name in WARM_TEMPLATES:
+        get_template(template_name)
+    # Ninguna conexión abierta en el maestro puede pasar a los workers (compartirían el socket).
+    connections.close_all()
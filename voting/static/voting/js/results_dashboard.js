@@ -0,0 +1,193 @@
+// ---------------------------------------------------------
+// TABLERO DE RESULTADOS, AUDITORÍA Y VERIFICACIÓN
+// ---------------------------------------------------------
+// Archivo estático (voting/results_dashboard.html lo carga al final de la página).
+// El HTML ya no trae los datos: los gráficos piden un JSON pequeño
+// (data-url del contenedor #resultsCharts) y la participación su propio endpoint.
+// Cada función revisa si su parte existe en la página, así un solo archivo sirve
+// para el tablero, la auditoría y la verificación.
+(function() {
+    'use strict';
+
+    const BACKGROUND_COLORS = [
+        'rgba(41, 121, 255, 0.9)',  // Azul
+        'rgba(255, 99, 132, 0.9)', // Rojo
+        'rgba(255, 193, 7, 0.9)',  // Amarillo
+        'rgba(40, 167, 69, 0.9)',  // Verde
+        'rgba(153, 102, 255, 0.9)', // Violeta
+    ];
+    const BORDER_COLORS = BACKGROUND_COLORS.map(function(color) { return color.replace('0.9', '1'); });
+
+    function fetchJson(url) {
+        return fetch(url, { credentials: 'same-origin' }).then(function(response) {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    // --- Gráfico de dona/anillo de una pregunta ---
+    function drawChart(canvas, labels, data) {
+        // Si no hay datos, sustituimos el canvas por un mensaje.
+        if (data.length === 0 || data.every(function(count) { return count === 0; })) {
+            canvas.parentElement.innerHTML = '<div class="text-center p-5 text-muted">Aún no hay votos registrados para este análisis.</div>';
+            return;
+        }
+
+        new Chart(canvas.getContext('2d'), {
+            type: 'doughnut',
+            data: {
+                labels: labels,
+                datasets: [{
+                    label: 'Votos',
+                    data: data,
+                    backgroundColor: BACKGROUND_COLORS.slice(0, labels.length),
+                    borderColor: BORDER_COLORS.slice(0, labels.length),
+                    borderWidth: 2
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    legend: {
+                        position: 'bottom',
+                        labels: {
+                            font: { size: 14, family: 'Inter' }
+                        }
+                    },
+                    title: {
+                        display: true,
+                        text: canvas.dataset.title,
+                        font: { size: 18, weight: 'bold' }
+                    },
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                let label = context.label || '';
+                                if (label) {
+                                    label += ': ';
+                                }
+                                // Cálculo de porcentaje
+                                const total = context.chart.data.datasets[0].data.reduce(function(a, b) { return a + b; }, 0);
+                                const currentValue = context.raw;
+                                const percentage = ((currentValue / total) * 100).toFixed(1);
+
+                                return label + currentValue + ' votos (' + percentage + '%)';
+                            }
+                        }
+                    }
+                },
+            },
+        });
+    }
+
+    // --- Total de votos y los gráficos de cada pregunta (un solo JSON) ---
+    function loadResults() {
+        const container = document.getElementById('resultsCharts');
+        if (!container) {
+            return;
+        }
+        fetchJson(container.dataset.url).then(function(payload) {
+            document.getElementById('totalVotes').textContent = payload.total_votes;
+
+            const questions = {};
+            payload.questions.forEach(function(question) { questions[question.key] = question; });
+
+            container.querySelectorAll('canvas[data-question]').forEach(function(canvas) {
+                const answers = questions[canvas.dataset.question] ? questions[canvas.dataset.question].answers : [];
+                drawChart(
+                    canvas,
+                    answers.map(function(answer) { return answer.label; }),
+                    answers.map(function(answer) { return answer.count; })
+                );
+            });
+        }).catch(function() {
+            document.getElementById('totalVotes').textContent = '—';
+        });
+    }
+
+    // --- Gráfico de participación en el tiempo ---
+    // Los datos vienen ya agrupados del endpoint JSON (tabla de resúmenes),
+    // así que cambiar entre minuto y hora solo es otra petición pequeña.
+    let turnoutChart = null;
+
+    function drawTurnout(granularity) {
+        const canvas = document.getElementById('chartTurnout');
+        fetchJson(canvas.dataset.url + '?granularity=' + granularity).then(function(payload) {
+            const labels = payload.buckets.map(function(bucket) {
+                return granularity === 'hour' ? bucket.start.slice(0, 13) + 'h' : bucket.start.slice(0, 16).replace('T', ' ');
+            });
+            const votes = payload.buckets.map(function(bucket) { return bucket.votes; });
+
+            if (turnoutChart) {
+                turnoutChart.destroy();
+            }
+            turnoutChart = new Chart(canvas.getContext('2d'), {
+                type: 'line',
+                data: {
+                    labels: labels,
+                    datasets: [{
+                        label: 'Votos',
+                        data: votes,
+                        borderColor: 'rgba(41, 121, 255, 1)',
+                        backgroundColor: 'rgba(41, 121, 255, 0.2)',
+                        fill: true,
+                        tension: 0.2
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    plugins: { legend: { display: false } },
+                    scales: { y: { beginAtZero: true, ticks: { precision: 0 } } }
+                }
+            });
+        });
+    }
+
+    function setUpTurnout() {
+        if (!document.getElementById('chartTurnout')) {
+            return;
+        }
+        document.querySelectorAll('.js-turnout-zoom').forEach(function(button) {
+            button.addEventListener('click', function() {
+                document.querySelectorAll('.js-turnout-zoom').forEach(function(other) { other.classList.remove('active'); });
+                button.classList.add('active');
+                drawTurnout(button.dataset.granularity);
+            });
+        });
+        drawTurnout('minute');
+    }
+
+    // --- CARGA BAJO DEMANDA DE HASHES COMPLETOS (AUDITORÍA / VERIFICACIÓN) ---
+    // La tabla solo trae un prefijo de cada firma y cifrado. Al hacer clic en
+    // "ver completo" pedimos el voto al endpoint JSON y reemplazamos el texto.
+    // Guardamos la promesa por URL para no repetir la petición de la otra columna.
+    const cryptoRequests = {};
+
+    document.addEventListener('click', function(event) {
+        const button = event.target.closest('.js-load-hash');
+        if (!button) {
+            return;
+        }
+        const cell = button.closest('[data-crypto-url]');
+        const url = cell.dataset.cryptoUrl;
+
+        if (!cryptoRequests[url]) {
+            cryptoRequests[url] = fetchJson(url);
+        }
+
+        button.disabled = true;
+        cryptoRequests[url].then(function(data) {
+            cell.querySelector('.hash-value').textContent = data[cell.dataset.cryptoField] || '—';
+            button.remove();
+        }).catch(function() {
+            delete cryptoRequests[url];
+            button.disabled = false;
+            button.textContent = 'reintentar';
+        });
+    });
+
+    loadResults();
+    setUpTurnout();
+})();
@@ -34,12 +34,33 @@ urlpatterns = [
     # Tablero Público: Gráficos de resultados (visible para todos)
     path('results/', views.results_dashboard_view, name='results_dashboard'), 
     
+    # Resultados finales firmados (solo existen después de cerrar la elección)
+    path('resultados-finales.json', views.final_results_json_view, name='final_results_json'),
+    
+    # API JSON: total de votos y conteo por pregunta (alimenta los gráficos del tablero)
+    path('api/results/', views.results_api_view, name='results_api'),
+    
+    # API JSON: participación por minuto u hora (alimenta el gráfico de participación)
+    path('api/turnout/', views.turnout_api_view, name='turnout_api'),
+    
+    # API JSON de los kioscos: lotes de boletas ya firmadas (token Bearer, sin sesión)
+    path('api/kiosk/ballots/', views.kiosk_ballots_view, name='kiosk_ballots'),
+    
     # Auditoría Detallada: Tabla técnica con hashes (SOLO para Admins)
     path('auditoria/', views.audit_view, name='audit_view'), 
     
     # Verificación Personal: El usuario revisa su propio historial de voto
     path('verify/', views.verification_page, name='verification_page'),
     
+    # Detalle JSON de un voto: firma y cifrado completos (se cargan bajo demanda)
+    path('votes/<int:vote_id>/crypto/', views.vote_crypto_detail, name='vote_crypto_detail'),
+    
+    # Perfiles de rendimiento: peticiones más lentas por vista (SOLO para Admins)
+    path('perfiles/', views.profiler_report_view, name='profiler_report'),
+    
+    # Bitácora de eventos de seguridad: búsqueda por votante y tipo (SOLO para Admins)
+    path('eventos/', views.audit_events_view, name='audit_events'),
+    
     # Página de créditos del equipo y materia
     path('creditos/', views.credits_view, name='credits'),
     
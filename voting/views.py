@@ -1,56 +1,40 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, Http404
+from django.http import HttpResponse, Http404, JsonResponse, FileResponse
 from django.contrib import messages
 from django.db import transaction
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 # Importamos las funciones de autenticación real
 from django.contrib.auth import login, logout, authenticate
+import hashlib
 import json
-from collections import Counter
-import re 
+import re
 from django.conf import settings 
 
 # --- IMPORTACIONES LOCALES ---
 # Traigo mis herramientas de seguridad y mis modelos de base de datos
-from .crypto_utils import generate_rsa_keys, sign_vote, encrypt_vote_aes, verify_signature
-from .models import VoterProfile, Vote 
+from .crypto_utils import generate_keys, sign_vote, encrypt_vote_aes, public_key_fingerprint, public_pem_fingerprint
+from .key_upload import KeyUploadError, read_private_key
+from .models import Vote, VoterProfile, ElectionClosure, AuditEvent
 # IMPORTANTE: Importamos los nuevos formularios que creamos en forms.py
 from .forms import CustomRegisterForm, CustomLoginForm, KeyCheckForm
-
-from Crypto.PublicKey import RSA
-
-# ---------------------------------------------------------
-# FUNCIONES AUXILIARES (Procesamiento de Texto)
-# ---------------------------------------------------------
-
-def parse_vote_content(vote_option):
-    """
-    Convierte el texto crudo del voto (ej: 'P1:ALTO|P2:FACIL') 
-    en un diccionario de Python fácil de leer.
-    """
-    results = {}
-    # Patrón: (P#):(VALOR)
-    matches = re.findall(r'(P\d+):([A-Z0-9\-]+)', vote_option)
-    for key, value in matches:
-        results[key] = value
-    return results
-
-def get_legible_label(key, value):
-    """
-    Traduce los códigos internos (ej: 'RAPIDO') a texto legible para humanos (ej: 'Muy rápido').
-    Esto se usa para mostrar gráficos y tablas bonitas.
-    """
-    if key == 'P1': 
-        return {'ALTO': 'Alto', 'MEDIO': 'Medio', 'BAJO': 'Bajo'}.get(value, value)
-    if key == 'P2': 
-        return {'FACIL': 'Fáciles', 'ADECUADO': 'Adecuados', 'DIFICIL': 'Difíciles'}.get(value, value)
-    if key == 'P3': 
-        return {'MUCHO': 'Sí, mucho', 'TAL-VEZ': 'Tal vez', 'NO-DUDA': 'No, lo dudo'}.get(value, value)
-    if key == 'P4': 
-        return {'RAPIDO': 'Muy rápido', 'ADECUADO': 'Adecuados', 'LENTO': 'Muy lento'}.get(value, value)
-    return value
-# --- Fin de Funciones Auxiliares ---
+from .profiling import load_profile_summaries
+# Bitácora de eventos de seguridad: encolar no espera a la base (ver audit_log.py)
+from .audit_log import audit_log_stats, record_event, search_events
+# Funciones auxiliares para leer el texto del voto (ej: 'P1:ALTO|P2:FACIL')
+from .vote_utils import parse_vote_content, get_legible_label, build_vote_content
+from .kiosk import KioskBatchError, authenticate_kiosk, submit_ballot_batch
+from .rollups import BUCKET_TRUNCATE, get_turnout_series
+from .election import is_election_closed, artifact_path, compute_final_tally, describe_tallies, RESULTS_HTML, RESULTS_JSON
+from .archive import find_archived_vote, find_voter_archived_votes
+# Consultas calientes con nombre (sus planes de ejecución se revisan en tests.py)
+from .queries import HASH_PREVIEW_LENGTH, gather_audit_votes, voter_votes
+from .sharding import shard_for_object_id
 
 
 # ---------------------------------------------------------
@@ -100,8 +84,13 @@ def login_view(request):
     if request.method == 'POST':
         form = CustomLoginForm(request, data=request.POST)
         if form.is_valid():
+            # Al validar, authenticate() revisa la contraseña. Si su hash se hizo con otro
+            # algoritmo u otros parámetros que los de settings (ver voting/hashers.py y el
+            # comando calibrate_password_hasher), Django la vuelve a hashear y la guarda:
+            # las cuentas se actualizan solas en su siguiente login correcto.
             user = form.get_user() 
             login(request, user)
+            record_event(AuditEvent.LOGIN, request, user=user)
             messages.success(request, f"Bienvenido de nuevo.")
             
             # --- CAMBIO CRÍTICO ---
@@ -110,6 +99,7 @@ def login_view(request):
             return redirect('voting:guide') 
             
         else:
+            record_event(AuditEvent.LOGIN_FAILED, request, username=request.POST.get('username', ''))
             messages.error(request, "Correo electrónico o contraseña incorrectos.")
     else:
         form = CustomLoginForm()
@@ -154,9 +144,11 @@ def register_view(request):
 @login_required
 def key_generation_view(request):
     """
-    Genera el par de llaves RSA (Pública y Privada).
+    Genera el par de llaves (Pública y Privada) con el algoritmo configurado
+    en settings.SIGNATURE_ALGORITHM (Ed25519 por defecto, RSA disponible).
     """
-    profile = get_object_or_404(VoterProfile, user=request.user)
+    # Perfil del votante: viene de la caché de identidad (ver voting/identity.py).
+    profile = request.voter_profile
 
     # 🛑 RESTRICCIÓN DE INTEGRIDAD 🛑
     # Si el usuario ya votó, NO le dejo generar llaves nuevas.
@@ -169,11 +161,24 @@ def key_generation_view(request):
     # Si el usuario es nuevo o no ha votado:
     if request.method == 'POST':
         # Llamamos a la función matemática para crear las llaves
-        public_key_pem, private_key_pem = generate_rsa_keys()
+        algorithm = settings.SIGNATURE_ALGORITHM
+        public_key_pem, private_key_pem = generate_keys(algorithm)
         
         # Guardamos la PÚBLICA en la base de datos (la identidad visible)
-        profile.public_key = public_key_pem
-        profile.save()
+        # junto con el algoritmo, para saber cómo verificar sus firmas después.
+        # El perfil en caché puede estar viejo (votó en otro worker o en un kiosco):
+        # lo volvemos a leer bloqueado y revisamos has_voted ahí.
+        shard = profile._state.db
+        with transaction.atomic(using=shard):
+            locked = VoterProfile.objects.using(shard).select_for_update().get(pk=profile.pk)
+            if locked.has_voted:
+                messages.error(request, "Tu voto ya ha sido emitido: No es posible generar una nueva llave pública una vez que se ha registrado un voto.")
+                return redirect('voting:verification_page')
+            locked.public_key = public_key_pem
+            locked.signature_algorithm = algorithm
+            locked.save(update_fields=['public_key', 'signature_algorithm'])
+        record_event(AuditEvent.KEYS_GENERATED, request, algorithm=algorithm,
+                     fingerprint=public_pem_fingerprint(public_key_pem))
         
         # Preparamos la PRIVADA para descargarla como archivo (el secreto del usuario)
         safe_filename = "".join([c for c in request.user.username if c.isalpha() or c.isdigit() or c==' ']).rstrip()
@@ -197,9 +202,13 @@ def vote_submission_view(request):
     """
     Recibe el voto, verifica la llave, FIRMA y ENCRIPTA.
     """
-    profile = get_object_or_404(VoterProfile, user=request.user)
+    profile = request.voter_profile
     
     # 1. Validaciones previas
+    if is_election_closed():
+        messages.error(request, "La elección ya fue cerrada. No se aceptan más votos.")
+        return redirect('voting:results_dashboard')
+
     if profile.has_voted:
         messages.warning(request, "Ya has votado. No puedes votar de nuevo.")
         return redirect('voting:success_page') 
@@ -223,40 +232,65 @@ def vote_submission_view(request):
             return render(request, 'voting/vote_form.html', {'profile': profile})
 
         try:
-            # Leemos el contenido de la llave privada subida
-            private_key_pem = private_key_file.read().decode('utf-8')
+            # Cargamos la llave privada subida (PEM o DER, ya acotada en tamaño al recibirla)
+            key_algorithm, private_key = read_private_key(private_key_file)
 
             # 3. Creamos el "paquete" de voto concatenando las respuestas
-            vote_content = (
-                f"USUARIO:{request.user.username}|P1:{pregunta_1}|P2:{pregunta_2}|P3:{pregunta_3}|P4:{pregunta_4}"
-            )
-
-            # 4. FIRMA DIGITAL (Autenticación)
-            # Usamos la llave privada subida para firmar el contenido.
-            signature_hex = sign_vote(vote_content, private_key_pem)
-            
-            # 5. VERIFICACIÓN INMEDIATA
-            # Comprobamos que la llave privada que subió coincide con la pública que tenemos guardada.
-            if not verify_signature(vote_content, signature_hex, profile.public_key):
+            vote_content = build_vote_content(request.user.username, {
+                'P1': pregunta_1, 'P2': pregunta_2, 'P3': pregunta_3, 'P4': pregunta_4,
+            })
+
+            # 4. VERIFICACIÓN DE LA LLAVE (antes de firmar)
+            # Comprobamos que la llave privada que subió coincide con la pública que tenemos guardada:
+            # misma huella de llave pública = la firma será válida (sin verificarla aparte).
+            if (key_algorithm != profile.signature_algorithm
+                    or public_key_fingerprint(private_key) != public_pem_fingerprint(profile.public_key)):
+                 record_event(AuditEvent.SIGNATURE_FAILED, request, channel='web', reason='key_mismatch')
                  messages.error(request, "La llave privada subida no corresponde a su llave pública registrada.")
                  return redirect(reverse('voting:vote_submit')) 
 
+            # 5. FIRMA DIGITAL (Autenticación)
+            # Usamos la llave privada subida (ya cargada) para firmar el contenido.
+            signature_hex = sign_vote(vote_content, private_key, profile.signature_algorithm)
+
             # 6. ENCRIPTACIÓN (Confidencialidad)
             # Encriptamos el voto con AES para que nadie pueda leerlo en la BD.
             encrypted_vote_hex = encrypt_vote_aes(vote_content)
 
             # 7. GUARDADO EN BASE DE DATOS
             # Usamos transaction.atomic para asegurar que se guarde todo o nada.
-            with transaction.atomic():
-                Vote.objects.create(
-                    voter=profile,
+            # El voto y el perfil viven en la misma base (la partición del votante).
+            shard = profile._state.db
+            with transaction.atomic(using=shard):
+                # El perfil de la caché puede estar viejo (el votante pudo votar en otro
+                # worker o en un kiosco): lo leemos de nuevo BLOQUEADO, igual que kiosk.py.
+                # Dos votos del mismo votante se esperan aquí y el segundo ve has_voted.
+                locked = VoterProfile.objects.using(shard).select_for_update().get(pk=profile.pk)
+                if locked.has_voted:
+                    messages.warning(request, "Ya has votado. No puedes votar de nuevo.")
+                    return redirect('voting:success_page')
+                if locked.public_key != profile.public_key:
+                    messages.error(request, "Tu llave pública cambió mientras votabas. Vuelve a intentarlo.")
+                    return redirect(reverse('voting:vote_submit'))
+
+                vote = Vote.objects.using(shard).create(
+                    voter=locked,
                     option=vote_content, # Guardamos el texto plano (opcional según requisitos)
                     digital_signature=signature_hex, # Guardamos la firma
                     encrypted_vote=encrypted_vote_hex # Guardamos el cifrado
                 )
                 # Marcamos al usuario como "ya votó"
-                profile.has_voted = True
-                profile.save()
+                locked.has_voted = True
+                locked.save(update_fields=['has_voted'])
+
+                # Revisamos el cierre DESPUÉS de escribir el voto: close_election espera a las
+                # transacciones que ya escribieron antes de contar (ver election.py), así que
+                # o este voto entra en el conteo final o aquí vemos el cierre y lo deshacemos.
+                if is_election_closed():
+                    transaction.set_rollback(True, using=shard)
+                    messages.error(request, "La elección se cerró antes de registrar tu voto.")
+                    return redirect('voting:results_dashboard')
+            record_event(AuditEvent.VOTE_CAST, request, channel='web', vote_id=vote.pk)
             
             messages.success(request, "¡Voto firmado y procesado con éxito!")
             # Guardamos la firma en sesión para mostrarla en la pantalla de éxito
@@ -264,6 +298,7 @@ def vote_submission_view(request):
             return redirect('voting:success_page')
 
         except Exception as e:
+            record_event(AuditEvent.SIGNATURE_FAILED, request, channel='web', reason='error', error=str(e)[:200])
             messages.error(request, f"Error Criptográfico o de Archivo: {e}")
             return render(request, 'voting/vote_form.html', {'profile': profile})
 
@@ -281,87 +316,173 @@ def success_page(request):
 # VISTAS DE RESULTADOS Y AUDITORÍA
 # ---------------------------------------------------------
 
-def get_counts_for_question(question_key, votes):
-    """Cuenta cuántos votos tiene cada opción para generar gráficos."""
-    results = []
-    for vote in votes:
-        parsed_data = parse_vote_content(vote.option)
-        if question_key in parsed_data:
-            results.append(parsed_data[question_key])
-    
-    counts = Counter(results)
-    options = [get_legible_label(question_key, key) for key in counts.keys()]
-    
-    return {
-        'options': json.dumps(options), 
-        'counts': json.dumps(list(counts.values()))
-    }
+# El campo oculto del token CSRF: su valor va enmascarado distinto en cada respuesta.
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]*"')
 
-@login_required 
+
+@login_required
 def results_dashboard_view(request):
     """
     Tablero Público: Muestra estadísticas generales.
     Cualquier usuario logueado puede ver esto.
-    """
-    is_admin = request.user.is_staff
-    all_votes = Vote.objects.all().select_related('voter').order_by('id') 
-    
-    # Preparamos datos para los 4 gráficos
-    data_p1 = get_counts_for_question('P1', all_votes)
-    data_p2 = get_counts_for_question('P2', all_votes)
-    data_p3 = get_counts_for_question('P3', all_votes)
-    data_p4 = get_counts_for_question('P4', all_votes)
+    Si la elección ya cerró, entrega la página final firmada (sin contar nada).
 
-    total_votes = len(all_votes)
+    Aquí NO se cuenta nada: la página es solo el "cascarón" (títulos y lienzos vacíos) y los
+    números llegan por JSON (results_api_view). El cascarón lleva el usuario, sus mensajes,
+    el token CSRF y los controles del personal: el navegador debe revalidarlo SIEMPRE
+    (private, no-cache). Si nada cambió, la ETag coincide y se responde 304 sin el HTML.
+    """
+    if is_election_closed() and artifact_path(RESULTS_HTML).exists():
+        return serve_election_artifact(request, RESULTS_HTML, 'text/html; charset=utf-8')
 
     context = {
-        'total_votes': total_votes,
-        'options_json_p1': data_p1['options'], 'counts_json_p1': data_p1['counts'],
-        'options_json_p2': data_p2['options'], 'counts_json_p2': data_p2['counts'],
-        'options_json_p3': data_p3['options'], 'counts_json_p3': data_p3['counts'],
-        'options_json_p4': data_p4['options'], 'counts_json_p4': data_p4['counts'],
-        
-        'is_admin': is_admin, 
+        'is_admin': request.user.is_staff, 
         'is_verification_page': False, 
         'is_audit_page': False, 
     }
     
-    return render(request, 'voting/results_dashboard.html', context)
+    response = render(request, 'voting/results_dashboard.html', context)
+    # La ETag sale de la página sin el token enmascarado, más el secreto CSRF de la sesión:
+    # al iniciar sesión de nuevo el secreto cambia y la copia vieja ya no sirve.
+    page = CSRF_INPUT.sub(b'', response.content) + request.META.get('CSRF_COOKIE', '').encode()
+    response['ETag'] = quote_etag(hashlib.sha256(page).hexdigest())
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(request, etag=response['ETag'], response=response)
 
 
 @login_required
-def audit_view(request):
+def results_api_view(request):
     """
-    Auditoría Detallada: Muestra tabla cruda con firmas y encriptación.
-    SOLO accesible para administradores (Staff).
+    API JSON del tablero: total de votos y, por pregunta, cuántos votos tiene cada respuesta.
+    {"total_votes": 120, "questions": [{"key": "P1", "answers": [{"label": "Alto", "count": 70, "percentage": 58.3}, ...]}, ...]}
+    Cada voto se lee y se interpreta UNA sola vez (antes se recorría la tabla una vez por pregunta).
+    Con la elección cerrada se responde con el conteo firmado: los votos ya archivados
+    (archive_ballots) no están en la tabla.
     """
-    if not request.user.is_staff:
-        messages.error(request, "Acceso Denegado: Solo el personal de administración puede acceder a la auditoría.")
-        return redirect('voting:results_dashboard')
-        
-    all_votes = Vote.objects.all().select_related('voter').order_by('id') 
-    
+    closure = ElectionClosure.objects.exclude(document='').first() if is_election_closed() else None
+    if closure is not None:
+        document = json.loads(closure.document)
+        total_votes, tallies = document['total_votes'], document['tallies']
+    else:
+        total_votes, tallies = compute_final_tally()
+
+    return JsonResponse({
+        'total_votes': total_votes,
+        'questions': describe_tallies(total_votes, tallies),
+    })
+
+
+@login_required
+def turnout_api_view(request):
+    """
+    API JSON de participación en el tiempo (para el gráfico del tablero).
+    Parámetros GET opcionales:
+      - granularity: 'minute' (por defecto) u 'hour'
+      - start / end: fechas ISO (ej: 2025-11-20T10:00) para acotar el rango (zoom)
+    Lee SOLO la tabla de resúmenes TurnoutRollup, nunca la tabla Vote completa.
+    Es una lectura: los resúmenes los pone al día el comando 'refresh_turnout'
+    (con --interval corre como proceso aparte), no cada visita al gráfico.
+    """
+    granularity = request.GET.get('granularity', 'minute')
+    if granularity not in BUCKET_TRUNCATE:
+        return JsonResponse({'error': "granularity debe ser 'minute' u 'hour'."}, status=400)
+
+    start = parse_datetime(request.GET.get('start', ''))
+    end = parse_datetime(request.GET.get('end', ''))
+    if (request.GET.get('start') and not start) or (request.GET.get('end') and not end):
+        return JsonResponse({'error': 'start y end deben ser fechas ISO 8601.'}, status=400)
+
+    buckets = []
+    for point in get_turnout_series(granularity, start, end):
+        buckets.append({
+            'start': point['start'].isoformat(),
+            'votes': point['votes'],
+            'answers': {
+                question: {get_legible_label(question, answer): count for answer, count in answers.items()}
+                for question, answers in point['answers'].items()
+            },
+        })
+
+    return JsonResponse({'granularity': granularity, 'buckets': buckets})
+
+
+def serve_election_artifact(request, name, content_type):
+    """
+    Entrega un archivo de resultados finales. Si el navegador acepta gzip, mandamos
+    directamente la versión .gz que se comprimió al cerrar (no se comprime por petición).
+    """
+    path = artifact_path(name)
+    gzip_path = path.with_name(name + '.gz')
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '') and gzip_path.exists():
+        response = FileResponse(open(gzip_path, 'rb'), content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['Vary'] = 'Accept-Encoding'
+    # El resultado final ya no cambia nunca.
+    response['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+
+def final_results_json_view(request):
+    """Documento final firmado (JSON). Público: cualquiera puede verificar la firma."""
+    if not artifact_path(RESULTS_JSON).exists():
+        raise Http404("La elección todavía no tiene resultados finales publicados.")
+    return serve_election_artifact(request, RESULTS_JSON, 'application/json')
+
+
+def build_audit_rows(votes):
+    """Convierte los votos en las filas de la tabla de auditoría (etiquetas legibles por pregunta)."""
     processed_votes = []
-    for vote in all_votes:
+    for vote in votes:
         parsed_data = parse_vote_content(vote.option)
         
         processed_votes.append({
             'id': vote.id,
             'voter_username': vote.voter.user.username,
-            'encrypted_vote': vote.encrypted_vote,   # Mostramos el hash AES
-            'digital_signature': vote.digital_signature, # Mostramos la firma RSA
+            'encrypted_preview': vote.encrypted_preview,   # Prefijo del hash AES
+            'signature_preview': vote.signature_preview, # Prefijo de la firma RSA
             'timestamp': vote.timestamp,
             'P1': get_legible_label('P1', parsed_data.get('P1', 'N/A')),
             'P2': get_legible_label('P2', parsed_data.get('P2', 'N/A')),
             'P3': get_legible_label('P3', parsed_data.get('P3', 'N/A')),
             'P4': get_legible_label('P4', parsed_data.get('P4', 'N/A')),
         })
+    return processed_votes
+
+
+@login_required
+def audit_view(request):
+    """
+    Auditoría Detallada: Muestra tabla cruda con firmas y encriptación.
+    SOLO accesible para administradores (Staff).
+    """
+    if not request.user.is_staff:
+        messages.error(request, "Acceso Denegado: Solo el personal de administración puede acceder a la auditoría.")
+        return redirect('voting:results_dashboard')
+        
+    # Solo traemos un prefijo de los hashes largos: la tabla muestra una vista previa
+    # y el valor completo se carga bajo demanda desde 'vote_crypto_detail'.
+    # Una página de AUDIT_PAGE_SIZE votos a partir del ID de la URL (?after=N): cada página
+    # cuesta lo mismo, sin importar cuántos votos haya antes.
+    try:
+        after_id = max(int(request.GET.get('after', 0)), 0)
+    except ValueError:
+        after_id = 0
+    page_size = settings.AUDIT_PAGE_SIZE
+    # Pedimos uno de más para saber si hay otra página.
+    page_votes = gather_audit_votes(after_id, page_size + 1)
+    has_next = len(page_votes) > page_size
+    page_votes = page_votes[:page_size]
     
     context = {
-        'votes': processed_votes, 
+        'votes': build_audit_rows(page_votes), 
         'is_admin': True, 
         'is_verification_page': False, 
         'is_audit_page': True, 
+        'after_id': after_id,
+        'next_after_id': page_votes[-1].id if has_next else None,
+        'page_size': page_size,
     }
     
     return render(request, 'voting/results_dashboard.html', context)
@@ -371,8 +492,21 @@ def audit_view(request):
 def verification_page(request):
     """
     Verificación Personal: Muestra al usuario SU propio historial y firmas.
+    Si sus votos ya se movieron al archivo frío (archive_ballots), se leen de ahí.
     """
-    user_votes = Vote.objects.filter(voter__user=request.user).select_related('voter').order_by('-timestamp')
+    profile = request.voter_profile
+    user_votes = list(voter_votes(profile))
+    if profile.has_voted and not user_votes:
+        # Mismo formato que voter_votes: vista previa de los hashes, del más reciente al más antiguo.
+        user_votes = [
+            {
+                'id': record['id'],
+                'encrypted_preview': record['encrypted_vote'][:HASH_PREVIEW_LENGTH],
+                'signature_preview': record['digital_signature'][:HASH_PREVIEW_LENGTH],
+                'timestamp': parse_datetime(record['timestamp']),
+            }
+            for record in reversed(find_voter_archived_votes(profile.pk))
+        ]
     
     context = {
         'votes': user_votes,
@@ -383,6 +517,124 @@ def verification_page(request):
     
     return render(request, 'voting/results_dashboard.html', context)
 
+
+@login_required
+def vote_crypto_detail(request, vote_id):
+    """
+    Endpoint JSON pequeño: devuelve la firma y el cifrado COMPLETOS de un voto.
+    Las tablas solo muestran un prefijo; el navegador pide el resto al hacer clic.
+    Un administrador puede ver cualquier voto, un votante solo los suyos.
+    Si el voto ya se movió al archivo frío (archive_ballots), se lee de su segmento.
+    """
+    # El ID del voto dice en qué partición está (voting/sharding.py).
+    shard = shard_for_object_id(vote_id)
+    vote = None
+    if shard is not None:
+        votes = Vote.objects.using(shard).values('id', 'encrypted_vote', 'digital_signature')
+        if not request.user.is_staff:
+            votes = votes.filter(voter__user_id=request.user.pk)
+        vote = votes.filter(pk=vote_id).first()
+
+    if vote is None:
+        archived = find_archived_vote(vote_id)
+        if archived is None or not (request.user.is_staff or archived['voter_id'] == request.voter_profile.pk):
+            raise Http404("No existe ese voto.")
+        vote = {field: archived[field] for field in ('id', 'encrypted_vote', 'digital_signature')}
+
+    response = JsonResponse(vote)
+    # Las papeletas nunca cambian después de insertarse: el navegador puede guardarla.
+    response['Cache-Control'] = 'private, max-age=86400, immutable'
+    return response
+
+@csrf_exempt
+@require_POST
+def kiosk_ballots_view(request):
+    """
+    API JSON de los kioscos de las casillas: recibe un lote de boletas ya firmadas
+    (ver voting/kiosk.py) y responde el resultado de cada una:
+    {"kiosk": "casilla-1", "accepted": 2, "rejected": 1, "results": [{"index": 0, "status": "accepted", ...}, ...]}
+    Sin sesión ni CSRF: el kiosco se autentica con su token (Authorization: Bearer ...).
+    """
+    kiosk_name = authenticate_kiosk(request)
+    if kiosk_name is None:
+        return JsonResponse({'error': "Token de kiosco inválido o ausente."}, status=401)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "El cuerpo debe ser JSON."}, status=400)
+
+    try:
+        results = submit_ballot_batch(payload.get('ballots') if isinstance(payload, dict) else None,
+                                      request=request, kiosk_name=kiosk_name)
+    except KioskBatchError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+    accepted = sum(1 for result in results if result['status'] == 'accepted')
+    return JsonResponse({
+        'kiosk': kiosk_name,
+        'accepted': accepted,
+        'rejected': len(results) - accepted,
+        'results': results,
+    })
+
+@login_required
+def profiler_report_view(request):
+    """
+    Perfiles de Rendimiento: las peticiones más lentas de cada vista.
+    SOLO accesible para administradores (Staff).
+    """
+    if not request.user.is_staff:
+        messages.error(request, "Acceso Denegado: Solo el personal de administración puede ver los perfiles.")
+        return redirect('voting:results_dashboard')
+
+    # Agrupamos los resúmenes por vista y nos quedamos con los 5 más lentos de cada una.
+    by_view = {}
+    for summary in load_profile_summaries():
+        by_view.setdefault(summary['view'], []).append(summary)
+
+    views_report = []
+    for view_name, summaries in by_view.items():
+        summaries.sort(key=lambda item: item['duration_ms'], reverse=True)
+        views_report.append({
+            'view': view_name,
+            'count': len(summaries),
+            'slowest': summaries[:5],
+        })
+    views_report.sort(key=lambda item: item['slowest'][0]['duration_ms'], reverse=True)
+
+    context = {
+        'views_report': views_report,
+        'sample_rate': settings.PROFILER_SAMPLE_RATE,
+        'profile_dir': settings.PROFILER_DIR,
+    }
+    return render(request, 'voting/profiler_report.html', context)
+
+@login_required
+def audit_events_view(request):
+    """
+    Bitácora de Eventos de Seguridad: los eventos más recientes, filtrados por votante y tipo.
+    SOLO accesible para administradores (Staff).
+    """
+    if not request.user.is_staff:
+        messages.error(request, "Acceso Denegado: Solo el personal de administración puede ver la bitácora.")
+        return redirect('voting:results_dashboard')
+
+    voter = request.GET.get('voter', '').strip()
+    event_type = request.GET.get('type', '')
+    if event_type not in dict(AuditEvent.EVENT_TYPE_CHOICES):
+        event_type = ''
+
+    context = {
+        'events': search_events(voter=voter, event_type=event_type),
+        'voter': voter,
+        'event_type': event_type,
+        'event_types': AuditEvent.EVENT_TYPE_CHOICES,
+        # Cola y descartes de ESTE proceso (cada worker tiene los suyos).
+        'stats': audit_log_stats(),
+    }
+    return render(request, 'voting/audit_events.html', context)
+
 def guide_view(request):
     """Muestra la guía de usuario."""
     return render(request, 'voting/guide.html')
@@ -397,8 +649,9 @@ def check_key_status(request):
     Permite al usuario subir un archivo .key para ver si funciona.
     No guarda nada, solo verifica.
     """
-    profile = get_object_or_404(VoterProfile, user=request.user)
+    profile = request.voter_profile
     key_status = None # Estados posibles: 'valid_ready', 'valid_used', 'invalid_format', etc.
+    key_error = None
     
     if request.method == 'POST':
         form = KeyCheckForm(request.POST, request.FILES)
@@ -406,18 +659,16 @@ def check_key_status(request):
             uploaded_file = request.FILES['private_key']
             try:
                 # 1. Intentamos leer la llave (Detectar si es Falsa/Corrupta)
-                key_content = uploaded_file.read().decode('utf-8')
-                private_key_obj = RSA.import_key(key_content)
+                # (PEM o DER; el algoritmo, RSA o Ed25519, se lee de la propia llave)
+                uploaded_algorithm, uploaded_key = read_private_key(uploaded_file)
                 
                 # 2. Verificamos si el usuario tiene una llave registrada en el sistema
                 if not profile.public_key:
                     key_status = 'no_key_registered'
                 else:
-                    # 3. Generamos la pública desde la privada subida y comparamos con la guardada
-                    uploaded_public_pem = private_key_obj.publickey().export_key('PEM').decode('utf-8').strip()
-                    stored_public_pem = profile.public_key.strip()
-                    
-                    if uploaded_public_pem != stored_public_pem:
+                    # 3. Comparamos la huella de la pública de la llave subida con la de la guardada
+                    if (uploaded_algorithm != profile.signature_algorithm
+                            or public_key_fingerprint(uploaded_key) != public_pem_fingerprint(profile.public_key)):
                         key_status = 'mismatch' # La llave sirve, pero no es la tuya
                     else:
                         # 4. Verificar si ya se usó
@@ -426,14 +677,17 @@ def check_key_status(request):
                         else:
                             key_status = 'valid_ready'
 
-            except (ValueError, IndexError, TypeError) as e:
-                # Si RSA.import_key falla, el archivo es basura
+            except KeyUploadError as e:
+                # Demasiado grande, no parece una llave, o ningún algoritmo la reconoce
                 key_status = 'invalid_format'
+                key_error = str(e)
+            record_event(AuditEvent.KEY_CHECKED, request, status=key_status)
     else:
         form = KeyCheckForm()
 
     return render(request, 'voting/check_key.html', {
         'form': form, 
         'key_status': key_status,
+        'key_error': key_error,
         'profile': profile
     })
\ No newline at end of file
@@ -0,0 +1,60 @@
+import re
+
+# ---------------------------------------------------------
+# FUNCIONES AUXILIARES (Procesamiento de Texto)
+# ---------------------------------------------------------
+
+# Opciones válidas de cada pregunta (los mismos 'value' del formulario vote_form.html).
+QUESTION_OPTIONS = {
+    'P1': ['ALTO', 'MEDIO', 'BAJO'],
+    'P2': ['FACIL', 'ADECUADO', 'DIFICIL'],
+    'P3': ['MUCHO', 'TAL-VEZ', 'NO-DUDA'],
+    'P4': ['RAPIDO', 'ADECUADO', 'LENTO'],
+}
+
+def build_vote_content(username, answers):
+    """
+    Arma el texto canónico que se firma y se cifra:
+    'USUARIO:<username>|P1:<valor>|P2:<valor>|P3:<valor>|P4:<valor>'.
+    'answers' es un diccionario {'P1': 'ALTO', ...}.
+    """
+    parts = [f"USUARIO:{username}"]
+    parts.extend(f"{key}:{answers.get(key, '')}" for key in QUESTION_OPTIONS)
+    return '|'.join(parts)
+
+def is_canonical_vote(vote_content, username):
+    """
+    ¿El texto es exactamente el voto canónico de este usuario, con una opción válida
+    en cada pregunta? (Mismo formato que arma la vista de votación.)
+    """
+    answers = parse_vote_content(vote_content)
+    if any(answers.get(key) not in options for key, options in QUESTION_OPTIONS.items()):
+        return False
+    return vote_content == build_vote_content(username, answers)
+
+def parse_vote_content(vote_option):
+    """
+    Convierte el texto crudo del voto (ej: 'P1:ALTO|P2:FACIL') 
+    en un diccionario de Python fácil de leer.
+    """
+    results = {}
+    # Patrón: (P#):(VALOR)
+    matches = re.findall(r'(P\d+):([A-Z0-9\-]+)', vote_option)
+    for key, value in matches:
+        results[key] = value
+    return results
+
+def get_legible_label(key, value):
+    """
+    Traduce los códigos internos (ej: 'RAPIDO') a texto legible para humanos (ej: 'Muy rápido').
+    Esto se usa para mostrar gráficos y tablas bonitas.
+    """
+    if key == 'P1': 
+        return {'ALTO': 'Alto', 'MEDIO': 'Medio', 'BAJO': 'Bajo'}.get(value, value)
+    if key == 'P2': 
+        return {'FACIL': 'Fáciles', 'ADECUADO': 'Adecuados', 'DIFICIL': 'Difíciles'}.get(value, value)
+    if key == 'P3': 
+        return {'MUCHO': 'Sí, mucho', 'TAL-VEZ': 'Tal vez', 'NO-DUDA': 'No, lo dudo'}.get(value, value)
+    if key == 'P4': 
+        return {'RAPIDO': 'Muy rápido', 'ADECUADO': 'Adecuados', 'LENTO': 'Muy lento'}.get(value, value)
+    return value
@@ -4,6 +4,7 @@ Django settings for voting_project project.
 import os
 from pathlib import Path
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 from decouple import config # Esta librería nos ayuda a leer claves secretas sin escribirlas en el código
 
 # Construye rutas dentro del proyecto (ej: BASE_DIR / 'subdir').
@@ -45,10 +46,23 @@ MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware', 
     
     'django.middleware.security.SecurityMiddleware',
+    
+    # AÑADIDO: Comprime con gzip las respuestas grandes (ej. la tabla de auditoría).
+    # Va arriba para que comprima el HTML ya terminado por el resto de middlewares.
+    'django.middleware.gzip.GZipMiddleware',
+    
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    
+    # AÑADIDO: Expone request.voter_profile (perfil del votante, cargado desde caché).
+    'voting.identity.VoterProfileMiddleware',
+    
+    # AÑADIDO: Perfilador por muestreo (ver sección PERFILADO más abajo).
+    # Va después de AuthenticationMiddleware para poder reconocer a los administradores.
+    'voting.profiling.SamplingProfilerMiddleware',
+    
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +100,196 @@ DATABASES = {
     )
 }
 
+# --- PARTICIONES DE VOTANTES Y VOTOS (voting/sharding.py) ---
+# Lista de URLs de bases de datos separadas por comas. Cada votante (su perfil y sus votos)
+# vive en UNA de ellas, elegida por un hash estable de su ID de usuario; 'default' guarda
+# usuarios, sesiones y el resto. Vacío = una sola base ('default'), como siempre.
+# Ejemplo local: VOTE_SHARD_URLS=sqlite:///shard0.sqlite3,sqlite:///shard1.sqlite3
+# Cada partición se migra aparte: python manage.py migrate --database shard0
+# NO cambies el número de particiones con datos: los votantes cambiarían de base.
+# Solo motores con rangos de IDs (sharding.SEQUENCE_SQL) y espera al cerrar (election.DRAIN_SQL).
+VOTE_SHARD_ENGINES = {'django.db.backends.sqlite3', 'django.db.backends.postgresql', 'django.db.backends.mysql'}
+VOTE_SHARD_URLS = config('VOTE_SHARD_URLS', default='')
+VOTE_SHARDS = []
+for _index, _url in enumerate(url.strip() for url in VOTE_SHARD_URLS.split(',') if url.strip()):
+    DATABASES[f'shard{_index}'] = dj_database_url.parse(_url, conn_max_age=600)
+    if DATABASES[f'shard{_index}']['ENGINE'] not in VOTE_SHARD_ENGINES:
+        raise ImproperlyConfigured(
+            f"VOTE_SHARD_URLS: el motor {DATABASES[f'shard{_index}']['ENGINE']} no admite particiones "
+            f"(admitidos: {', '.join(sorted(VOTE_SHARD_ENGINES))})."
+        )
+    VOTE_SHARDS.append(f'shard{_index}')
+VOTE_SHARDS = VOTE_SHARDS or ['default']
+DATABASE_ROUTERS = ['voting.sharding.VoterShardRouter']
+
+
+# --- CACHÉ ---
+# Guardamos en memoria fragmentos de HTML (ej. las filas de la tabla de auditoría, una
+# por voto). Sin REDIS_URL la caché vive en la memoria de CADA proceso (LocMemCache).
+# Con REDIS_URL (ej. redis://localhost:6379/0; requiere 'pip install redis') todos los
+# workers comparten la misma caché.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'voting-cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+# Votos por página en la auditoría (se pagina por ID: "después del voto #N").
+AUDIT_PAGE_SIZE = config('AUDIT_PAGE_SIZE', default=500, cast=int)
+
+
+# --- FIRMA DIGITAL ---
+# Algoritmo con el que se generan las llaves NUEVAS ('ED25519' o 'RSA').
+# Ed25519 genera llaves en microsegundos y firmas de 64 bytes; los votantes
+# que ya tienen llave RSA siguen funcionando porque su perfil guarda su algoritmo.
+SIGNATURE_ALGORITHM = config('SIGNATURE_ALGORITHM', default='ED25519')
+
+
+# --- SESIÓN E IDENTIDAD EN CACHÉ ---
+# ¿Ven todos los procesos la misma caché? Solo entonces se guardan en ella la sesión y la
+# identidad: con una caché por proceso, un logout o un cambio de is_staff/has_voted en un
+# worker no llegaría a los demás (ver voting/identity.py).
+IDENTITY_CACHE_SHARED = config(
+    'IDENTITY_CACHE_SHARED', default='locmem' not in CACHES['default']['BACKEND'], cast=bool,
+)
+# La sesión se lee de la caché y solo se escribe en la BD cuando cambia ('cached_db').
+# Sin caché compartida, la sesión se lee de la BD ('db').
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if IDENTITY_CACHE_SHARED
+    else 'django.contrib.sessions.backends.db'
+)
+# Los mensajes flash viajan en una cookie firmada: no escriben filas de sesión.
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+# El usuario y su VoterProfile se guardan juntos en caché (ver voting/identity.py),
+# solo con IDENTITY_CACHE_SHARED.
+# ModelBackend se queda en la lista para que las sesiones ya abiertas sigan siendo válidas.
+AUTHENTICATION_BACKENDS = [
+    'voting.identity.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Segundos que vive en caché la identidad de un usuario.
+IDENTITY_CACHE_TIMEOUT = config('IDENTITY_CACHE_TIMEOUT', default=300, cast=int)
+
+
+# --- CIFRADO DE VOTOS (AES) ---
+# Llavero de llaves AES-256 con versión, en formato "v1:<64 hex>,v2:<64 hex>".
+# Cada voto cifrado guarda el ID de la llave que lo cifró, así se puede rotar la llave:
+#   1. Agrega la llave nueva al final y márcala como activa.
+#   2. Ejecuta 'python manage.py rotate_ballot_key' para re-cifrar los votos viejos.
+#   3. Cuando termine, quita la llave vieja del llavero.
+# Si se deja vacío, se usa una llave temporal aleatoria (SOLO desarrollo: se pierde al reiniciar).
+BALLOT_AES_KEYS = config('BALLOT_AES_KEYS', default='')
+# ID de la llave con la que se cifran los votos nuevos (por defecto, la última del llavero).
+BALLOT_AES_ACTIVE_KEY = config('BALLOT_AES_ACTIVE_KEY', default='')
+# Modo de cifrado de los votos nuevos: 'cbc' o 'gcm' (GCM además detecta alteraciones).
+BALLOT_AES_MODE = config('BALLOT_AES_MODE', default='cbc')
+
+
+# --- CIERRE DE LA ELECCIÓN ---
+# Nombre que aparece en el documento final de resultados.
+ELECTION_NAME = config('ELECTION_NAME', default='Encuesta de Criptografía 2026-1')
+# Carpeta donde se publican los resultados finales (JSON/HTML y sus .gz).
+ELECTION_ARTIFACT_DIR = config('ELECTION_ARTIFACT_DIR', default=str(BASE_DIR / 'election_artifacts'))
+# Llave privada del servidor para firmar los resultados. Si no existe, se crea al cerrar.
+ELECTION_SIGNING_KEY_FILE = config('ELECTION_SIGNING_KEY_FILE', default=str(BASE_DIR / 'election_signing.key'))
+ELECTION_SIGNING_ALGORITHM = config('ELECTION_SIGNING_ALGORITHM', default='ED25519')
+# Archivo frío: segmentos comprimidos con los votos de la elección cerrada (comando archive_ballots).
+BALLOT_ARCHIVE_DIR = config('BALLOT_ARCHIVE_DIR', default=str(BASE_DIR / 'ballot_archive'))
+
+
+# --- PERFILADO DE RENDIMIENTO ---
+# Fracción de peticiones que se perfilan con cProfile (0.01 = 1%). 0 lo apaga.
+# Un administrador puede perfilar una petición concreta enviando la cabecera 'X-Profile: 1'.
+PROFILER_SAMPLE_RATE = config('PROFILER_SAMPLE_RATE', default=0.0, cast=float)
+PROFILER_HEADER = 'HTTP_X_PROFILE'
+# Carpeta local donde se guardan los perfiles; solo se conservan los más recientes.
+PROFILER_DIR = config('PROFILER_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILER_MAX_FILES = config('PROFILER_MAX_FILES', default=200, cast=int)
+
+# --- SUBIDA DE LA LLAVE PRIVADA (voting/key_upload.py) ---
+# Tamaño máximo del archivo de llave (una RSA-4096 en PEM mide ~3.3 KB; Ed25519 ~120 bytes).
+# El manejador lo hace cumplir mientras el archivo llega: nunca guarda más que esto.
+PRIVATE_KEY_UPLOAD_MAX_BYTES = config('PRIVATE_KEY_UPLOAD_MAX_BYTES', default=8192, cast=int)
+FILE_UPLOAD_HANDLERS = [
+    'voting.key_upload.PrivateKeyUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# --- API DE KIOSCOS (voting/kiosk.py) ---
+# Tokens de las casillas autorizadas, en formato "nombre:token,nombre:token".
+# El kiosco manda 'Authorization: Bearer <token>'. Vacío = API desactivada (todo 401).
+KIOSK_API_TOKENS = config('KIOSK_API_TOKENS', default='')
+# Máximo de boletas por lote (un lote de 1000 boletas RSA pesa ~700 KB de JSON).
+KIOSK_MAX_BATCH = config('KIOSK_MAX_BATCH', default=1000, cast=int)
+# Procesos para verificar las firmas de un lote. 1 = se verifican en el mismo proceso.
+KIOSK_VERIFY_WORKERS = config('KIOSK_VERIFY_WORKERS', default=os.cpu_count() or 1, cast=int)
+# Lotes más chicos que esto se verifican sin el pool (mandar a otro proceso cuesta más).
+KIOSK_PARALLEL_MIN_BATCH = config('KIOSK_PARALLEL_MIN_BATCH', default=64, cast=int)
+
+# --- BITÁCORA DE EVENTOS DE SEGURIDAD (voting/audit_log.py) ---
+# Las vistas encolan los eventos; un hilo por proceso los guarda por lotes en AuditEvent.
+AUDIT_LOG_ENABLED = config('AUDIT_LOG_ENABLED', default=True, cast=bool)
+# False = sin hilo escritor: los eventos esperan a flush_audit_events(). Las pruebas lo apagan
+# con override_settings (voting/tests.py -> VoterTestCase): un hilo escribiendo por su cuenta
+# se saltaría la transacción de cada prueba.
+AUDIT_LOG_BACKGROUND = config('AUDIT_LOG_BACKGROUND', default=True, cast=bool)
+# Tope de eventos en memoria por proceso; si se llena, los nuevos se descartan y se cuentan.
+AUDIT_LOG_QUEUE_SIZE = config('AUDIT_LOG_QUEUE_SIZE', default=10000, cast=int)
+AUDIT_LOG_BATCH_SIZE = config('AUDIT_LOG_BATCH_SIZE', default=200, cast=int)
+# Espera máxima para juntar un lote (segundos que un evento puede tardar en guardarse).
+AUDIT_LOG_FLUSH_SECONDS = config('AUDIT_LOG_FLUSH_SECONDS', default=1.0, cast=float)
+# Cabecera con la IP real detrás de un proxy (en Render: HTTP_X_FORWARDED_FOR). Vacío = REMOTE_ADDR.
+AUDIT_LOG_IP_HEADER = config('AUDIT_LOG_IP_HEADER', default='')
+# Días que se conservan los eventos (comando prune_audit_log).
+AUDIT_LOG_RETENTION_DAYS = config('AUDIT_LOG_RETENTION_DAYS', default=90, cast=int)
+
+# --- MICRO-BENCHMARKS (comando run_benchmarks) ---
+# Línea base versionada en el repositorio: 'run_benchmarks --save' la escribe y
+# 'run_benchmarks --compare' marca las operaciones que se volvieron más lentas.
+BENCHMARK_BASELINE_FILE = config('BENCHMARK_BASELINE_FILE', default=str(BASE_DIR / 'benchmarks' / 'baseline.json'))
+
+
+# --- HASH DE CONTRASEÑAS (voting/hashers.py) ---
+# Lo que cuesta cada login lo decide el hasher. 'python manage.py calibrate_password_hasher'
+# mide esta máquina y sugiere (o escribe en .env con --write) los valores de abajo.
+# Algoritmo para las contraseñas nuevas: 'pbkdf2_sha256', 'scrypt' o 'argon2' (pip install argon2-cffi).
+# Las contraseñas con otro algoritmo o parámetros se vuelven a hashear en su siguiente login.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2_sha256')
+# Valores por defecto = los de Django 5.2.
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=1_000_000, cast=int)
+PASSWORD_SCRYPT_WORK_FACTOR = config('PASSWORD_SCRYPT_WORK_FACTOR', default=2**14, cast=int)
+PASSWORD_SCRYPT_BLOCK_SIZE = config('PASSWORD_SCRYPT_BLOCK_SIZE', default=8, cast=int)
+PASSWORD_SCRYPT_PARALLELISM = config('PASSWORD_SCRYPT_PARALLELISM', default=5, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)  # KiB
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=8, cast=int)
+
+_CALIBRATED_HASHERS = {
+    'pbkdf2_sha256': 'voting.hashers.CalibratedPBKDF2PasswordHasher',
+    'scrypt': 'voting.hashers.CalibratedScryptPasswordHasher',
+    'argon2': 'voting.hashers.CalibratedArgon2PasswordHasher',
+}
+# El primero es el que se usa para hashear; el resto solo para reconocer hashes viejos.
+PASSWORD_HASHERS = [_CALIBRATED_HASHERS[PASSWORD_HASHER]] + [
+    path for algorithm, path in _CALIBRATED_HASHERS.items() if algorithm != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 
 # Password validation
 # Validaciones automáticas para que las contraseñas no sean "12345".
@@ -124,6 +328,27 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Cómo se guardan los estáticos al hacer collectstatic.
+# En producción (DEBUG=False) usamos el almacenamiento de WhiteNoise:
+#   - Agrega el hash del contenido al nombre (base.css -> base.3f2a9c1e.css) y {% static %}
+#     escribe ese nombre. Si el archivo cambia, cambia la URL: nunca hay caché vieja.
+#   - Deja listas las versiones comprimidas (.gz y, con el paquete Brotli instalado, .br).
+#     WhiteNoise entrega la que el navegador acepte, sin comprimir en cada petición.
+#   - A los archivos con hash les pone caché de 10 años con 'immutable'
+#     (el navegador ni siquiera pregunta si cambiaron).
+# En desarrollo (y en las pruebas) no hay que correr collectstatic: se sirven tal cual.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'